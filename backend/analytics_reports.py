@@ -0,0 +1,129 @@
+"""
+Analytics Reports Module
+Loads the Parquet snapshots written by analytics_snapshots.py into pandas.
+
+Nothing here talks to MongoDB, so ad-hoc analysis can be as heavy as it likes
+without touching production. Orders and items are deduplicated to the latest
+export of each order on load.
+
+Usage:
+    python analytics_reports.py [--dir PATH] [--from 2026-01-01] [--to 2026-02-01]
+"""
+import argparse
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+from analytics_snapshots import PARTITION_KEY, SNAPSHOT_DIR, latest_per_order
+
+
+def _dataset(directory: Path, table_name: str) -> ds.Dataset:
+    return ds.dataset(directory / table_name, format="parquet", partitioning="hive")
+
+
+def _months_filter(start: Optional[datetime], end: Optional[datetime]):
+    # Prune partitions on the month key before reading any row groups
+    expression = None
+    if start:
+        expression = ds.field(PARTITION_KEY) >= start.strftime("%Y-%m")
+    if end:
+        upper = ds.field(PARTITION_KEY) <= end.strftime("%Y-%m")
+        expression = upper if expression is None else expression & upper
+    return expression
+
+
+def _load(directory: Path, table_name: str, start: Optional[datetime], end: Optional[datetime],
+          columns: Optional[List[str]]) -> pd.DataFrame:
+    if not (directory / table_name).exists():
+        return pd.DataFrame()
+    if columns is not None:
+        columns = list(dict.fromkeys(columns + ["order_id", "created_at", "exported_at"]))
+    frame = _dataset(directory, table_name).to_table(columns=columns, filter=_months_filter(start, end)).to_pandas()
+    frame = latest_per_order(frame)
+    if start is not None:
+        frame = frame[frame["created_at"] >= pd.Timestamp(start)]
+    if end is not None:
+        frame = frame[frame["created_at"] < pd.Timestamp(end)]
+    return frame.reset_index(drop=True)
+
+
+def load_orders(directory: Path = SNAPSHOT_DIR, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Load the latest version of every order created in [start, end).
+
+    Args:
+        directory: Snapshot root directory
+        start: Inclusive lower bound on created_at (timezone-aware)
+        end: Exclusive upper bound on created_at (timezone-aware)
+        columns: Only read these columns (the key columns are always included)
+
+    Returns:
+        One row per order
+    """
+    return _load(directory, "orders", start, end, columns)
+
+
+def load_order_items(directory: Path = SNAPSHOT_DIR, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                     columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Load the line items of the latest version of every order created in [start, end)."""
+    return _load(directory, "order_items", start, end, columns)
+
+
+def load_products(directory: Path = SNAPSHOT_DIR) -> pd.DataFrame:
+    """Load the products dimension from the last export."""
+    path = directory / "products" / "products.parquet"
+    if not path.exists():
+        return pd.DataFrame()
+    return pd.read_parquet(path)
+
+
+def daily_revenue(orders: pd.DataFrame) -> pd.DataFrame:
+    """Orders and revenue per UTC day, excluding cancelled and failed orders."""
+    counted = orders[(orders["order_status"] != "cancelled") & (orders["payment_status"] != "failed")]
+    return (
+        counted.assign(date=counted["created_at"].dt.floor("D"))
+        .groupby("date")
+        .agg(orders=("order_id", "count"), revenue=("total", "sum"))
+        .reset_index()
+    )
+
+
+def top_products(items: pd.DataFrame, products: pd.DataFrame, limit: int = 10) -> pd.DataFrame:
+    """Best-selling products by units, joined with the current product dimension."""
+    sold = items[items["order_status"] != "cancelled"]
+    totals = (
+        sold.groupby("product_id")
+        .agg(units=("quantity", "sum"), revenue=("line_total", "sum"))
+        .reset_index()
+        .sort_values("units", ascending=False)
+        .head(limit)
+    )
+    if products.empty:
+        return totals
+    return totals.merge(products[["product_id", "name", "category_id", "stock"]], on="product_id", how="left")
+
+
+def _parse_day(value: Optional[str]) -> Optional[pd.Timestamp]:
+    return pd.Timestamp(value, tz="UTC") if value else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize the analytics snapshots")
+    parser.add_argument("--dir", default=str(SNAPSHOT_DIR), help="Snapshot root directory")
+    parser.add_argument("--from", dest="start", help="Start date (YYYY-MM-DD, inclusive)")
+    parser.add_argument("--to", dest="end", help="End date (YYYY-MM-DD, exclusive)")
+    args = parser.parse_args()
+
+    directory = Path(args.dir)
+    start, end = _parse_day(args.start), _parse_day(args.end)
+    orders = load_orders(directory, start, end)
+    if orders.empty:
+        print("No orders in the snapshots for this range")
+    else:
+        print(daily_revenue(orders).to_string(index=False))
+        print()
+        print(top_products(load_order_items(directory, start, end), load_products(directory)).to_string(index=False))
@@ -0,0 +1,310 @@
+"""
+Analytics Snapshots Module
+Writes orders, flattened order items and product dimensions to Parquet.
+
+Orders and items are exported incrementally: each run picks up the orders
+whose `updated_at` is at or after the last watermark and appends one Parquet
+file per touched month partition (hive style, `created_month=YYYY-MM`). A
+changed order therefore appears in several files; readers keep the copy with
+the newest `exported_at` (see analytics_reports.py), and `compact` rewrites
+each partition down to one deduplicated file. Products are small and are
+rewritten in full on every run.
+
+The watermark lives in `_state.json` beside the files it describes, so the
+export runs from cron on the single host that keeps the snapshot directory
+(see deploy/README.md), not inside the API workers.
+
+Usage:
+    python analytics_snapshots.py export [--full]
+    python analytics_snapshots.py compact
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from order_export import item_rows, order_row
+from utils.dates import as_datetime, date_range_filter
+
+logger = logging.getLogger(__name__)
+
+# Analytics Snapshot Configuration
+SNAPSHOT_DIR = Path(os.environ.get("ANALYTICS_SNAPSHOT_DIR", Path(__file__).parent / "analytics_data"))
+SNAPSHOT_BATCH_SIZE = int(os.environ.get("ANALYTICS_SNAPSHOT_BATCH_SIZE", "5000"))
+
+# Re-read a little before the watermark so writes that were in flight during the last run are not missed
+WATERMARK_OVERLAP = timedelta(minutes=2)
+STATE_FILE = "_state.json"
+PARTITION_KEY = "created_month"
+
+TIMESTAMP = pa.timestamp("us", tz="UTC")
+
+# Customer contact details and payment references are left out on purpose
+ORDERS_SCHEMA = pa.schema([
+    ("order_id", pa.string()),
+    ("created_at", TIMESTAMP),
+    ("updated_at", TIMESTAMP),
+    ("user_id", pa.string()),
+    ("city", pa.string()),
+    ("state", pa.string()),
+    ("pincode", pa.string()),
+    ("country", pa.string()),
+    ("payment_method", pa.string()),
+    ("payment_status", pa.string()),
+    ("order_status", pa.string()),
+    ("subtotal", pa.float64()),
+    ("coupon_code", pa.string()),
+    ("coupon_discount", pa.float64()),
+    ("shipping_cost", pa.float64()),
+    ("cod_fee", pa.float64()),
+    ("total", pa.float64()),
+    ("item_count", pa.int64()),
+    ("courier_name", pa.string()),
+    ("exported_at", TIMESTAMP),
+])
+
+ORDER_ITEMS_SCHEMA = pa.schema([
+    ("order_id", pa.string()),
+    ("created_at", TIMESTAMP),
+    ("payment_status", pa.string()),
+    ("order_status", pa.string()),
+    ("product_id", pa.string()),
+    ("item_name", pa.string()),
+    ("size", pa.string()),
+    ("quantity", pa.int64()),
+    ("unit_price", pa.float64()),
+    ("sale_price", pa.float64()),
+    ("line_total", pa.float64()),
+    ("exported_at", TIMESTAMP),
+])
+
+PRODUCTS_SCHEMA = pa.schema([
+    ("product_id", pa.string()),
+    ("name", pa.string()),
+    ("slug", pa.string()),
+    ("brand", pa.string()),
+    ("category_id", pa.string()),
+    ("sku", pa.string()),
+    ("price", pa.float64()),
+    ("sale_price", pa.float64()),
+    ("stock", pa.int64()),
+    ("is_active", pa.bool_()),
+    ("is_on_sale", pa.bool_()),
+    ("units_sold", pa.int64()),
+    ("units_sold_30d", pa.int64()),
+    ("created_at", TIMESTAMP),
+    ("exported_at", TIMESTAMP),
+])
+
+ORDER_PROJECTION = {"_id": 0, "shipping_address.full_name": 0, "shipping_address.email": 0,
+                    "shipping_address.phone": 0, "shipping_address.address_line1": 0,
+                    "shipping_address.address_line2": 0}
+PRODUCT_PROJECTION = {"_id": 0, **{field: 1 for field in PRODUCTS_SCHEMA.names if field != "exported_at"}}
+
+
+async def ensure_indexes(db) -> None:
+    """Index the watermark field so incremental runs don't scan every order."""
+    await db.orders.create_index("updated_at", name="updated_at")
+
+
+def _month(value: Any) -> str:
+    created = as_datetime(value)
+    return created.strftime("%Y-%m") if created else "unknown"
+
+
+_CASTS = {pa.string(): str, pa.float64(): float, pa.int64(): int, pa.bool_(): bool, TIMESTAMP: as_datetime}
+
+
+def _row(source: Dict[str, Any], schema: pa.Schema, exported_at: datetime) -> Dict[str, Any]:
+    # Older documents are not always typed consistently (e.g. numeric pincodes)
+    row = {}
+    for field in schema:
+        value = source.get(field.name)
+        row[field.name] = None if value is None else _CASTS[field.type](value)
+    row["exported_at"] = exported_at
+    return row
+
+
+def snapshot_rows(order: Dict[str, Any], exported_at: datetime) -> Dict[str, Any]:
+    """Split one order document into its order row and item rows."""
+    source = {**order_row(order), "created_at": order.get("created_at"), "updated_at": order.get("updated_at")}
+    return {
+        "order": _row(source, ORDERS_SCHEMA, exported_at),
+        "items": [
+            _row({**item, "created_at": order.get("created_at")}, ORDER_ITEMS_SCHEMA, exported_at)
+            for item in item_rows(order)
+        ],
+    }
+
+
+def read_state(directory: Path = SNAPSHOT_DIR) -> Dict[str, Any]:
+    path = directory / STATE_FILE
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def write_state(state: Dict[str, Any], directory: Path = SNAPSHOT_DIR) -> None:
+    # Write-then-rename so a crash never leaves a truncated state file
+    path = directory / STATE_FILE
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=2, default=str))
+    tmp.replace(path)
+
+
+def _write_partitions(directory: Path, table_name: str, rows: List[Dict[str, Any]], schema: pa.Schema, name: str) -> int:
+    by_month: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        by_month.setdefault(_month(row["created_at"]), []).append(row)
+    for month, month_rows in by_month.items():
+        partition = directory / table_name / f"{PARTITION_KEY}={month}"
+        partition.mkdir(parents=True, exist_ok=True)
+        pq.write_table(pa.Table.from_pylist(month_rows, schema=schema), partition / name, compression="zstd")
+    return len(by_month)
+
+
+def write_order_batch(orders: List[Dict[str, Any]], exported_at: datetime, part: str, directory: Path = SNAPSHOT_DIR) -> None:
+    """Append one batch of orders (and their items) to the partitioned datasets."""
+    order_rows, order_item_rows = [], []
+    for order in orders:
+        rows = snapshot_rows(order, exported_at)
+        order_rows.append(rows["order"])
+        order_item_rows.extend(rows["items"])
+    _write_partitions(directory, "orders", order_rows, ORDERS_SCHEMA, f"part-{part}.parquet")
+    _write_partitions(directory, "order_items", order_item_rows, ORDER_ITEMS_SCHEMA, f"part-{part}.parquet")
+
+
+def write_products(products: List[Dict[str, Any]], exported_at: datetime, directory: Path = SNAPSHOT_DIR) -> None:
+    """Replace the products dimension file."""
+    target = directory / "products" / "products.parquet"
+    target.parent.mkdir(parents=True, exist_ok=True)
+    table = pa.Table.from_pylist([_row(product, PRODUCTS_SCHEMA, exported_at) for product in products], schema=PRODUCTS_SCHEMA)
+    tmp = target.with_suffix(".tmp")
+    pq.write_table(table, tmp, compression="zstd")
+    tmp.replace(target)
+
+
+async def export_snapshots(db, directory: Path = SNAPSHOT_DIR, full: bool = False, batch_size: int = SNAPSHOT_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Export orders changed since the last watermark, plus all products.
+
+    Parquet encoding runs in a worker thread so the event loop stays free when
+    this is called from the API process.
+
+    Args:
+        db: MongoDB database instance (a secondary-reading handle is fine)
+        directory: Snapshot root directory
+        full: Ignore the watermark and export every order
+        batch_size: Orders per Parquet file
+
+    Returns:
+        Run summary with the exported counts and the new watermark
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    state = {} if full else read_state(directory)
+    watermark = as_datetime(state.get("watermark"))
+    exported_at = datetime.now(timezone.utc)
+    run_id = f"{exported_at.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+    query = date_range_filter("updated_at", gte=watermark - WATERMARK_OVERLAP) if watermark else {}
+    cursor = db.orders.find(query, ORDER_PROJECTION).sort("updated_at", 1).batch_size(batch_size)
+
+    exported = 0
+    batch_number = 0
+    newest: Optional[datetime] = watermark
+    batch: List[Dict[str, Any]] = []
+    async for order in cursor:
+        batch.append(order)
+        updated_at = as_datetime(order.get("updated_at"))
+        if updated_at and (newest is None or updated_at > newest):
+            newest = updated_at
+        if len(batch) >= batch_size:
+            await asyncio.to_thread(write_order_batch, batch, exported_at, f"{run_id}-{batch_number}", directory)
+            exported += len(batch)
+            batch_number += 1
+            batch = []
+    if batch:
+        await asyncio.to_thread(write_order_batch, batch, exported_at, f"{run_id}-{batch_number}", directory)
+        exported += len(batch)
+
+    products = await db.products.find({}, PRODUCT_PROJECTION).to_list(None)
+    await asyncio.to_thread(write_products, products, exported_at, directory)
+
+    # The watermark comes from the data rather than this host's clock
+    state = {
+        "watermark": newest.isoformat() if newest else None,
+        "last_run_at": exported_at.isoformat(),
+        "last_run_orders": exported,
+        "last_run_products": len(products),
+    }
+    write_state(state, directory)
+    return state
+
+
+def compact(directory: Path = SNAPSHOT_DIR) -> Dict[str, int]:
+    """
+    Rewrite every orders / order_items partition as a single file with one copy per order.
+
+    Returns:
+        Number of partitions rewritten per dataset
+    """
+    rewritten = {}
+    for table_name, schema in (("orders", ORDERS_SCHEMA), ("order_items", ORDER_ITEMS_SCHEMA)):
+        rewritten[table_name] = 0
+        for partition in sorted((directory / table_name).glob(f"{PARTITION_KEY}=*")):
+            parts = sorted(partition.glob("part-*.parquet"))
+            if len(parts) < 2:
+                continue
+            table = pa.concat_tables([pq.read_table(part, schema=schema) for part in parts])
+            frame = latest_per_order(table.to_pandas())
+            target = partition / f"part-compacted-{uuid.uuid4().hex[:6]}.parquet"
+            pq.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False), target, compression="zstd")
+            for part in parts:
+                part.unlink()
+            rewritten[table_name] += 1
+    return rewritten
+
+
+def latest_per_order(frame):
+    """Keep only the rows from the newest export of each order (works for orders and items)."""
+    if frame.empty:
+        return frame
+    newest = frame.groupby("order_id")["exported_at"].transform("max")
+    return frame[frame["exported_at"] == newest].reset_index(drop=True)
+
+
+async def _main(args) -> None:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from core.read_routing import ReadRouter
+
+    load_dotenv()
+    directory = Path(args.dir)
+    if args.command == "compact":
+        print(compact(directory))
+        return
+
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    db = ReadRouter(client, os.environ['DB_NAME']).database("analytics")
+    try:
+        summary = await export_snapshots(db, directory, full=args.full)
+        print(json.dumps(summary, indent=2))
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export analytics snapshots to Parquet")
+    parser.add_argument("command", choices=["export", "compact"])
+    parser.add_argument("--full", action="store_true", help="Ignore the watermark and export every order")
+    parser.add_argument("--dir", default=str(SNAPSHOT_DIR), help="Snapshot root directory")
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,168 @@
+"""
+JWT access tokens with database-checked, rotating refresh tokens.
+
+With AUTH_MODE=jwt, logins issue a short-lived signed access token that is
+verified in-process on every request (no database lookup) and a refresh
+token whose `jti` is recorded in `refresh_tokens`. Refreshing consumes the
+old refresh token and issues a new one in the same family; presenting a
+consumed token again revokes the whole family, since it means the token
+was copied. Logout, password reset and lockout revoke a user's refresh
+tokens, so an access token outlives them by at most ACCESS_TOKEN_EXPIRE_MINUTES.
+
+Opaque `sess_...` session tokens stay valid in both modes.
+"""
+import logging
+import os
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+from core.security import JWT_SECRET, REFRESH_TOKEN_EXPIRE_HOURS, create_access_token, create_refresh_token, verify_token
+from utils.dates import as_datetime
+
+logger = logging.getLogger(__name__)
+
+# Auth Mode Configuration
+AUTH_MODE = os.environ.get("AUTH_MODE", "session").lower()  # "session" or "jwt"
+JWT_AUTH_ENABLED = AUTH_MODE == "jwt"
+
+if JWT_AUTH_ENABLED and not JWT_SECRET:
+    raise RuntimeError("AUTH_MODE=jwt requires JWT_SECRET_KEY to be set")
+
+REFRESH_COLLECTION = "refresh_tokens"
+
+# Two tabs refreshing at the same moment both present the same token; don't treat that as theft
+REFRESH_REUSE_GRACE_SECONDS = int(os.environ.get("REFRESH_REUSE_GRACE_SECONDS", "10"))
+
+
+class RefreshTokenSuperseded(Exception):
+    """The refresh token was just rotated by a concurrent request (within the reuse grace window)."""
+
+
+def is_jwt(token: Optional[str]) -> bool:
+    """Whether a bearer/cookie token is a JWT rather than an opaque session token."""
+    return bool(token) and token.count(".") == 2
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase) -> None:
+    """Unique jti, per-user revocation, and expiry cleanup of refresh tokens."""
+    collection = db[REFRESH_COLLECTION]
+    await collection.create_index("jti", unique=True, name="jti")
+    await collection.create_index("user_id", name="user_id")
+    await collection.create_index("family", name="family")
+    await collection.create_index("expires_at", expireAfterSeconds=0, name="expires_at_ttl")
+
+
+def access_claims(principal: Dict[str, Any], is_admin: bool) -> Dict[str, Any]:
+    """Profile fields carried in the access token so requests need no lookup."""
+    claims = {"email": principal.get("email"), "name": principal.get("name")}
+    if is_admin:
+        claims["picture"] = principal.get("picture") or ""
+    return claims
+
+
+async def issue_tokens(db: AsyncIOMotorDatabase, principal: Dict[str, Any], is_admin: bool, family: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Issue an access token and a recorded refresh token.
+
+    Args:
+        db: MongoDB database instance
+        principal: User or admin document (user_id, email, name)
+        is_admin: Whether the principal is an admin
+        family: Refresh token family to continue (None starts a new login)
+
+    Returns:
+        Dict with access_token, refresh_token and refresh_expires_at
+    """
+    jti = uuid.uuid4().hex
+    family = family or uuid.uuid4().hex
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(hours=REFRESH_TOKEN_EXPIRE_HOURS)
+
+    await db[REFRESH_COLLECTION].insert_one({
+        "jti": jti,
+        "family": family,
+        "user_id": principal["user_id"],
+        "is_admin": is_admin,
+        "created_at": now,
+        "expires_at": expires_at,
+        "used_at": None,
+        "revoked_at": None,
+    })
+    return {
+        "access_token": create_access_token(principal["user_id"], is_admin, claims=access_claims(principal, is_admin)),
+        "refresh_token": create_refresh_token(principal["user_id"], jti=jti, family=family),
+        "refresh_expires_at": expires_at,
+    }
+
+
+async def rotate_refresh_token(db: AsyncIOMotorDatabase, token: str) -> Optional[Dict[str, Any]]:
+    """
+    Consume a refresh token and issue a new token pair in the same family.
+
+    Args:
+        db: MongoDB database instance
+        token: Refresh token from the cookie
+
+    Returns:
+        New tokens (see issue_tokens) plus is_admin and user_id, or None if the token is
+        invalid, expired, revoked or already used
+
+    Raises:
+        RefreshTokenSuperseded: The token was rotated by another request moments ago;
+            that request's response carries the new cookies
+    """
+    payload = verify_token(token, "refresh")
+    if not payload or not payload.get("jti"):
+        return None
+
+    now = datetime.now(timezone.utc)
+    record = await db[REFRESH_COLLECTION].find_one_and_update(
+        {"jti": payload["jti"], "used_at": None, "revoked_at": None},
+        {"$set": {"used_at": now}},
+        return_document=ReturnDocument.AFTER
+    )
+    if not record:
+        existing = await db[REFRESH_COLLECTION].find_one({"jti": payload["jti"]})
+        used_at = as_datetime(existing.get("used_at")) if existing else None
+        if not used_at or existing.get("revoked_at"):
+            return None
+        if now - used_at <= timedelta(seconds=REFRESH_REUSE_GRACE_SECONDS):
+            raise RefreshTokenSuperseded()
+        logger.warning(f"Refresh token reuse for user {existing['user_id']}; revoking family {existing['family']}")
+        await revoke_family(db, existing["family"])
+        return None
+
+    collection = "admin_users" if record["is_admin"] else "users"
+    principal = await db[collection].find_one({"user_id": record["user_id"]}, {"_id": 0, "user_id": 1, "email": 1, "name": 1, "picture": 1})
+    if not principal:
+        await revoke_family(db, record["family"])
+        return None
+
+    tokens = await issue_tokens(db, principal, record["is_admin"], family=record["family"])
+    return {**tokens, "user_id": record["user_id"], "is_admin": record["is_admin"]}
+
+
+async def revoke_family(db: AsyncIOMotorDatabase, family: str) -> None:
+    await db[REFRESH_COLLECTION].update_many(
+        {"family": family, "revoked_at": None},
+        {"$set": {"revoked_at": datetime.now(timezone.utc)}}
+    )
+
+
+async def revoke_refresh_token(db: AsyncIOMotorDatabase, token: Optional[str]) -> None:
+    """Revoke the family of a refresh token (logout); unknown tokens are ignored."""
+    payload = verify_token(token, "refresh") if token else None
+    if payload and payload.get("family"):
+        await revoke_family(db, payload["family"])
+
+
+async def revoke_user_tokens(db: AsyncIOMotorDatabase, user_id: str) -> None:
+    """Revoke every refresh token of a user (password reset, lockout)."""
+    await db[REFRESH_COLLECTION].update_many(
+        {"user_id": user_id, "revoked_at": None},
+        {"$set": {"revoked_at": datetime.now(timezone.utc)}}
+    )
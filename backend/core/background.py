@@ -0,0 +1,111 @@
+"""
+Bounded in-process queue for fire-and-forget work such as transactional emails.
+
+Request handlers enqueue a coroutine function and return immediately; a small
+pool of worker tasks drains the queue in the background. The queue is drained
+on shutdown so accepted work is not silently dropped on a graceful restart.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundDispatcher:
+    """
+    Fixed-size worker pool consuming an ``asyncio.Queue`` of jobs.
+
+    Args:
+        name: Name used in logs and stats
+        workers: Number of concurrent worker tasks
+        maxsize: Maximum number of queued jobs before ``submit`` rejects work
+    """
+
+    def __init__(self, name: str, workers: int = 2, maxsize: int = 1000):
+        self.name = name
+        self.workers = workers
+        self.maxsize = maxsize
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def start(self) -> None:
+        """Start the worker tasks (must be called from a running event loop)."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def _worker(self) -> None:
+        while True:
+            func, args, kwargs = await self._queue.get()
+            try:
+                await func(*args, **kwargs)
+                self.completed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Background job in {self.name} queue failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def submit(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> bool:
+        """
+        Enqueue a coroutine function to run in the background.
+
+        Args:
+            func: Async callable to run
+            *args, **kwargs: Arguments for the callable
+
+        Returns:
+            True if the job was queued, False if the queue is full
+        """
+        if not self._tasks:
+            self.start()
+        try:
+            self._queue.put_nowait((func, args, kwargs))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            logger.error(f"{self.name} queue is full ({self.maxsize}), dropping job {getattr(func, '__name__', func)}")
+            return False
+        self.submitted += 1
+        return True
+
+    async def put(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> None:
+        """
+        Enqueue a job, waiting for space while the queue is full.
+
+        For background producers (e.g. batch jobs) that must not drop work;
+        request handlers should use ``submit`` so they never wait.
+        """
+        if not self._tasks:
+            self.start()
+        await self._queue.put((func, args, kwargs))
+        self.submitted += 1
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Wait up to ``timeout`` seconds for queued jobs, then stop the workers."""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.name} queue shut down with {self._queue.qsize()} jobs pending")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, int]:
+        """Get queue counters for monitoring."""
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "workers": len(self._tasks),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
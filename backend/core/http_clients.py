@@ -0,0 +1,182 @@
+"""
+Shared, pooled outbound HTTP clients for third-party upstreams.
+
+One long-lived ``httpx.AsyncClient`` is kept per upstream (ZeptoMail, Shiprocket,
+Google, Razorpay) so connections, TLS sessions and DNS results are reused across
+requests instead of being rebuilt for every email or rate lookup.
+"""
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Any
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional ``h2`` package; fall back to HTTP/1.1 keep-alive without it
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Pool Configuration
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+
+
+@dataclass(frozen=True)
+class UpstreamConfig:
+    """Connection settings for a single upstream service."""
+    base_url: str
+    connect_timeout: float = 5.0
+    read_timeout: float = 10.0
+    pool_timeout: float = 5.0
+    max_connections: int = HTTP_MAX_CONNECTIONS
+    max_keepalive_connections: int = HTTP_MAX_KEEPALIVE_CONNECTIONS
+    http2: bool = True
+
+
+UPSTREAMS: Dict[str, UpstreamConfig] = {
+    "zeptomail": UpstreamConfig(
+        base_url=f"https://api.zeptomail.{os.environ.get('ZEPTOMAIL_REGION', 'in')}",
+        read_timeout=15.0,
+    ),
+    "shiprocket": UpstreamConfig(
+        base_url="https://apiv2.shiprocket.in/v1/external",
+        read_timeout=15.0,
+    ),
+    # Google spans oauth2.googleapis.com and www.googleapis.com, so no base URL
+    "google": UpstreamConfig(base_url=""),
+    "razorpay": UpstreamConfig(
+        base_url="https://api.razorpay.com/v1",
+        read_timeout=20.0,
+    ),
+}
+
+
+class _InstrumentedTransport(httpx.AsyncHTTPTransport):
+    """Async transport that records request counters for pool monitoring."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requests_total = 0
+        self.errors_total = 0
+        self.in_flight = 0
+        self.total_seconds = 0.0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests_total += 1
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            return await super().handle_async_request(request)
+        except Exception:
+            self.errors_total += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.total_seconds += time.perf_counter() - started
+
+    def pool_stats(self) -> Dict[str, Any]:
+        connections = list(getattr(self._pool, "connections", []))
+        idle = sum(1 for conn in connections if conn.is_idle())
+        return {
+            "requests_total": self.requests_total,
+            "errors_total": self.errors_total,
+            "in_flight": self.in_flight,
+            "avg_latency_ms": round(self.total_seconds / self.requests_total * 1000, 2) if self.requests_total else 0.0,
+            "connections_open": len(connections),
+            "connections_idle": idle,
+            "connections_active": len(connections) - idle,
+        }
+
+
+class HTTPClientRegistry:
+    """
+    Holds one managed ``httpx.AsyncClient`` per configured upstream.
+
+    Clients are created in ``start()`` (called from the app startup hook) and
+    closed in ``aclose()``. ``get()`` creates a client lazily so standalone
+    scripts that call the upstream helpers directly keep working.
+    """
+
+    def __init__(self, upstreams: Dict[str, UpstreamConfig]):
+        self._upstreams = upstreams
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._transports: Dict[str, _InstrumentedTransport] = {}
+
+    def _create(self, name: str) -> httpx.AsyncClient:
+        config = self._upstreams[name]
+        transport = _InstrumentedTransport(
+            http2=config.http2 and HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive_connections,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+        )
+        client = httpx.AsyncClient(
+            base_url=config.base_url,
+            transport=transport,
+            timeout=httpx.Timeout(
+                config.read_timeout,
+                connect=config.connect_timeout,
+                pool=config.pool_timeout,
+            ),
+        )
+        self._clients[name] = client
+        self._transports[name] = transport
+        return client
+
+    def start(self) -> None:
+        """Create clients for every upstream that has not been created yet."""
+        for name in self._upstreams:
+            if name not in self._clients:
+                self._create(name)
+        logger.info(f"Outbound HTTP clients ready: {', '.join(self._clients)} (http2={HTTP2_AVAILABLE})")
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        """
+        Get the shared client for an upstream.
+
+        Args:
+            name: Upstream name ("zeptomail", "shiprocket", "google" or "razorpay")
+
+        Returns:
+            Pooled httpx.AsyncClient
+        """
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._create(name)
+        return client
+
+    async def aclose(self) -> None:
+        """Close every client and release pooled connections."""
+        for name, client in list(self._clients.items()):
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.error(f"Failed to close HTTP client for {name}: {e}")
+        self._clients.clear()
+        self._transports.clear()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get connection pool statistics for monitoring.
+
+        Returns:
+            Mapping of upstream name to pool counters
+        """
+        return {name: transport.pool_stats() for name, transport in self._transports.items()}
+
+
+http_clients = HTTPClientRegistry(UPSTREAMS)
+
+
+def get_http_client(name: str) -> httpx.AsyncClient:
+    """Shortcut for ``http_clients.get(name)``."""
+    return http_clients.get(name)
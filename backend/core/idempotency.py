@@ -0,0 +1,203 @@
+"""
+Idempotency-Key support for non-idempotent POST endpoints.
+
+The first request for a key claims it in MongoDB, runs the handler and stores
+the response. Retries with the same key get the stored response verbatim, and
+concurrent duplicates wait for the in-flight request instead of running the
+handler a second time. Stored keys expire through a TTL index.
+
+Keys are namespaced per owner (a user, or for guests the request body), so
+one client can never replay another's response by guessing its key. A claim is a short lease that
+the running request keeps renewing; if its worker dies, the lease runs out
+and the next retry takes the claim over instead of waiting for the TTL.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# Idempotency Configuration
+IDEMPOTENCY_TTL_HOURS = int(os.environ.get("IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_WAIT_SECONDS = float(os.environ.get("IDEMPOTENCY_WAIT_SECONDS", "30"))
+IDEMPOTENCY_CLAIM_SECONDS = float(os.environ.get("IDEMPOTENCY_CLAIM_SECONDS", "15"))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+class IdempotencyStore:
+    """
+    Stores first responses per idempotency key in ``idempotency_keys``.
+
+    Args:
+        db: MongoDB database instance
+        collection: Collection holding claimed keys and stored responses
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, collection: str = "idempotency_keys"):
+        self.collection = db[collection]
+        # Same-worker duplicates wait on a future instead of polling Mongo
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def ensure_indexes(self) -> None:
+        """Create the TTL index that expires stored keys."""
+        await self.collection.create_index("expires_at", expireAfterSeconds=0, name="expires_at_ttl")
+
+    async def run(
+        self,
+        key: str,
+        scope: str,
+        owner: str,
+        fingerprint: str,
+        handler: Callable[[], Awaitable[Any]],
+        status_code: int = 200
+    ) -> JSONResponse:
+        """
+        Run ``handler`` at most once per key and return its (stored) response.
+
+        Args:
+            key: Client-supplied Idempotency-Key header value
+            scope: Endpoint namespace (e.g. "orders")
+            owner: Who the key belongs to (e.g. "user:<id>"); keys of different owners never collide
+            fingerprint: Hash of the request body; a reused key with a different body is rejected
+            handler: Coroutine function producing the response body
+            status_code: Status code for a successful handler result
+
+        Returns:
+            JSONResponse with the first response for this key
+
+        Raises:
+            HTTPException: 422 for an invalid or reused key, 409 if the original request is still running
+        """
+        if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            raise HTTPException(status_code=422, detail="Invalid Idempotency-Key header")
+
+        doc_id = f"{scope}:{owner}:{key}"
+
+        waiter = self._in_flight.get(doc_id)
+        if waiter is not None:
+            stored = await asyncio.shield(waiter)
+            return self._replay(stored, fingerprint)
+
+        claim_id = uuid.uuid4().hex
+        if not await self._claim(doc_id, claim_id, fingerprint):
+            stored = await self._wait_for_result(doc_id, claim_id, fingerprint)
+            if stored is not None:
+                return self._replay(stored, fingerprint)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[doc_id] = future
+        renewal = asyncio.create_task(self._renew_claim(doc_id, claim_id))
+        try:
+            try:
+                body = jsonable_encoder(await handler())
+                stored = {"fingerprint": fingerprint, "status_code": status_code, "body": body}
+            except HTTPException as e:
+                if e.status_code >= 500:
+                    raise
+                # Client errors are deterministic for the same request, so they are replayed too
+                stored = {"fingerprint": fingerprint, "status_code": e.status_code, "body": {"detail": e.detail}}
+
+            await self.collection.update_one(
+                {"_id": doc_id, "claim_id": claim_id},
+                {"$set": {"state": "done", "status_code": stored["status_code"], "body": stored["body"]}}
+            )
+            future.set_result(stored)
+            return JSONResponse(status_code=stored["status_code"], content=stored["body"])
+        except BaseException as e:
+            # Release the key so a retry can run the request again
+            await self.collection.delete_one({"_id": doc_id, "claim_id": claim_id, "state": "in_flight"})
+            future.set_exception(e if isinstance(e, Exception) else HTTPException(status_code=503, detail="Request aborted"))
+            future.exception()  # mark retrieved so an unawaited future does not warn
+            raise
+        finally:
+            renewal.cancel()
+            self._in_flight.pop(doc_id, None)
+
+    @staticmethod
+    def _lease_until() -> datetime:
+        return datetime.now(timezone.utc) + timedelta(seconds=IDEMPOTENCY_CLAIM_SECONDS)
+
+    async def _claim(self, doc_id: str, claim_id: str, fingerprint: str) -> bool:
+        """Claim a new key, or take over a claim whose lease ran out. Returns True if claimed."""
+        now = datetime.now(timezone.utc)
+        try:
+            await self.collection.insert_one({
+                "_id": doc_id,
+                "fingerprint": fingerprint,
+                "state": "in_flight",
+                "claim_id": claim_id,
+                "claimed_until": self._lease_until(),
+                "created_at": now,
+                "expires_at": now + timedelta(hours=IDEMPOTENCY_TTL_HOURS)
+            })
+            return True
+        except DuplicateKeyError:
+            pass
+        # The worker holding the claim stopped renewing it (crashed or was killed)
+        taken = await self.collection.find_one_and_update(
+            {"_id": doc_id, "state": "in_flight", "fingerprint": fingerprint, "claimed_until": {"$lt": now}},
+            {"$set": {"claim_id": claim_id, "claimed_until": self._lease_until()}}
+        )
+        if taken is not None:
+            logger.warning(f"Took over expired idempotency claim {doc_id}")
+        return taken is not None
+
+    async def _renew_claim(self, doc_id: str, claim_id: str) -> None:
+        """Extend the claim's lease while the handler runs."""
+        while True:
+            await asyncio.sleep(IDEMPOTENCY_CLAIM_SECONDS / 3)
+            try:
+                await self.collection.update_one(
+                    {"_id": doc_id, "claim_id": claim_id, "state": "in_flight"},
+                    {"$set": {"claimed_until": self._lease_until()}}
+                )
+            except Exception as e:
+                logger.warning(f"Failed to renew idempotency claim {doc_id}: {e}")
+
+    async def _wait_for_result(self, doc_id: str, claim_id: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        Poll for a request claimed by another worker until it stores its response.
+
+        Returns None if that worker's claim expired and this request took it over.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + IDEMPOTENCY_WAIT_SECONDS
+        delay = 0.05
+        while True:
+            doc = await self.collection.find_one({"_id": doc_id})
+            if doc is None:
+                # The original request failed and released the key
+                raise HTTPException(status_code=409, detail="The original request with this Idempotency-Key failed; retry the request")
+            if doc.get("state") == "done":
+                return doc
+            if doc.get("fingerprint") != fingerprint:
+                return doc  # rejected by _replay
+            claimed_until = doc.get("claimed_until")
+            if claimed_until and claimed_until < datetime.now(timezone.utc):
+                if await self._claim(doc_id, claim_id, fingerprint):
+                    return None
+            if loop.time() >= deadline:
+                raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+    @staticmethod
+    def _replay(stored: Dict[str, Any], fingerprint: str) -> JSONResponse:
+        if stored.get("fingerprint") != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request body")
+        return JSONResponse(
+            status_code=stored["status_code"],
+            content=stored["body"],
+            headers={REPLAYED_HEADER: "true"}
+        )
@@ -0,0 +1,68 @@
+"""
+Lease-based leader election for background jobs backed by MongoDB.
+
+With several uvicorn/gunicorn workers every process starts the same background
+loops. A job guarded by a ``LeaderLease`` only runs in the worker currently
+holding the lease; if that worker dies, the lease expires and another worker
+takes over on its next tick.
+"""
+import os
+import socket
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+LEASE_COLLECTION = "job_leases"
+
+
+class LeaderLease:
+    """
+    A named lease stored as a single document in ``job_leases``.
+
+    The lease is acquired (or renewed) with one atomic upsert that only matches
+    when the lease is free, expired, or already held by this process.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, name: str, ttl_seconds: int = 180, holder: Optional[str] = None):
+        self.db = db
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+    async def acquire(self) -> bool:
+        """
+        Acquire or renew the lease.
+
+        Returns:
+            True if this process holds the lease after the call, False otherwise
+        """
+        now = datetime.now(timezone.utc)
+        try:
+            doc = await self.db[LEASE_COLLECTION].find_one_and_update(
+                {
+                    "_id": self.name,
+                    "$or": [
+                        {"holder": self.holder},
+                        {"expires_at": {"$lt": now}},
+                    ],
+                },
+                {"$set": {
+                    "holder": self.holder,
+                    "expires_at": now + timedelta(seconds=self.ttl_seconds),
+                    "renewed_at": now,
+                }},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Another process holds an unexpired lease, so the upsert collided with its document
+            return False
+        return doc is not None and doc.get("holder") == self.holder
+
+    async def release(self) -> None:
+        """Release the lease if this process still holds it."""
+        await self.db[LEASE_COLLECTION].delete_one({"_id": self.name, "holder": self.holder})
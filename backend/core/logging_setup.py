@@ -0,0 +1,203 @@
+"""
+Non-blocking logging pipeline.
+
+Every logger writes into an in-memory queue through a QueueHandler; a single
+QueueListener thread does the formatting and all file/console I/O, so a
+log call on the event loop never waits on a disk write.
+
+- Audit records (logger "audit") are written as JSON lines to
+  backend/logs/audit.log, rotated by size and daily, with rotated files gzipped.
+- Hot-path records are rate limited per call site: each site may emit
+  LOG_RATE_LIMIT_PER_MINUTE INFO/DEBUG lines per minute, and the number
+  dropped is reported on the next line that gets through. Warnings and
+  errors are never dropped.
+- LOG_FORMAT=json switches the console output to the same JSON formatter.
+"""
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+# Logging Configuration
+LOG_DIR = Path(os.environ.get("LOG_DIR", Path(__file__).resolve().parent.parent / "logs"))
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text").lower()
+LOG_RATE_LIMIT_PER_MINUTE = int(os.environ.get("LOG_RATE_LIMIT_PER_MINUTE", "120"))
+AUDIT_LOG_MAX_BYTES = int(os.environ.get("AUDIT_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+AUDIT_LOG_BACKUPS = int(os.environ.get("AUDIT_LOG_BACKUPS", "14"))
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_listener: Optional[QueueListener] = None
+_rate_limiter: Optional["RateLimitFilter"] = None
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per line: timestamp, level, logger, event and the record's
+    `fields` (passed as `extra={"fields": {...}}`) under "extra".
+
+    The serialized line is kept on the record, so a record written to several
+    handlers is only encoded once.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        cached = getattr(record, "_json", None)
+        if cached is not None:
+            return cached
+        data: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            data["extra"] = fields
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        record._json = json.dumps(data, default=str)
+        return record._json
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Per call site (logger, file, line) limit of INFO/DEBUG records per minute.
+
+    The audit logger is exempt: every security event is kept.
+
+    Args:
+        per_minute: Records allowed per call site per minute (0 disables limiting)
+    """
+
+    def __init__(self, per_minute: int = LOG_RATE_LIMIT_PER_MINUTE):
+        super().__init__()
+        self.per_minute = per_minute
+        self._windows: Dict[Tuple[str, str, int], list] = {}
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.per_minute <= 0 or record.levelno >= logging.WARNING or record.name == "audit":
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        window = int(time.monotonic() // 60)
+        state = self._windows.get(key)
+        if state is None or state[0] != window:
+            suppressed = state[2] if state else 0
+            state = self._windows[key] = [window, 0, 0]
+            if suppressed:
+                record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        state[1] += 1
+        if state[1] > self.per_minute:
+            state[2] += 1
+            self.dropped += 1
+            return False
+        return True
+
+
+class ThreadQueueHandler(QueueHandler):
+    """QueueHandler for an in-process listener: merges args but leaves formatting to the listener."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Render now so the queued record doesn't keep the traceback's frames alive
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    """
+    Rotates when the file reaches maxBytes or at UTC midnight, gzipping rotated files.
+
+    Rotated files are named audit.log.1.gz, audit.log.2.gz, ...
+    """
+
+    def __init__(self, filename, maxBytes: int, backupCount: int):
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount, encoding="utf-8", delay=True)
+        self.namer = lambda name: f"{name}.gz"
+        self.rotator = self._compress
+        self._rollover_at = self._next_midnight()
+
+    @staticmethod
+    def _next_midnight() -> float:
+        return (int(time.time() // 86400) + 1) * 86400
+
+    @staticmethod
+    def _compress(source: str, dest: str) -> None:
+        with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if time.time() >= self._rollover_at:
+            return os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0
+        return super().shouldRollover(record)
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self._rollover_at = self._next_midnight()
+
+
+def setup_logging() -> None:
+    """
+    Route all logging through one queue and a background writer thread.
+
+    Safe to call more than once; only the first call configures anything.
+    """
+    global _listener, _rate_limiter
+    if _listener is not None:
+        return
+
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    json_formatter = JSONFormatter()
+
+    console = logging.StreamHandler()
+    console.setFormatter(json_formatter if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+
+    audit_file = CompressingRotatingFileHandler(LOG_DIR / "audit.log", AUDIT_LOG_MAX_BYTES, AUDIT_LOG_BACKUPS)
+    audit_file.setFormatter(json_formatter)
+    audit_file.addFilter(logging.Filter("audit"))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = ThreadQueueHandler(log_queue)
+    _rate_limiter = RateLimitFilter()
+    queue_handler.addFilter(_rate_limiter)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(LOG_LEVEL)
+
+    _listener = QueueListener(log_queue, console, audit_file, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def logging_stats() -> Dict[str, Any]:
+    return {
+        "rate_limit_per_minute": LOG_RATE_LIMIT_PER_MINUTE,
+        "dropped": _rate_limiter.dropped if _rate_limiter else 0,
+        "running": _listener is not None,
+    }
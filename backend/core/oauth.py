@@ -3,10 +3,11 @@ Google OAuth 2.0 utilities for secure Authorization Code flow.
 """
 import os
 import secrets
-import httpx
 from typing import Dict, Optional
 from urllib.parse import urlencode
 
+from core.http_clients import get_http_client
+
 
 # OAuth Configuration
 GOOGLE_CLIENT_ID = os.environ.get("GOOGLE_CLIENT_ID", "")
@@ -72,21 +73,21 @@ async def exchange_code_for_token(code: str) -> Dict[str, any]:
     Raises:
         httpx.HTTPError: If token exchange fails
     """
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            GOOGLE_TOKEN_URL,
-            data={
-                "code": code,
-                "client_id": GOOGLE_CLIENT_ID,
-                "client_secret": GOOGLE_CLIENT_SECRET,
-                "redirect_uri": GOOGLE_REDIRECT_URI,
-                "grant_type": "authorization_code"
-            },
-            headers={"Content-Type": "application/x-www-form-urlencoded"}
-        )
-        
-        response.raise_for_status()
-        return response.json()
+    client = get_http_client("google")
+    response = await client.post(
+        GOOGLE_TOKEN_URL,
+        data={
+            "code": code,
+            "client_id": GOOGLE_CLIENT_ID,
+            "client_secret": GOOGLE_CLIENT_SECRET,
+            "redirect_uri": GOOGLE_REDIRECT_URI,
+            "grant_type": "authorization_code"
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    
+    response.raise_for_status()
+    return response.json()
 
 
 async def get_google_user_info(access_token: str) -> Dict[str, any]:
@@ -102,14 +103,14 @@ async def get_google_user_info(access_token: str) -> Dict[str, any]:
     Raises:
         httpx.HTTPError: If user info request fails
     """
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            GOOGLE_USERINFO_URL,
-            headers={"Authorization": f"Bearer {access_token}"}
-        )
-        
-        response.raise_for_status()
-        return response.json()
+    client = get_http_client("google")
+    response = await client.get(
+        GOOGLE_USERINFO_URL,
+        headers={"Authorization": f"Bearer {access_token}"}
+    )
+    
+    response.raise_for_status()
+    return response.json()
 
 
 def verify_state_token(request_state: str, stored_state: Optional[str]) -> bool:
@@ -0,0 +1,133 @@
+"""
+bcrypt hashing off the event loop.
+
+bcrypt takes a few hundred milliseconds per call by design and releases the
+GIL while it runs, so hashing and verification run in a small dedicated
+thread pool. A semaphore caps concurrent work at the pool size; callers beyond
+that wait (the wait is measured), and once too many are waiting new calls are
+rejected with PasswordHasherBusy instead of queueing without bound.
+
+The work factor is BCRYPT_ROUNDS. Hashes created with a different factor
+still verify, and `needs_rehash` tells the login path to upgrade them.
+"""
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import bcrypt
+
+logger = logging.getLogger(__name__)
+
+# Password Hashing Configuration
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+BCRYPT_WORKERS = int(os.environ.get("BCRYPT_WORKERS", str(min(4, os.cpu_count() or 1))))
+BCRYPT_MAX_WAITING = int(os.environ.get("BCRYPT_MAX_WAITING", "64"))
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash/verify calls are already waiting for the pool."""
+
+
+def hash_rounds(hashed_password: str) -> Optional[int]:
+    """Work factor of a stored bcrypt hash ($2b$12$... -> 12), or None if it isn't bcrypt."""
+    parts = hashed_password.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class PasswordHasher:
+    """
+    Bounded bcrypt worker pool.
+
+    Args:
+        rounds: bcrypt work factor for new hashes
+        workers: Threads (and maximum concurrent bcrypt calls)
+        max_waiting: Calls allowed to wait for a free worker before rejecting
+    """
+
+    def __init__(self, rounds: int = BCRYPT_ROUNDS, workers: int = BCRYPT_WORKERS, max_waiting: int = BCRYPT_MAX_WAITING):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_waiting = max_waiting
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self._queue_seconds_total = 0.0
+        self.queue_seconds_max = 0.0
+        self._run_seconds_total = 0.0
+
+    async def _run(self, fn, *args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers)
+        if self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise PasswordHasherBusy("Too many password operations in progress")
+
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        started_at = time.perf_counter()
+        waited = started_at - queued_at
+        self._queue_seconds_total += waited
+        self.queue_seconds_max = max(self.queue_seconds_max, waited)
+
+        self.running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self._run_seconds_total += time.perf_counter() - started_at
+            self._semaphore.release()
+
+    def _hash(self, password: str) -> str:
+        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=self.rounds)).decode("utf-8")
+
+    @staticmethod
+    def _verify(password: str, hashed_password: str) -> bool:
+        try:
+            return bcrypt.checkpw(password.encode("utf-8"), hashed_password.encode("utf-8"))
+        except Exception as e:
+            logger.error(f"Password verification error: {e}")
+            return False
+
+    async def hash(self, password: str) -> str:
+        """Hash a password with the configured work factor."""
+        return await self._run(self._hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Check a password against a stored hash (False for malformed hashes)."""
+        return await self._run(self._verify, password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """Whether a stored hash uses a different work factor than BCRYPT_ROUNDS."""
+        rounds = hash_rounds(hashed_password)
+        return rounds is not None and rounds != self.rounds
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rounds": self.rounds,
+            "workers": self.workers,
+            "running": self.running,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "avg_queue_ms": round(self._queue_seconds_total / self.completed * 1000, 2) if self.completed else 0.0,
+            "max_queue_ms": round(self.queue_seconds_max * 1000, 2),
+            "avg_hash_ms": round(self._run_seconds_total / self.completed * 1000, 2) if self.completed else 0.0,
+        }
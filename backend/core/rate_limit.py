@@ -1,18 +1,257 @@
 """
-Rate limiting configuration using SlowAPI.
+Rate limiting on async `limits` storages.
+
+Counters live in the storage named by RATE_LIMIT_STORAGE_URI, so every worker
+and every restart shares them:
+
+- memory:// (default): per process, fine for a single worker
+- mongodb://... / mongodb+srv://...: the `rate_limit_counters` / `rate_limit_windows`
+  collections, updated with atomic find-and-modify; expired entries are TTL'd
+- redis://... / rediss://...: any Redis-protocol server (via redis.asyncio)
+
+The default sliding-window-counter strategy keeps two counters per key and
+increments them atomically, so N workers enforce one limit instead of N.
+
+Storage calls are awaited, never made synchronously on the event loop (which
+slowapi's Limiter does). If the shared storage stops answering, limits fall
+back to per-process memory and the storage is probed again every
+RATE_LIMIT_RECHECK_SECONDS until it recovers, so an outage costs one timeout
+per interval rather than one per request.
+
+Besides per-IP route limits (`@limiter.limit`), `enforce_account_limit` caps
+attempts per account (e.g. per email) regardless of which IPs they come from.
 """
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
+import functools
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
 from fastapi import Request, Response
 from fastapi.responses import JSONResponse
-import os
+from limits import RateLimitItem, parse
+from limits.aio.strategies import STRATEGIES
+from limits.storage import storage_from_string
+from slowapi.util import get_remote_address
+
+logger = logging.getLogger(__name__)
+
+# Rate Limit Configuration
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_STORAGE_URI = os.environ.get("RATE_LIMIT_STORAGE_URI", "memory://")
+RATE_LIMIT_STRATEGY = os.environ.get("RATE_LIMIT_STRATEGY", "sliding-window-counter")
+RATE_LIMIT_STORAGE_TIMEOUT_MS = int(os.environ.get("RATE_LIMIT_STORAGE_TIMEOUT_MS", "250"))
+RATE_LIMIT_RECHECK_SECONDS = int(os.environ.get("RATE_LIMIT_RECHECK_SECONDS", "30"))
+RATE_LIMIT_DATABASE = os.environ.get("RATE_LIMIT_DATABASE") or os.environ.get("DB_NAME", "limits")
+
+TOO_MANY_REQUESTS = "Too many requests. Please try again later."
+
+
+class RateLimitExceeded(Exception):
+    """A request is over a limit; `retry_after` is the number of seconds until it resets."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(TOO_MANY_REQUESTS)
+        self.retry_after = retry_after
+
+
+def storage_options(uri: str, timeout_ms: int = RATE_LIMIT_STORAGE_TIMEOUT_MS) -> Dict[str, Any]:
+    """
+    Client options for the configured storage: short timeouts, since limit
+    checks run on the request path, plus collection names for MongoDB.
+    """
+    scheme = uri.split("://", 1)[0]
+    if scheme.startswith("mongodb"):
+        return {
+            "database_name": RATE_LIMIT_DATABASE,
+            "counter_collection_name": "rate_limit_counters",
+            "window_collection_name": "rate_limit_windows",
+            "serverSelectionTimeoutMS": timeout_ms,
+            "connectTimeoutMS": timeout_ms,
+            "socketTimeoutMS": timeout_ms,
+        }
+    if scheme.startswith("redis"):
+        return {
+            "implementation": "redispy",
+            "socket_timeout": timeout_ms / 1000,
+            "socket_connect_timeout": timeout_ms / 1000,
+        }
+    return {}
+
+
+class LimiterMetrics:
+    """Counts and timings of rate limit storage round trips."""
+
+    def __init__(self):
+        self.hits = 0
+        self.rejected = 0
+        self.errors = 0
+        self._seconds_total = 0.0
+        self.seconds_max = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.hits += 1
+        self._seconds_total += seconds
+        self.seconds_max = max(self.seconds_max, seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "avg_ms": round(self._seconds_total / self.hits * 1000, 3) if self.hits else 0.0,
+            "max_ms": round(self.seconds_max * 1000, 3),
+        }
+
+
+class AsyncLimiter:
+    """
+    Per-key rate limiter over a shared async storage, with an in-memory fallback.
+
+    Args:
+        storage_uri: limits storage URI (memory://, mongodb://, redis://, ...)
+        strategy: limits strategy name
+        enabled: When False every check passes
+        key_func: Derives the per-client key for route limits
+        timeout_ms: Storage connect/socket timeout
+        recheck_seconds: How often a failed storage is probed again
+    """
+
+    def __init__(
+        self,
+        storage_uri: str = RATE_LIMIT_STORAGE_URI,
+        strategy: str = RATE_LIMIT_STRATEGY,
+        enabled: bool = RATE_LIMIT_ENABLED,
+        key_func: Callable[[Request], str] = get_remote_address,
+        timeout_ms: int = RATE_LIMIT_STORAGE_TIMEOUT_MS,
+        recheck_seconds: int = RATE_LIMIT_RECHECK_SECONDS,
+    ):
+        self.enabled = enabled
+        self.key_func = key_func
+        self.storage_uri = storage_uri
+        self.strategy_name = strategy
+        self.recheck_seconds = recheck_seconds
+        self._storage = storage_from_string(f"async+{storage_uri}", **storage_options(storage_uri, timeout_ms))
+        self._strategy = STRATEGIES[strategy](self._storage)
+        self._fallback = STRATEGIES[strategy](storage_from_string("async+memory://"))
+        self._storage_failed_at: Optional[float] = None
+        self.metrics = LimiterMetrics()
+
+    @property
+    def using_fallback(self) -> bool:
+        return self._storage_failed_at is not None
+
+    async def _current_strategy(self):
+        if self._storage_failed_at is None:
+            return self._strategy
+        if time.monotonic() - self._storage_failed_at < self.recheck_seconds:
+            return self._fallback
+        # One probe per interval; concurrent requests keep using the fallback meanwhile
+        self._storage_failed_at = time.monotonic()
+        try:
+            if await self._storage.check():
+                logger.info("Rate limit storage recovered")
+                self._storage_failed_at = None
+                return self._strategy
+        except Exception:
+            pass
+        return self._fallback
+
+    async def hit(self, item: RateLimitItem, *identifiers: str) -> bool:
+        """
+        Count one hit against `identifiers` and report whether it is within the limit.
+
+        Args:
+            item: Parsed limit (see limits.parse)
+            identifiers: Key parts, e.g. ("route", "login", "1.2.3.4")
+
+        Returns:
+            True if the hit is allowed
+        """
+        strategy = await self._current_strategy()
+        started = time.perf_counter()
+        try:
+            allowed = await strategy.hit(item, *identifiers)
+        except Exception as e:
+            if strategy is self._fallback:
+                raise
+            self.metrics.errors += 1
+            logger.warning(f"Rate limit storage unreachable, using in-memory counters: {e}")
+            self._storage_failed_at = time.monotonic()
+            strategy = self._fallback
+            allowed = await strategy.hit(item, *identifiers)
+        finally:
+            self.metrics.record(time.perf_counter() - started)
+        if not allowed:
+            self.metrics.rejected += 1
+        return allowed
+
+    async def check(self, item: RateLimitItem, *identifiers: str) -> None:
+        """
+        Count one hit and raise RateLimitExceeded when it is over the limit.
+
+        Raises:
+            RateLimitExceeded: With the seconds until the window resets
+        """
+        if not self.enabled or await self.hit(item, *identifiers):
+            return
+        try:
+            reset_at, _ = await (await self._current_strategy()).get_window_stats(item, *identifiers)
+            retry_after = max(1, int(reset_at - time.time()))
+        except Exception:
+            retry_after = item.get_expiry()
+        raise RateLimitExceeded(retry_after)
+
+    def limit(self, limit_value: str):
+        """
+        Limit an async route per client (see key_func), like slowapi's `@limiter.limit`.
+
+        The route must take a starlette Request argument (any name).
+        """
+        item = parse(limit_value)
+
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                request = next((value for value in kwargs.values() if isinstance(value, Request)), None)
+                if request is not None:
+                    await self.check(item, "route", func.__name__, self.key_func(request))
+                return await func(*args, **kwargs)
+            return wrapper
+
+        return decorator
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "storage": self.storage_uri.split("://", 1)[0],
+            "strategy": self.strategy_name,
+            "using_fallback": self.using_fallback,
+            **self.metrics.stats(),
+        }
+
 
 # Initialize limiter
-limiter = Limiter(
-    key_func=get_remote_address,
-    enabled=os.environ.get("RATE_LIMIT_ENABLED", "true").lower() == "true"
-)
+limiter = AsyncLimiter()
+
+
+async def enforce_account_limit(scope: str, account: str, limit: str) -> None:
+    """
+    Count one attempt against an account and reject it once over the limit.
+
+    Keyed on the account rather than the client IP, so spreading attempts
+    across many addresses doesn't get around it.
+
+    Args:
+        scope: Name of the protected action (e.g. "login")
+        account: Account identifier, e.g. the email address (case-insensitive)
+        limit: Limit string such as "10/15minutes"
+
+    Raises:
+        RateLimitExceeded: When the account is over the limit
+    """
+    await limiter.check(parse(limit), "account", scope, account.strip().lower())
+
 
 # Rate limit handler
 async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded) -> Response:
@@ -22,7 +261,8 @@ async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded)
     return JSONResponse(
         status_code=429,
         content={
-            "detail": "Too many requests. Please try again later.",
-            "retry_after": exc.detail
-        }
+            "detail": TOO_MANY_REQUESTS,
+            "retry_after": exc.retry_after
+        },
+        headers={"Retry-After": str(exc.retry_after)}
     )
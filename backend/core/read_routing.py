@@ -0,0 +1,105 @@
+"""
+Per-route read preference routing for MongoDB.
+
+Checkout, carts and anything that must read its own writes stay on the
+primary. Heavy read-only routes (reports, dashboard, admin lists, exports)
+are grouped, and each group can be pointed at secondaries through
+environment variables, so a long report never competes with order writes:
+
+    READ_PREFERENCE_ANALYTICS=secondaryPreferred
+    READ_PREFERENCE_ADMIN_LISTS=secondaryPreferred
+    READ_MAX_STALENESS_SECONDS=90
+
+On a standalone server every preference behaves like primary.
+"""
+import logging
+import os
+from typing import Dict, Union
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+
+logger = logging.getLogger(__name__)
+
+# Read Routing Configuration
+READ_MAX_STALENESS_SECONDS = int(os.environ.get("READ_MAX_STALENESS_SECONDS", "90"))
+ROUTE_GROUP_DEFAULTS = {
+    "analytics": "secondaryPreferred",
+    "admin_lists": "secondaryPreferred",
+}
+
+# MongoDB rejects maxStalenessSeconds below 90
+MIN_MAX_STALENESS_SECONDS = 90
+
+ReadPreference = Union[Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest]
+
+_MODES = {
+    "primary": Primary,
+    "primarypreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondarypreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+def parse_read_preference(mode: str, max_staleness_seconds: int = READ_MAX_STALENESS_SECONDS) -> ReadPreference:
+    """
+    Build a read preference from its connection-string name.
+
+    Args:
+        mode: "primary", "primaryPreferred", "secondary", "secondaryPreferred" or "nearest"
+        max_staleness_seconds: Staleness bound for non-primary modes; 0 or less disables it
+
+    Returns:
+        pymongo read preference instance
+
+    Raises:
+        ValueError: If the mode name is unknown
+    """
+    cls = _MODES.get(mode.strip().lower())
+    if cls is None:
+        raise ValueError(f"Unknown read preference: {mode}")
+    if cls is Primary:
+        return Primary()
+    if max_staleness_seconds > 0:
+        return cls(max_staleness=max(max_staleness_seconds, MIN_MAX_STALENESS_SECONDS))
+    return cls()
+
+
+class ReadRouter:
+    """
+    Hands out database handles with the read preference configured for a route group.
+
+    Args:
+        client: Shared Motor client (handles share its connection pool)
+        db_name: Database name
+    """
+
+    def __init__(self, client: AsyncIOMotorClient, db_name: str):
+        self.client = client
+        self.db_name = db_name
+        self._databases: Dict[str, AsyncIOMotorDatabase] = {}
+        self.preferences: Dict[str, str] = {}
+
+    def database(self, group: str) -> AsyncIOMotorDatabase:
+        """
+        Get the database handle for a route group.
+
+        The group's mode is read from READ_PREFERENCE_<GROUP> (falling back to
+        ROUTE_GROUP_DEFAULTS, then primary); an invalid value logs and uses primary.
+        """
+        if group not in self._databases:
+            mode = os.environ.get(f"READ_PREFERENCE_{group.upper()}", ROUTE_GROUP_DEFAULTS.get(group, "primary"))
+            try:
+                preference = parse_read_preference(mode)
+            except ValueError as e:
+                logger.error(f"{e} for route group {group}; using primary")
+                preference = Primary()
+            self._databases[group] = self.client.get_database(self.db_name, read_preference=preference)
+            self.preferences[group] = preference.mongos_mode
+            if preference.max_staleness != -1:
+                self.preferences[group] += f" (maxStalenessSeconds={preference.max_staleness})"
+        return self._databases[group]
+
+    def stats(self) -> Dict[str, str]:
+        return dict(self.preferences)
@@ -7,10 +7,13 @@ import hashlib
 import secrets
 import jwt
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
 import os
 
-# JWT Configuration
-JWT_SECRET = os.environ.get("JWT_SECRET_KEY", "your-secret-key-change-in-production")
+from utils.dates import as_datetime
+
+# JWT Configuration (no default: without a secret no JWT is issued or accepted)
+JWT_SECRET = os.environ.get("JWT_SECRET_KEY")
 JWT_ALGORITHM = "HS256"
 
 # Session Configuration
@@ -22,46 +25,34 @@ MAX_FAILED_ATTEMPTS = 5
 LOCKOUT_DURATION_MINUTES = 15
 
 
-async def check_account_lockout(db: AsyncIOMotorDatabase, email: str, collection: str = "users") -> tuple[bool, Optional[datetime]]:
+def _signing_key() -> str:
+    if not JWT_SECRET:
+        raise RuntimeError("JWT_SECRET_KEY is not set")
+    return JWT_SECRET
+
+
+def active_lock(account: Optional[dict]) -> Optional[datetime]:
     """
-    Check if an account is currently locked due to failed login attempts.
+    Get the end of an account's lockout, if it is still in force.
     
     Args:
-        db: MongoDB database instance
-        email: User email to check
-        collection: Collection name ("users" or "admin_users")
+        account: User document (or None)
     
     Returns:
-        Tuple of (is_locked: bool, locked_until: Optional[datetime])
+        locked_until if the account is locked right now, None otherwise
     """
-    user = await db[collection].find_one({"email": email})
-    
-    if not user:
-        return False, None
-    
-    locked_until = user.get("locked_until")
-    
-    if locked_until:
-        # Check if lock has expired
-        if isinstance(locked_until, str):
-            locked_until = datetime.fromisoformat(locked_until)
-        
-        if datetime.now(timezone.utc) < locked_until:
-            return True, locked_until
-        else:
-            # Lock expired, clear it
-            await db[collection].update_one(
-                {"email": email},
-                {"$set": {"locked_until": None, "failed_login_attempts": 0}}
-            )
-            return False, None
-    
-    return False, None
+    locked_until = as_datetime((account or {}).get("locked_until"))
+    if locked_until and datetime.now(timezone.utc) < locked_until:
+        return locked_until
+    return None
 
 
-async def record_failed_login(db: AsyncIOMotorDatabase, email: str, collection: str = "users") -> int:
+async def get_login_account(db: AsyncIOMotorDatabase, email: str, collection: str = "users") -> tuple[Optional[dict], Optional[datetime]]:
     """
-    Record a failed login attempt and lock account if threshold exceeded.
+    Load an account for a login attempt and check its lockout in one read.
+    
+    An expired lock is simply ignored here; the next failed attempt or
+    successful login resets it (see record_failed_login / complete_login).
     
     Args:
         db: MongoDB database instance
@@ -69,43 +60,95 @@ async def record_failed_login(db: AsyncIOMotorDatabase, email: str, collection:
         collection: Collection name ("users" or "admin_users")
     
     Returns:
-        Number of failed attempts
+        Tuple of (account or None, locked_until if currently locked)
     """
-    user = await db[collection].find_one({"email": email})
-    
-    if not user:
-        return 0
+    account = await db[collection].find_one({"email": email}, {"_id": 0})
+    return account, active_lock(account)
+
+
+async def record_failed_login(db: AsyncIOMotorDatabase, email: str, collection: str = "users") -> tuple[int, Optional[datetime]]:
+    """
+    Atomically count a failed login attempt and lock the account at the threshold.
     
-    failed_attempts = user.get("failed_login_attempts", 0) + 1
+    A single pipeline update increments the counter (restarting it if an old
+    lock has expired) and sets locked_until once MAX_FAILED_ATTEMPTS is
+    reached, so parallel attempts can neither lose increments nor extend an
+    existing lock.
     
-    update_data = {"failed_login_attempts": failed_attempts}
+    Args:
+        db: MongoDB database instance
+        email: User email
+        collection: Collection name ("users" or "admin_users")
     
-    # Lock account if threshold exceeded
-    if failed_attempts >= MAX_FAILED_ATTEMPTS:
-        locked_until = datetime.now(timezone.utc) + timedelta(minutes=LOCKOUT_DURATION_MINUTES)
-        update_data["locked_until"] = locked_until.isoformat()
+    Returns:
+        Tuple of (failed attempts, locked_until if the account is now locked)
+    """
+    now = datetime.now(timezone.utc)
+    lock_active = {"$gt": ["$locked_until", now]}
+    lock_expired = {"$and": [{"$ne": [{"$ifNull": ["$locked_until", None]}, None]}, {"$not": [lock_active]}]}
     
-    await db[collection].update_one(
+    account = await db[collection].find_one_and_update(
         {"email": email},
-        {"$set": update_data}
+        [
+            {"$set": {
+                "failed_login_attempts": {"$cond": [
+                    lock_expired,
+                    1,
+                    {"$add": [{"$ifNull": ["$failed_login_attempts", 0]}, 1]}
+                ]}
+            }},
+            {"$set": {
+                "locked_until": {"$cond": [
+                    lock_active,
+                    "$locked_until",
+                    {"$cond": [
+                        {"$gte": ["$failed_login_attempts", MAX_FAILED_ATTEMPTS]},
+                        now + timedelta(minutes=LOCKOUT_DURATION_MINUTES),
+                        None
+                    ]}
+                ]}
+            }},
+        ],
+        projection={"_id": 0, "failed_login_attempts": 1, "locked_until": 1},
+        return_document=ReturnDocument.AFTER
     )
     
-    return failed_attempts
+    if not account:
+        return 0, None
+    return account["failed_login_attempts"], active_lock(account)
 
 
-async def clear_failed_attempts(db: AsyncIOMotorDatabase, email: str, collection: str = "users"):
+async def complete_login(db: AsyncIOMotorDatabase, account: dict, collection: str = "users", extra_updates: Optional[dict] = None) -> bool:
     """
-    Clear failed login attempts on successful authentication.
+    Accept a verified login: clear failed attempts, in the same write as any other account updates.
+    
+    The lockout checked by get_login_account was read before the (slow)
+    password check, so parallel guesses all get past it. This write only
+    matches while the account is not locked and still has the password hash
+    the login was verified against; if a parallel failure locked the account
+    or a password reset landed in between, nothing is written (so neither the
+    lock nor the new hash is overwritten) and the login must be rejected.
     
     Args:
         db: MongoDB database instance
-        email: User email
+        account: Account document loaded by get_login_account
         collection: Collection name ("users" or "admin_users")
+        extra_updates: Additional fields to $set (e.g. a rehashed password)
+    
+    Returns:
+        True if the login may proceed, False if it must be rejected
     """
-    await db[collection].update_one(
-        {"email": email},
-        {"$set": {"failed_login_attempts": 0, "locked_until": None}}
+    now = datetime.now(timezone.utc)
+    result = await db[collection].update_one(
+        {
+            "email": account["email"],
+            "hashed_password": account["hashed_password"],
+            # Legacy ISO-string locks (see migrate_timestamps.py) were already checked by get_login_account
+            "$or": [{"locked_until": None}, {"locked_until": {"$lte": now}}, {"locked_until": {"$type": "string"}}],
+        },
+        {"$set": {**(extra_updates or {}), "failed_login_attempts": 0, "locked_until": None}}
     )
+    return result.matched_count == 1
 
 
 def hash_reset_code(code: str) -> str:
@@ -135,7 +178,7 @@ def verify_reset_code(plain_code: str, hashed_code: str) -> bool:
     return hash_reset_code(plain_code) == hashed_code
 
 
-def create_access_token(user_id: str, is_admin: bool = False, expires_minutes: Optional[int] = None) -> str:
+def create_access_token(user_id: str, is_admin: bool = False, expires_minutes: Optional[int] = None, claims: Optional[dict] = None) -> str:
     """
     Create a JWT access token.
     
@@ -143,6 +186,7 @@ def create_access_token(user_id: str, is_admin: bool = False, expires_minutes: O
         user_id: User ID to encode in token
         is_admin: Whether user is an admin
         expires_minutes: Token expiry in minutes (default: ACCESS_TOKEN_EXPIRE_MINUTES)
+        claims: Extra claims to include (e.g. email and name)
     
     Returns:
         JWT token string
@@ -157,19 +201,22 @@ def create_access_token(user_id: str, is_admin: bool = False, expires_minutes: O
         "is_admin": is_admin,
         "exp": expire,
         "iat": datetime.now(timezone.utc),
-        "type": "access"
+        "type": "access",
+        **(claims or {})
     }
     
-    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    return jwt.encode(payload, _signing_key(), algorithm=JWT_ALGORITHM)
 
 
-def create_refresh_token(user_id: str, expires_hours: Optional[int] = None) -> str:
+def create_refresh_token(user_id: str, expires_hours: Optional[int] = None, jti: Optional[str] = None, family: Optional[str] = None) -> str:
     """
     Create a JWT refresh token.
     
     Args:
         user_id: User ID to encode in token
         expires_hours: Token expiry in hours (default: REFRESH_TOKEN_EXPIRE_HOURS)
+        jti: Token ID recorded server-side so the token can be revoked
+        family: ID shared by all tokens rotated from the same login
     
     Returns:
         JWT token string
@@ -185,8 +232,12 @@ def create_refresh_token(user_id: str, expires_hours: Optional[int] = None) -> s
         "iat": datetime.now(timezone.utc),
         "type": "refresh"
     }
+    if jti:
+        payload["jti"] = jti
+    if family:
+        payload["family"] = family
     
-    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    return jwt.encode(payload, _signing_key(), algorithm=JWT_ALGORITHM)
 
 
 def verify_token(token: str, token_type: str = "access") -> Optional[dict]:
@@ -198,8 +249,10 @@ def verify_token(token: str, token_type: str = "access") -> Optional[dict]:
         token_type: Expected token type ("access" or "refresh")
     
     Returns:
-        Decoded payload if valid, None otherwise
+        Decoded payload if valid, None otherwise (always None without JWT_SECRET_KEY)
     """
+    if not JWT_SECRET:
+        return None
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         
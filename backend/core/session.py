@@ -14,6 +14,11 @@ IS_PRODUCTION = ENVIRONMENT == "production"
 COOKIE_NAME = "session_token"
 COOKIE_MAX_AGE = 7 * 24 * 60 * 60  # 7 days
 
+# JWT auth mode cookies (the refresh token is only sent to the auth routes)
+ACCESS_COOKIE_NAME = "access_token"
+REFRESH_COOKIE_NAME = "refresh_token"
+REFRESH_COOKIE_PATH = "/api/auth"
+
 
 def create_session_cookie(
     response: Response,
@@ -58,6 +63,53 @@ def create_session_cookie(
     )
 
 
+def create_token_cookies(
+    response: Response,
+    access_token: str,
+    refresh_token: str,
+    access_max_age: int,
+    refresh_max_age: int
+) -> None:
+    """
+    Set the JWT access and refresh token cookies (same attributes as the session cookie).
+    
+    Args:
+        response: FastAPI Response object
+        access_token: Signed access token
+        refresh_token: Signed refresh token
+        access_max_age: Access cookie expiration in seconds
+        refresh_max_age: Refresh cookie expiration in seconds
+    """
+    cookie_domain = os.environ.get("COOKIE_DOMAIN", ".srfashiondubai.com") if IS_PRODUCTION else None
+    
+    for key, value, path, max_age in (
+        (ACCESS_COOKIE_NAME, access_token, "/", access_max_age),
+        (REFRESH_COOKIE_NAME, refresh_token, REFRESH_COOKIE_PATH, refresh_max_age),
+    ):
+        response.set_cookie(
+            key=key,
+            value=value,
+            httponly=True,
+            secure=IS_PRODUCTION,
+            samesite="lax",
+            path=path,
+            max_age=max_age,
+            domain=cookie_domain
+        )
+
+
+def clear_token_cookies(response: Response) -> None:
+    """
+    Clear the JWT access and refresh token cookies (logout).
+    
+    Args:
+        response: FastAPI Response object
+    """
+    cookie_domain = os.environ.get("COOKIE_DOMAIN") if IS_PRODUCTION else None
+    response.delete_cookie(key=ACCESS_COOKIE_NAME, path="/", domain=cookie_domain)
+    response.delete_cookie(key=REFRESH_COOKIE_NAME, path=REFRESH_COOKIE_PATH, domain=cookie_domain)
+
+
 def create_state_cookie(
     response: Response,
     state_token: str
@@ -0,0 +1,148 @@
+"""
+In-process cache of resolved sessions.
+
+Resolving a session token costs a `user_sessions` lookup plus an `admin_users`
+and/or `users` lookup on every authenticated request. The resolved principal
+(or the fact that the token is unknown) is cached per worker, keyed by a
+SHA-256 of the token so raw tokens are never kept as keys.
+
+Invalidation (logout, password reset, lockout) only reaches the worker that
+handles it; other workers drop the entry when it expires, so
+SESSION_CACHE_SECONDS bounds how long a revoked session can still be served.
+"""
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, Optional, Set, Tuple, Type
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import BaseModel
+
+from core.sessions import find_session, hash_session_token
+from utils.cache import TTLCache
+from utils.dates import as_datetime
+
+logger = logging.getLogger(__name__)
+
+# Session Cache Configuration
+SESSION_CACHE_SECONDS = float(os.environ.get("SESSION_CACHE_SECONDS", "30"))
+SESSION_CACHE_NEGATIVE_SECONDS = float(os.environ.get("SESSION_CACHE_NEGATIVE_SECONDS", "5"))
+SESSION_CACHE_MAXSIZE = int(os.environ.get("SESSION_CACHE_MAXSIZE", "10000"))
+
+
+def token_key(token: str) -> str:
+    """Cache key for a session token (the same hash the session store indexes)."""
+    return hash_session_token(token)
+
+
+class SessionCache:
+    """
+    Resolves session tokens to admin or customer models, with TTL+LRU caching.
+
+    Args:
+        db: MongoDB database instance
+        admin_model: Model built from `admin_users` documents
+        user_model: Model built from `users` documents
+        ttl_seconds: Lifetime of a resolved principal (capped at the session's expiry)
+        negative_ttl_seconds: Lifetime of an "unknown or expired token" entry
+        maxsize: Maximum number of cached tokens
+    """
+
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        admin_model: Type[BaseModel],
+        user_model: Type[BaseModel],
+        ttl_seconds: float = SESSION_CACHE_SECONDS,
+        negative_ttl_seconds: float = SESSION_CACHE_NEGATIVE_SECONDS,
+        maxsize: int = SESSION_CACHE_MAXSIZE
+    ):
+        self.db = db
+        self.admin_model = admin_model
+        self.user_model = user_model
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._cache = TTLCache(ttl_seconds=ttl_seconds, maxsize=maxsize)
+        self._keys_by_user: Dict[str, Set[str]] = {}
+        self.negative_hits = 0
+
+    async def _load(self, token: str) -> Tuple[Optional[BaseModel], Optional[datetime]]:
+        session_doc = await find_session(self.db, token)
+        if not session_doc:
+            return None, None
+
+        expires_at = as_datetime(session_doc.get("expires_at"))
+        if not expires_at or expires_at < datetime.now(timezone.utc):
+            return None, None
+
+        # Admin sessions take precedence, as /auth/me always checked them first
+        admin_doc = await self.db.admin_users.find_one({"user_id": session_doc["user_id"]}, {"_id": 0})
+        if admin_doc:
+            return self.admin_model(**admin_doc), expires_at
+        user_doc = await self.db.users.find_one({"user_id": session_doc["user_id"]}, {"_id": 0})
+        if user_doc:
+            return self.user_model(**user_doc), expires_at
+        return None, None
+
+    async def resolve(self, token: Optional[str]) -> Optional[BaseModel]:
+        """
+        Get the admin or customer a session token belongs to.
+
+        Args:
+            token: Session token from the cookie or Authorization header
+
+        Returns:
+            An admin_model or user_model instance, or None for a missing, unknown or expired token
+        """
+        if not token:
+            return None
+        key = token_key(token)
+        loaded = False
+        expires_at = None
+
+        async def load() -> Optional[BaseModel]:
+            nonlocal loaded, expires_at
+            loaded = True
+            principal, expires_at = await self._load(token)
+            return principal
+
+        principal = await self._cache.get_or_load(key, load)
+        if not loaded:
+            if principal is None:
+                self.negative_hits += 1
+            return principal
+
+        if principal is None:
+            self._cache.set(key, None, self.negative_ttl_seconds)
+        else:
+            remaining = (expires_at - datetime.now(timezone.utc)).total_seconds()
+            if remaining < self._cache.ttl_seconds:
+                self._cache.set(key, principal, max(remaining, 0))
+            self._track(principal.user_id, key)
+        return principal
+
+    def _track(self, user_id: str, key: str) -> None:
+        keys = self._keys_by_user.setdefault(user_id, set())
+        keys.add(key)
+        if len(self._keys_by_user) > self._cache.maxsize:
+            # Drop keys the LRU has already evicted so the index stays bounded
+            for tracked_user, tracked in list(self._keys_by_user.items()):
+                tracked.intersection_update(k for k in tracked if k in self._cache)
+                if not tracked:
+                    del self._keys_by_user[tracked_user]
+
+    def invalidate_token(self, token: Optional[str]) -> None:
+        """Forget one token (logout)."""
+        if token:
+            self._cache.delete(token_key(token))
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Forget every cached token of a user (password reset, lockout, new admin login)."""
+        for key in self._keys_by_user.pop(user_id, ()):
+            self._cache.delete(key)
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._keys_by_user.clear()
+
+    def stats(self):
+        return {**self._cache.stats(), "negative_hits": self.negative_hits, "tracked_users": len(self._keys_by_user)}
@@ -0,0 +1,101 @@
+"""
+Opaque session token store (`user_sessions`).
+
+Only a SHA-256 of each token is stored (`token_hash`, unique index), so a
+database dump doesn't contain usable tokens. `expires_at` is a BSON date with
+a TTL index, letting MongoDB delete expired sessions on its own. Each user
+keeps at most MAX_SESSIONS_PER_USER sessions; creating one more evicts the
+oldest.
+
+Sessions written before token hashing have a raw `session_token` and are
+still found through it until migrate_sessions.py converts them.
+"""
+import hashlib
+import os
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+# Session Store Configuration
+SESSION_TTL_DAYS = int(os.environ.get("SESSION_TTL_DAYS", "7"))
+MAX_SESSIONS_PER_USER = int(os.environ.get("MAX_SESSIONS_PER_USER", "5"))
+SESSIONS_LEGACY_LOOKUP = os.environ.get("SESSIONS_LEGACY_LOOKUP", "true").lower() == "true"
+
+
+def hash_session_token(token: str) -> str:
+    """SHA-256 hex digest of a session token, as stored in `token_hash`."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase) -> None:
+    """Token lookup, TTL expiry and per-user listing indexes for `user_sessions`."""
+    sessions = db.user_sessions
+    await sessions.create_index(
+        "token_hash", unique=True, name="token_hash",
+        partialFilterExpression={"token_hash": {"$type": "string"}}
+    )
+    # Only BSON dates expire; migrate_timestamps.py / migrate_sessions.py convert old string values
+    await sessions.create_index("expires_at", expireAfterSeconds=0, name="expires_at_ttl")
+    await sessions.create_index([("user_id", 1), ("created_at", -1)], name="user_id_created_at")
+    await sessions.create_index(
+        "session_token", name="session_token_legacy",
+        partialFilterExpression={"session_token": {"$type": "string"}}
+    )
+
+
+async def create_session(db: AsyncIOMotorDatabase, user_id: str, ttl_days: int = SESSION_TTL_DAYS) -> Tuple[str, datetime]:
+    """
+    Create a session for a user, evicting their oldest sessions beyond the cap.
+
+    Args:
+        db: MongoDB database instance
+        user_id: Owner of the session
+        ttl_days: Session lifetime
+
+    Returns:
+        Tuple of (session_token, expires_at); the token itself is never stored
+    """
+    session_token = f"sess_{uuid.uuid4().hex}"
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(days=ttl_days)
+
+    await db.user_sessions.insert_one({
+        "session_id": f"sess_{uuid.uuid4().hex[:16]}",
+        "user_id": user_id,
+        "token_hash": hash_session_token(session_token),
+        "expires_at": expires_at,
+        "created_at": now,
+    })
+
+    if MAX_SESSIONS_PER_USER > 0:
+        overflow = await db.user_sessions.find(
+            {"user_id": user_id}, {"_id": 1}
+        ).sort("created_at", -1).skip(MAX_SESSIONS_PER_USER).to_list(None)
+        if overflow:
+            await db.user_sessions.delete_many({"_id": {"$in": [doc["_id"] for doc in overflow]}})
+
+    return session_token, expires_at
+
+
+async def find_session(db: AsyncIOMotorDatabase, token: str) -> Optional[Dict[str, Any]]:
+    """Look up a session by token (user_id and expires_at only)."""
+    projection = {"_id": 0, "user_id": 1, "expires_at": 1}
+    session_doc = await db.user_sessions.find_one({"token_hash": hash_session_token(token)}, projection)
+    if session_doc is None and SESSIONS_LEGACY_LOOKUP:
+        session_doc = await db.user_sessions.find_one({"session_token": token}, projection)
+    return session_doc
+
+
+async def delete_session(db: AsyncIOMotorDatabase, token: str) -> None:
+    """Delete one session (logout)."""
+    await db.user_sessions.delete_many({"$or": [
+        {"token_hash": hash_session_token(token)},
+        {"session_token": token},
+    ]})
+
+
+async def delete_user_sessions(db: AsyncIOMotorDatabase, user_id: str) -> None:
+    """Delete every session of a user (password reset, new admin login)."""
+    await db.user_sessions.delete_many({"user_id": user_id})
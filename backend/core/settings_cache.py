@@ -0,0 +1,127 @@
+"""
+Process-wide cache of the store settings document.
+
+Settings are read on almost every storefront and admin request but change a
+few times a year, so each worker keeps them in memory. Every write bumps a
+`version` field; a background task compares versions every few seconds and
+reloads only when another worker has changed the settings.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Type
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import BaseModel, ValidationError
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+# Settings Cache Configuration
+SETTINGS_REFRESH_SECONDS = float(os.environ.get("SETTINGS_REFRESH_SECONDS", "5"))
+
+
+class SettingsCache:
+    """
+    Keeps the single settings document of ``collection`` in memory.
+
+    Args:
+        db: MongoDB database instance
+        model: Pydantic model the document is validated into; its defaults apply until loaded
+        collection: Collection holding the settings document
+        refresh_seconds: How often to check for changes made by other workers
+    """
+
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        model: Type[BaseModel],
+        collection: str = "settings",
+        refresh_seconds: float = SETTINGS_REFRESH_SECONDS
+    ):
+        self.collection = db[collection]
+        self.model = model
+        self.refresh_seconds = refresh_seconds
+        self._current: BaseModel = model()
+        self._version = 0
+        self._loaded = False
+        self._task: Optional[asyncio.Task] = None
+        self.reloads = 0
+
+    @property
+    def current(self) -> BaseModel:
+        """The cached settings (model defaults if nothing is stored yet)."""
+        return self._current
+
+    async def load(self) -> BaseModel:
+        """Read the settings document and replace the cached copy."""
+        doc = await self.collection.find_one({}, {"_id": 0})
+        self._apply(doc or {})
+        return self._current
+
+    def _apply(self, doc: Dict[str, Any]) -> None:
+        try:
+            self._current = self.model(**doc)
+        except ValidationError as e:
+            # Keep serving the last good settings rather than failing every request
+            logger.error(f"Ignoring invalid settings document: {e}")
+        self._version = doc.get("version", 0)
+        self._loaded = True
+        self.reloads += 1
+
+    async def update(self, values: Dict[str, Any]) -> BaseModel:
+        """
+        Persist new settings, bump the version and refresh this worker immediately.
+
+        Args:
+            values: Settings fields to store
+
+        Returns:
+            The updated settings
+        """
+        values = {**values, "updated_at": datetime.now(timezone.utc)}
+        values.pop("version", None)
+        doc = await self.collection.find_one_and_update(
+            {},
+            {"$set": values, "$inc": {"version": 1}},
+            projection={"_id": 0},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self._apply(doc)
+        return self._current
+
+    async def refresh_if_changed(self) -> bool:
+        """Reload when another worker has stored a newer version. Returns True if reloaded."""
+        doc = await self.collection.find_one({}, {"_id": 0, "version": 1})
+        if self._loaded and (doc or {}).get("version", 0) == self._version:
+            return False
+        await self.load()
+        return True
+
+    def start(self) -> None:
+        """Start the background version check (must be called from a running event loop)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._poll())
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.refresh_if_changed()
+            except Exception as e:
+                logger.warning(f"Settings version check failed: {e}")
+
+    async def stop(self) -> None:
+        """Stop the background version check."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"version": self._version, "loaded": self._loaded, "reloads": self.reloads, "refresh_seconds": self.refresh_seconds}
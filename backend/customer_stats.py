@@ -0,0 +1,151 @@
+"""
+Customer Stats Module
+Keeps order_count, total_spent, avg_order_value and last_order_at on each user.
+
+Stats follow the same confirmation events as the product sales counters: an
+order is added when it is confirmed and removed if it is later cancelled
+(sales_counters calls in here after flipping the order's `sales_counted`
+flag, so each order is applied at most once). The update runs as a single
+pipeline so the average is always derived from the stored totals.
+
+`rebuild` first runs the sales counter backfill, which stamps `sales_counted`
+on legacy confirmed orders, so every order it counts is also one that a
+later cancellation will uncount.
+
+Usage:
+    python customer_stats.py rebuild
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from pymongo import UpdateOne
+
+from utils.dates import as_datetime
+
+logger = logging.getLogger(__name__)
+
+STAT_FIELDS = ["order_count", "total_spent", "avg_order_value", "last_order_at"]
+
+
+async def ensure_indexes(db) -> None:
+    """One index per sortable stat; created_at breaks ties so pages stay stable."""
+    for field in STAT_FIELDS:
+        await db.users.create_index([(field, -1), ("created_at", -1)], name=f"{field}_created_at")
+
+
+def _stats_pipeline(sign: int, total: float, last_order_at: Any):
+    return [
+        {"$set": {
+            "order_count": {"$max": [0, {"$add": [{"$ifNull": ["$order_count", 0]}, sign]}]},
+            "total_spent": {"$round": [{"$max": [0, {"$add": [{"$ifNull": ["$total_spent", 0]}, sign * total]}]}, 2]},
+            "last_order_at": last_order_at,
+        }},
+        {"$set": {
+            "avg_order_value": {"$cond": [
+                {"$gt": ["$order_count", 0]},
+                {"$round": [{"$divide": ["$total_spent", "$order_count"]}, 2]},
+                0
+            ]}
+        }},
+    ]
+
+
+async def apply_order(db, order: Dict[str, Any], sign: int) -> None:
+    """
+    Add (sign=1) or remove (sign=-1) one order from its customer's stats.
+
+    Args:
+        db: MongoDB database instance
+        order: Order with user_id, total and created_at
+        sign: 1 when the order is confirmed, -1 when it is cancelled
+    """
+    user_id = order.get("user_id")
+    if not user_id:
+        return  # Guest checkout
+
+    if sign > 0:
+        last_order_at = {"$max": ["$last_order_at", as_datetime(order.get("created_at"))]}
+    else:
+        # A max can't be decremented; take it from the newest order still counted
+        latest = await db.orders.find_one(
+            {"user_id": user_id, "sales_counted": True},
+            {"_id": 0, "created_at": 1},
+            sort=[("created_at", -1)]
+        )
+        last_order_at = {"$literal": latest["created_at"] if latest else None}
+
+    try:
+        await db.users.update_one({"user_id": user_id}, _stats_pipeline(sign, float(order.get("total") or 0), last_order_at))
+    except Exception as e:
+        logger.error(f"Failed to update customer stats for {user_id}: {e}")
+
+
+async def rebuild(db) -> int:
+    """
+    Recompute every customer's stats from their counted orders.
+
+    Run sales_counters.backfill first so legacy confirmed orders are counted
+    (the CLI does both).
+
+    Returns:
+        Number of customers with at least one confirmed order
+    """
+    # Reset everyone, then set the customers who have orders
+    await db.users.update_many(
+        {},
+        {"$set": {"order_count": 0, "total_spent": 0, "avg_order_value": 0, "last_order_at": None}}
+    )
+
+    rows = await db.orders.aggregate([
+        {"$match": {"user_id": {"$ne": None}, "sales_counted": True}},
+        {"$group": {
+            "_id": "$user_id",
+            "order_count": {"$sum": 1},
+            "total_spent": {"$sum": "$total"},
+            "last_order_at": {"$max": "$created_at"},
+        }}
+    ]).to_list(None)
+
+    operations = [
+        UpdateOne({"user_id": row["_id"]}, {"$set": {
+            "order_count": row["order_count"],
+            "total_spent": round(row["total_spent"], 2),
+            "avg_order_value": round(row["total_spent"] / row["order_count"], 2),
+            "last_order_at": row["last_order_at"],
+        }})
+        for row in rows
+    ]
+    for start in range(0, len(operations), 1000):
+        await db.users.bulk_write(operations[start:start + 1000], ordered=False)
+    return len(rows)
+
+
+async def _main() -> None:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    import sales_counters
+
+    load_dotenv()
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    db = client[os.environ['DB_NAME']]
+    started = datetime.now(timezone.utc)
+    try:
+        await ensure_indexes(db)
+        backfilled = await sales_counters.backfill(db)
+        customers = await rebuild(db)
+        print(f"Counted {backfilled} legacy orders")
+        print(f"Rebuilt stats for {customers} customers in {(datetime.now(timezone.utc) - started).total_seconds():.1f}s")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] != ["rebuild"]:
+        sys.exit("Usage: python customer_stats.py rebuild")
+    asyncio.run(_main())
@@ -0,0 +1,388 @@
+"""
+Transactional Email Templates
+Precompiled Jinja2 templates for order and account emails.
+
+Templates are minified and compiled once at import time, and the shared
+header/footer are rendered a single time and reused as static fragments.
+Every email renders to an HTML body and a plain-text alternative.
+Orders can be passed as Pydantic models or raw Mongo documents; fields are
+read directly, without a ``model_dump()`` copy.
+"""
+import re
+from typing import Any, Dict, NamedTuple
+
+from jinja2 import Environment, StrictUndefined
+from markupsafe import Markup
+
+SITE_URL = "https://srfashiondubai.com"
+
+
+class RenderedEmail(NamedTuple):
+    html: str
+    text: str
+
+
+def minify_html(source: str) -> str:
+    """Collapse whitespace between tags and inside text runs."""
+    source = re.sub(r">\s+<", "><", source)
+    source = re.sub(r">\s+(?=\{[{%])", ">", source)
+    source = re.sub(r"([}%]\})\s+<", r"\1<", source)
+    source = re.sub(r"\s{2,}", " ", source)
+    return source.strip()
+
+
+def _format_money(value: Any) -> str:
+    return f"{float(value or 0):.2f}"
+
+
+def _line_total(item: Any) -> str:
+    sale_price = _field(item, "sale_price")
+    price = sale_price if sale_price else _field(item, "price")
+    return _format_money(float(price) * _field(item, "quantity"))
+
+
+def _field(obj: Any, name: str, default: Any = None) -> Any:
+    """Read a field from a model or a dict without copying it."""
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+_env = Environment(autoescape=True, undefined=StrictUndefined, trim_blocks=True, lstrip_blocks=True)
+_env.filters["money"] = _format_money
+_env.filters["line_total"] = _line_total
+_env.globals["field"] = _field
+_env.globals["site_url"] = SITE_URL
+
+# ==================== STATIC FRAGMENTS ====================
+
+EMAIL_HEADER = Markup(minify_html("""
+    <div style="background: linear-gradient(135deg, #db2777 0%, #ec4899 50%, #f43f5e 100%); color: #ffffff; padding: 40px 20px; text-align: center; border-radius: 12px 12px 0 0;">
+        <h1 style="margin: 0; font-size: 24px; letter-spacing: 4px; text-transform: uppercase; font-weight: 700;">DUBAI SR</h1>
+        <p style="margin: 5px 0 0; opacity: 0.9; font-size: 12px; letter-spacing: 2px;">Premium Ethnic Fashion</p>
+    </div>
+"""))
+
+EMAIL_FOOTER = Markup(minify_html(f"""
+    <div style="background: #FAFAF9; padding: 25px; text-align: center; font-size: 11px; color: #6b7280; border-top: 1px solid #f3f4f6; border-radius: 0 0 12px 12px;">
+        <p>&copy; 2026 Dubai SR. All rights reserved.</p>
+        <p>3192-A Behind Golcha Cinema, Partap Street, Darya Ganj, Delhi-2</p>
+        <p>Premium Fabrics | Traditional Craftsmanship | Modern Elegance</p>
+        <p style="margin-top: 10px;">
+            <a href="{SITE_URL}/returns-policy" style="color: #db2777; text-decoration: none; font-weight: 600;">Returns &amp; Exchanges</a> |
+            <a href="{SITE_URL}/shipping-policy" style="color: #db2777; text-decoration: none; font-weight: 600;">Shipping Information</a>
+        </p>
+        <p style="margin-top: 10px;">Contact us: srdubaifashion@gmail.com | WhatsApp: +91 85953 71004</p>
+    </div>
+"""))
+
+TEXT_FOOTER = """
+--
+Dubai SR - Premium Ethnic Fashion
+3192-A Behind Golcha Cinema, Partap Street, Darya Ganj, Delhi-2
+Contact us: srdubaifashion@gmail.com | WhatsApp: +91 85953 71004
+"""
+
+_env.globals["header"] = EMAIL_HEADER
+_env.globals["footer"] = EMAIL_FOOTER
+_env.globals["text_footer"] = TEXT_FOOTER
+
+
+def _wrapper(border_color: str, body: str) -> str:
+    return f"""
+    <div style="font-family: 'Segoe UI', Arial, sans-serif; line-height: 1.6; color: #1C1917; max-width: 600px; margin: 20px auto; background: #ffffff; border-radius: 12px; box-shadow: 0 10px 30px rgba(0,0,0,0.05); border: 1px solid {border_color};">
+        {{{{ header }}}}
+        <div style="padding: 30px;">
+        {body}
+        </div>
+        {{{{ footer }}}}
+    </div>
+    """
+
+
+def _badge(label: str, background: str, color: str, border: str) -> str:
+    return f"""<div style="display: inline-block; padding: 4px 12px; background: {background}; color: {color}; border-radius: 15px; font-size: 11px; font-weight: 700; text-transform: uppercase; letter-spacing: 1px; margin-bottom: 15px; border: 1px solid {border};">{label}</div>"""
+
+
+_ITEMS_HTML = """
+    {% for item in order['items'] %}
+    <div style="display: flex; justify-content: space-between; border-bottom: 1px solid #fbcfe8; padding: 10px 0;">
+        <span style="font-weight: 600;">{{ field(item, 'name') }} (x{{ field(item, 'quantity') }})</span>
+        <span>Rs. {{ item|line_total }}</span>
+    </div>
+    {% endfor %}
+"""
+
+_ITEMS_TEXT = """{% for item in order['items'] %}
+- {{ field(item, 'name') }} (x{{ field(item, 'quantity') }}): Rs. {{ item|line_total }}
+{% endfor %}
+Total Amount: Rs. {{ order['total']|money }}
+"""
+
+# ==================== TEMPLATE SOURCES ====================
+
+_HTML_SOURCES: Dict[str, str] = {
+    "order_confirmation": _wrapper("#fce7f3", _badge("Order Status: Processing", "#fdf2f8", "#db2777", "#fbcfe8") + """
+        <h2 style="margin-top: 0; font-size: 20px;">Thank you for your order!</h2>
+        <p>Hi {{ order['shipping_address']['full_name'] }},</p>
+        <p>Your order <span style="color: #D4AF37; font-weight: bold;">#{{ order['order_id'] }}</span> has been confirmed. We are carefully preparing your items for shipment.</p>
+
+        <div style="background: #fff8e1; border: 1px dashed #ffb300; padding: 15px; border-radius: 8px; font-size: 13px; color: #856404; margin: 20px 0; text-align: center;">
+            <strong>Note:</strong> Your order is under processing. Tracking details will be updated here and emailed to you as soon as the package is dispatched.
+        </div>
+
+        <div style="background: #FDF2F8; padding: 20px; border-radius: 8px; margin-bottom: 25px; border-left: 4px solid #db2777;">
+            <p style="margin-top: 0; font-weight: bold;">Order Summary:</p>
+            """ + _ITEMS_HTML + """
+            <div style="display: flex; justify-content: space-between; padding: 15px 0 0; font-size: 18px; font-weight: bold; color: #db2777;">
+                <span>Total Amount</span>
+                <span>Rs. {{ order['total']|money }}</span>
+            </div>
+        </div>
+
+        <p style="font-size: 14px;"><strong>Shipping Address:</strong><br>
+        {{ order['shipping_address']['full_name'] }}<br>
+        {{ order['shipping_address']['address_line1'] }}, {{ order['shipping_address']['city'] }}<br>
+        {{ order['shipping_address']['state'] }} - {{ order['shipping_address']['pincode'] }}</p>
+
+        <div style="text-align: center; margin-top: 25px;">
+            <a href="{{ site_url }}/track-order" style="display: inline-block; padding: 12px 30px; background: linear-gradient(90deg, #f59e0b 0%, #facc15 100%); color: #ffffff; text-decoration: none; border-radius: 50px; font-weight: bold; text-transform: uppercase; letter-spacing: 1px;">Track Your Order</a>
+        </div>
+        <p style="text-align: center; margin-top: 15px; font-size: 13px; color: #78716c;">Use Order ID: <strong>{{ order['order_id'] }}</strong> to track your order</p>
+    """),
+
+    "order_shipped": _wrapper("#fce7f3", _badge("Order Status: Shipped", "#ecfdf5", "#059669", "#a7f3d0") + """
+        <h2 style="margin-top: 0; font-size: 20px;">Your order is on the way!</h2>
+        <p>Hi {{ order['shipping_address']['full_name'] }},</p>
+        <p>Great news! Your order <span style="color: #db2777; font-weight: bold;">#{{ order['order_id'] }}</span> has been shipped via <b>{{ field(order, 'courier_name') or 'our courier partner' }}</b>.</p>
+
+        <div style="background: #FDF2F8; padding: 20px; border-radius: 8px; margin: 20px 0; border: 1px solid #fbcfe8;">
+            <p style="margin-top: 0; font-weight: bold;">Tracking Information:</p>
+            <p style="margin-bottom: 5px;">Courier: {{ field(order, 'courier_name') or 'N/A' }}</p>
+            <p style="margin-bottom: 15px;">Tracking ID: <span style="color: #db2777; font-weight: bold;">{{ field(order, 'tracking_number') or 'N/A' }}</span></p>
+            <a href="{{ field(order, 'tracking_url') or '#' }}" style="display: inline-block; padding: 10px 20px; background: #db2777; color: #ffffff; text-decoration: none; border-radius: 8px; font-weight: bold; font-size: 14px;">Track Package</a>
+        </div>
+
+        <p style="font-size: 14px;">Once your package arrives, feel free to share your look on Instagram and tag us <b>@samairaonline786_6</b>!</p>
+
+        <div style="text-align: center; margin-top: 25px;">
+            <a href="{{ site_url }}/track-order" style="display: inline-block; padding: 12px 30px; background: #f3f4f6; color: #374151; text-decoration: none; border-radius: 50px; font-weight: bold; text-transform: uppercase; letter-spacing: 1px; font-size: 12px; border: 1px solid #d1d5db;">Track Your Order</a>
+        </div>
+        <p style="text-align: center; margin-top: 15px; font-size: 13px; color: #78716c;">Use Order ID: <strong>{{ order['order_id'] }}</strong></p>
+    """),
+
+    "order_delivered": _wrapper("#fce7f3", _badge("Order Status: Delivered", "#d1fae5", "#065f46", "#6ee7b7") + """
+        <h2 style="margin-top: 0; font-size: 20px;">Your order has been delivered! 🎉</h2>
+        <p>Hi {{ order['shipping_address']['full_name'] }},</p>
+        <p>Great news! Your order <span style="color: #db2777; font-weight: bold;">#{{ order['order_id'] }}</span> has been successfully delivered.</p>
+
+        <div style="background: #FDF2F8; padding: 20px; border-radius: 8px; margin: 20px 0; border: 1px solid #fbcfe8;">
+            <p style="margin-top: 0; font-weight: bold;">We hope you love your purchase!</p>
+            <p style="margin-bottom: 0; font-size: 14px;">If you have any questions or concerns about your order, please do not hesitate to reach out to us.</p>
+        </div>
+
+        <p style="font-size: 14px;">Share your look on Instagram and tag us <b>@samairaonline786_6</b>! We would love to see how you style your new pieces.</p>
+
+        <div style="text-align: center; margin-top: 25px;">
+            <a href="{{ site_url }}/shop" style="display: inline-block; padding: 12px 30px; background: linear-gradient(90deg, #f59e0b 0%, #facc15 100%); color: #ffffff; text-decoration: none; border-radius: 50px; font-weight: bold; text-transform: uppercase; letter-spacing: 1px;">Shop More</a>
+        </div>
+    """),
+
+    # Admin manually cancelled the order
+    "order_cancelled_manual": _wrapper("#fce7f3", _badge("Status: Cancelled", "#fee2e2", "#991b1b", "#fecaca") + """
+        <h2 style="margin-top: 0; font-size: 20px;">Order Cancelled</h2>
+        <p>Hi {{ order['shipping_address']['full_name'] }},</p>
+        <p>Your order <span style="color: #db2777; font-weight: bold;">#{{ order['order_id'] }}</span> has been cancelled.</p>
+
+        <div style="background: #FEF2F2; padding: 20px; border-radius: 8px; margin: 20px 0; border: 1px solid #fecaca;">
+            <p style="margin-top: 0; font-weight: bold;">What happens next?</p>
+            <p style="margin-bottom: 5px; font-size: 14px;">- Our sales representative will contact you shortly</p>
+            <p style="margin-bottom: 0; font-size: 14px;">- You will receive a refund on your payment method in 5-7 business days</p>
+        </div>
+
+        <p style="font-size: 14px;">If you have any questions, please do not hesitate to reach out to our support team.</p>
+
+        <div style="text-align: center; margin-top: 25px;">
+            <a href="{{ site_url }}/shop" style="display: inline-block; padding: 12px 30px; background: #f3f4f6; color: #374151; text-decoration: none; border-radius: 50px; font-weight: bold; text-transform: uppercase; letter-spacing: 1px; font-size: 12px; border: 1px solid #d1d5db;">Continue Shopping</a>
+        </div>
+    """),
+
+    # Order auto-cancelled because payment never arrived
+    "order_cancelled_auto": _wrapper("#fce7f3", _badge("Status: Cancelled", "#fee2e2", "#991b1b", "#fecaca") + """
+        <h2 style="margin-top: 0; font-size: 20px;">Order Cancelled</h2>
+        <p>Hi {{ order['shipping_address']['full_name'] }},</p>
+        <p>Your order <span style="color: #db2777; font-weight: bold;">#{{ order['order_id'] }}</span> has been cancelled because we didn't receive the payment within the required window.</p>
+
+        <div style="background: #FEF2F2; padding: 20px; border-radius: 8px; margin: 20px 0; border: 1px solid #fecaca;">
+            <p style="margin-top: 0; font-weight: bold;">Items returned to inventory</p>
+            <p style="margin-bottom: 0; font-size: 14px;">The items have been returned to our inventory. If you still wish to purchase them, please place a new order on our website.</p>
+        </div>
+
+        <div style="text-align: center; margin-top: 25px;">
+            <a href="{{ site_url }}/shop" style="display: inline-block; padding: 12px 30px; background: linear-gradient(90deg, #db2777 0%, #ec4899 100%); color: #ffffff; text-decoration: none; border-radius: 50px; font-weight: bold; text-transform: uppercase; letter-spacing: 1px;">Continue Shopping</a>
+        </div>
+    """),
+
+    "cart_reminder": _wrapper("#fce7f3", _badge("Reminder: Items in your Bag", "#fffbeb", "#d97706", "#fef3c7") + """
+        <h2 style="margin-top: 0; font-size: 20px;">Complete your order!</h2>
+        <p>Hi {{ order['shipping_address']['full_name'] }},</p>
+        <p>Your items are waiting in your bag! We've received your order request <span style="color: #db2777; font-weight: bold;">#{{ order['order_id'] }}</span>, but the checkout hasn't been completed yet.</p>
+
+        <div style="background: #FDF2F8; padding: 20px; border-radius: 8px; margin: 20px 0; border: 1px solid #fbcfe8;">
+            <p style="margin-top: 0; font-weight: bold;">Order Summary:</p>
+            """ + _ITEMS_HTML + """
+            <div style="display: flex; justify-content: space-between; padding: 15px 0 0; font-size: 16px; font-weight: bold; color: #db2777;">
+                <span>Total Amount</span>
+                <span>Rs. {{ order['total']|money }}</span>
+            </div>
+            <div style="text-align: center; margin-top: 20px;">
+                <p style="font-size: 13px; color: #6b7280; margin-bottom: 15px;">Complete your payment within <b>5 minutes</b> to secure these items.</p>
+                <a href="{{ site_url }}/account/orders/{{ order['order_id'] }}" style="display: inline-block; padding: 12px 30px; background: #db2777; color: #ffffff; text-decoration: none; border-radius: 50px; font-weight: bold; text-transform: uppercase; letter-spacing: 1px;">Complete Checkout</a>
+            </div>
+        </div>
+
+        <p style="font-size: 14px;">If you have already completed the payment, please ignore this email. Your order will be updated shortly.</p>
+    """),
+
+    "payment_failed": _wrapper("#fee2e2", _badge("Status: Payment Failed", "#fef2f2", "#dc2626", "#fecaca") + """
+        <h2 style="margin-top: 0; font-size: 20px;">Payment Unsuccessful</h2>
+        <p>Hi {{ order['shipping_address']['full_name'] }},</p>
+        <p>We are sorry, but the payment for your order <span style="font-weight: bold;">#{{ order['order_id'] }}</span> was unsuccessful.</p>
+
+        <div style="background: #f9fafb; padding: 20px; border-radius: 8px; margin: 20px 0; border: 1px solid #e5e7eb;">
+            <p style="margin-top: 0;">Your order has been cancelled and the items have been returned to inventory. If you would like to purchase these items, please place a new order on our website.</p>
+        </div>
+
+        <div style="text-align: center; margin-top: 25px;">
+            <a href="{{ site_url }}/shop" style="display: inline-block; padding: 12px 30px; background: linear-gradient(90deg, #db2777 0%, #ec4899 100%); color: #ffffff; text-decoration: none; border-radius: 50px; font-weight: bold; text-transform: uppercase; letter-spacing: 1px;">Continue Shopping</a>
+        </div>
+
+        <p style="font-size: 14px; margin-top: 25px;">If you need assistance, please reply to this email or contact us via WhatsApp.</p>
+    """),
+
+    "password_reset": """
+    <div style="font-family: 'Playfair Display', serif; max-width: 600px; margin: 0 auto; padding: 40px; border: 1px solid #f0f0f0; border-radius: 12px;">
+        <h2 style="color: #1c1c1c; text-align: center; margin-bottom: 30px;">Verification Code</h2>
+        <p style="color: #444; line-height: 1.6; font-size: 16px;">Hello,</p>
+        <p style="color: #444; line-height: 1.6; font-size: 16px;">We received a request to reset your password. Use the following 6-digit verification code to proceed:</p>
+        <div style="background-color: #fff5f7; border: 1px dashed #ffb6c1; border-radius: 8px; padding: 20px; text-align: center; margin: 30px 0;">
+            <span style="font-size: 32px; font-weight: bold; letter-spacing: 12px; color: #db2777;">{{ reset_code }}</span>
+        </div>
+        <p style="color: #666; font-size: 14px; line-height: 1.6;">This code is valid for 15 minutes. If you did not request this, please ignore this email.</p>
+        <hr style="border: 0; border-top: 1px solid #eee; margin: 30px 0;" />
+        <p style="color: #999; font-size: 12px; text-align: center;">&copy; 2026 Dubai SR - Premium Ethnic Fashion</p>
+    </div>
+    """,
+}
+
+_TEXT_SOURCES: Dict[str, str] = {
+    "order_confirmation": """Hi {{ order['shipping_address']['full_name'] }},
+
+Thank you for your order! Your order #{{ order['order_id'] }} has been confirmed. We are carefully preparing your items for shipment.
+Tracking details will be emailed to you as soon as the package is dispatched.
+
+Order Summary:
+""" + _ITEMS_TEXT + """
+Shipping Address:
+{{ order['shipping_address']['full_name'] }}
+{{ order['shipping_address']['address_line1'] }}, {{ order['shipping_address']['city'] }}
+{{ order['shipping_address']['state'] }} - {{ order['shipping_address']['pincode'] }}
+
+Track your order: {{ site_url }}/track-order (Order ID: {{ order['order_id'] }})
+{{ text_footer }}""",
+
+    "order_shipped": """Hi {{ order['shipping_address']['full_name'] }},
+
+Great news! Your order #{{ order['order_id'] }} has been shipped via {{ field(order, 'courier_name') or 'our courier partner' }}.
+
+Courier: {{ field(order, 'courier_name') or 'N/A' }}
+Tracking ID: {{ field(order, 'tracking_number') or 'N/A' }}
+{% if field(order, 'tracking_url') %}Track package: {{ field(order, 'tracking_url') }}
+{% endif %}
+
+Track your order: {{ site_url }}/track-order (Order ID: {{ order['order_id'] }})
+{{ text_footer }}""",
+
+    "order_delivered": """Hi {{ order['shipping_address']['full_name'] }},
+
+Great news! Your order #{{ order['order_id'] }} has been successfully delivered. We hope you love your purchase!
+If you have any questions or concerns about your order, please do not hesitate to reach out to us.
+
+Shop more: {{ site_url }}/shop
+{{ text_footer }}""",
+
+    "order_cancelled_manual": """Hi {{ order['shipping_address']['full_name'] }},
+
+Your order #{{ order['order_id'] }} has been cancelled.
+
+What happens next?
+- Our sales representative will contact you shortly
+- You will receive a refund on your payment method in 5-7 business days
+
+Continue shopping: {{ site_url }}/shop
+{{ text_footer }}""",
+
+    "order_cancelled_auto": """Hi {{ order['shipping_address']['full_name'] }},
+
+Your order #{{ order['order_id'] }} has been cancelled because we didn't receive the payment within the required window.
+The items have been returned to our inventory. If you still wish to purchase them, please place a new order on our website.
+
+Continue shopping: {{ site_url }}/shop
+{{ text_footer }}""",
+
+    "cart_reminder": """Hi {{ order['shipping_address']['full_name'] }},
+
+Your items are waiting in your bag! We've received your order request #{{ order['order_id'] }}, but the checkout hasn't been completed yet.
+
+Order Summary:
+""" + _ITEMS_TEXT + """
+Complete your payment within 5 minutes to secure these items:
+{{ site_url }}/account/orders/{{ order['order_id'] }}
+
+If you have already completed the payment, please ignore this email.
+{{ text_footer }}""",
+
+    "payment_failed": """Hi {{ order['shipping_address']['full_name'] }},
+
+We are sorry, but the payment for your order #{{ order['order_id'] }} was unsuccessful.
+Your order has been cancelled and the items have been returned to inventory. If you would like to purchase these items, please place a new order on our website.
+
+Continue shopping: {{ site_url }}/shop
+{{ text_footer }}""",
+
+    "password_reset": """Hello,
+
+We received a request to reset your password. Use the following 6-digit verification code to proceed:
+
+{{ reset_code }}
+
+This code is valid for 15 minutes. If you did not request this, please ignore this email.
+""",
+}
+
+# Compile once at import time
+_HTML_TEMPLATES = {name: _env.from_string(minify_html(source)) for name, source in _HTML_SOURCES.items()}
+
+# Plain-text parts keep their line breaks, so they are compiled without minification
+_text_env = _env.overlay(autoescape=False)
+_TEXT_TEMPLATES = {name: _text_env.from_string(source) for name, source in _TEXT_SOURCES.items()}
+
+
+def render_email(name: str, order: Any = None, **context: Any) -> RenderedEmail:
+    """
+    Render an email template to its HTML and plain-text parts.
+
+    Args:
+        name: Template name (e.g. "order_confirmation", "order_shipped")
+        order: Order as a Pydantic model or Mongo document (optional)
+        **context: Extra template variables (e.g. reset_code)
+
+    Returns:
+        RenderedEmail with html and text bodies
+    """
+    if order is not None:
+        context["order"] = order
+    return RenderedEmail(
+        html=_HTML_TEMPLATES[name].render(context),
+        text=_TEXT_TEMPLATES[name].render(context),
+    )
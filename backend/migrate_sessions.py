@@ -0,0 +1,93 @@
+"""
+One-off cleanup of the `user_sessions` backlog.
+
+- Deletes expired sessions, whether expires_at is a BSON date or a legacy ISO string
+- Converts the remaining string expires_at values to BSON dates so the TTL index applies
+- Replaces raw `session_token` values with their `token_hash`
+
+Works in _id-ordered batches so it never holds a long write lock, and can be
+re-run safely. Once it reports 0 legacy tokens, set SESSIONS_LEGACY_LOOKUP=false.
+
+Usage:
+    python migrate_sessions.py [--batch-size 1000] [--dry-run]
+"""
+import argparse
+import asyncio
+import os
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import DeleteOne, UpdateOne
+
+from core.sessions import ensure_indexes, hash_session_token
+from migrate_timestamps import parse_timestamp
+
+load_dotenv()
+
+
+def plan(doc, now):
+    """Decide what to do with one session document: ('delete' | 'update' | None, update)."""
+    expires_at = doc.get("expires_at")
+    if isinstance(expires_at, str):
+        try:
+            expires_at = parse_timestamp(expires_at)
+        except ValueError:
+            return "delete", None
+    if not isinstance(expires_at, datetime) or expires_at <= now:
+        return "delete", None
+
+    update = {}
+    if isinstance(doc.get("expires_at"), str):
+        update["$set"] = {"expires_at": expires_at}
+    if doc.get("session_token"):
+        update.setdefault("$set", {})["token_hash"] = hash_session_token(doc["session_token"])
+        update["$unset"] = {"session_token": ""}
+    return ("update", update) if update else (None, None)
+
+
+async def migrate_sessions(batch_size: int, dry_run: bool = False):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    db = client[os.environ['DB_NAME']]
+    now = datetime.now(timezone.utc)
+    total = await db.user_sessions.count_documents({})
+    print(f"Scanning {total} sessions{' (dry run)' if dry_run else ''}...")
+
+    deleted = updated = 0
+    last_id = None
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        batch = await db.user_sessions.find(
+            query, {"_id": 1, "expires_at": 1, "session_token": 1}
+        ).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        operations = []
+        for doc in batch:
+            action, update = plan(doc, now)
+            if action == "delete":
+                operations.append(DeleteOne({"_id": doc["_id"]}))
+                deleted += 1
+            elif action == "update":
+                operations.append(UpdateOne({"_id": doc["_id"]}, update))
+                updated += 1
+        if operations and not dry_run:
+            await db.user_sessions.bulk_write(operations, ordered=False)
+
+        last_id = batch[-1]["_id"]
+        print(f"  {deleted} deleted, {updated} converted so far")
+
+    if not dry_run:
+        await ensure_indexes(db)
+    remaining_legacy = await db.user_sessions.count_documents({"session_token": {"$type": "string"}})
+    print(f"Done: {deleted} expired sessions deleted, {updated} converted, {remaining_legacy} legacy tokens remaining")
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Purge expired sessions and hash stored session tokens")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    args = parser.parse_args()
+    asyncio.run(migrate_sessions(args.batch_size, args.dry_run))
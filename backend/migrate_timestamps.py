@@ -0,0 +1,138 @@
+"""
+Database migration script to convert ISO-string timestamps to native BSON dates.
+
+Walks each collection in _id order and rewrites string timestamp fields in
+batches. Progress is checkpointed in the `migrations` collection after every
+batch, so the script can be stopped and re-run at any time; documents that
+are already converted are skipped.
+
+Usage:
+    python migrate_timestamps.py [--batch-size 500] [--collection orders] [--dry-run] [--restart]
+
+Once every collection reports 0 remaining, set DATES_DUAL_READ=false.
+"""
+import argparse
+import asyncio
+import os
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+load_dotenv()
+
+TIMESTAMP_FIELDS = {
+    "orders": ["created_at", "updated_at"],
+    "users": ["created_at", "locked_until"],
+    "admin_users": ["created_at", "locked_until"],
+    "user_sessions": ["created_at", "expires_at"],
+    "password_resets": ["expires_at"],
+    "products": ["created_at", "updated_at"],
+    "categories": ["created_at"],
+    "coupons": ["created_at", "expires_at"],
+    "carts": ["created_at", "updated_at"],
+    "settings": ["updated_at"],
+    "activity_log": ["timestamp"],
+    "marketing_leads": ["created_at"],
+    "shiprocket_settings": ["expiry", "updated_at"],
+}
+
+CHECKPOINT_PREFIX = "timestamps_to_dates"
+
+
+def parse_timestamp(value: str):
+    """Parse a stored ISO string; naive values were always written in UTC."""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+async def migrate_collection(db, name: str, fields, batch_size: int, dry_run: bool, restart: bool):
+    """Convert one collection, resuming after the last checkpointed _id."""
+    checkpoint_id = f"{CHECKPOINT_PREFIX}:{name}"
+    if restart:
+        await db.migrations.delete_one({"_id": checkpoint_id})
+    checkpoint = await db.migrations.find_one({"_id": checkpoint_id}) or {}
+    last_id = checkpoint.get("last_id")
+
+    string_fields = {"$or": [{field: {"$type": "string"}} for field in fields]}
+    converted = checkpoint.get("converted", 0)
+    skipped = checkpoint.get("skipped", 0)
+
+    while True:
+        query = dict(string_fields)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await db[name].find(query, {field: 1 for field in fields}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        operations = []
+        for doc in batch:
+            update = {}
+            for field in fields:
+                value = doc.get(field)
+                if not isinstance(value, str):
+                    continue
+                try:
+                    update[field] = parse_timestamp(value) if value else None
+                except ValueError:
+                    print(f"  {name} {doc['_id']}: unparseable {field}={value!r}, left as is")
+                    skipped += 1
+            if update:
+                # Only rewrite fields that are still strings, in case the app updated them meanwhile
+                guard = {"_id": doc["_id"], **{field: {"$type": "string"} for field in update}}
+                operations.append(UpdateOne(guard, {"$set": update}))
+
+        if operations and not dry_run:
+            result = await db[name].bulk_write(operations, ordered=False)
+            converted += result.modified_count
+        elif dry_run:
+            converted += len(operations)
+
+        last_id = batch[-1]["_id"]
+        if not dry_run:
+            await db.migrations.update_one(
+                {"_id": checkpoint_id},
+                {"$set": {
+                    "last_id": last_id,
+                    "converted": converted,
+                    "skipped": skipped,
+                    "updated_at": datetime.now(timezone.utc)
+                }},
+                upsert=True
+            )
+        print(f"  {name}: {converted} converted so far")
+
+    remaining = await db[name].count_documents(string_fields)
+    return converted, skipped, remaining
+
+
+async def migrate_timestamps(batch_size: int, only: str = None, dry_run: bool = False, restart: bool = False):
+    """Convert timestamp strings to BSON dates across all collections."""
+    mongo_url = os.environ['MONGO_URL']
+    client = AsyncIOMotorClient(mongo_url, tz_aware=True)
+    db = client[os.environ['DB_NAME']]
+
+    print(f"Starting timestamp migration{' (dry run)' if dry_run else ''}...")
+
+    for name, fields in TIMESTAMP_FIELDS.items():
+        if only and name != only:
+            continue
+        converted, skipped, remaining = await migrate_collection(db, name, fields, batch_size, dry_run, restart)
+        print(f"{name}: converted {converted} documents, {skipped} unparseable values, {remaining} remaining")
+
+    print("Migration complete!")
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert ISO-string timestamps to BSON dates")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--collection", choices=sorted(TIMESTAMP_FIELDS), help="Only migrate this collection")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    parser.add_argument("--restart", action="store_true", help="Ignore saved checkpoints and scan from the start")
+    args = parser.parse_args()
+    asyncio.run(migrate_timestamps(args.batch_size, args.collection, args.dry_run, args.restart))
@@ -0,0 +1,168 @@
+"""
+Order Export Module
+Streams orders as CSV or NDJSON straight from a Mongo cursor.
+
+Rows are encoded and flushed in small chunks, optionally gzip-compressed on
+the fly, so memory use stays constant regardless of how many orders match.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterator, List
+
+EXPORT_BATCH_SIZE = 500
+FLUSH_EVERY_ROWS = 200
+
+ORDER_COLUMNS = [
+    "order_id", "created_at", "updated_at", "user_id",
+    "customer_name", "email", "phone", "city", "state", "pincode", "country",
+    "payment_method", "payment_status", "order_status",
+    "subtotal", "coupon_code", "coupon_discount", "shipping_cost", "cod_fee", "total",
+    "item_count", "razorpay_order_id", "razorpay_payment_id",
+    "courier_name", "tracking_number",
+]
+
+ITEM_COLUMNS = [
+    "product_id", "item_name", "size", "quantity", "unit_price", "sale_price", "line_total",
+]
+
+EXPORT_PROJECTION = {"_id": 0, "shipping_address.address_line1": 0, "shipping_address.address_line2": 0}
+
+# Spreadsheets evaluate cells starting with these as formulas (CSV injection)
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _iso(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _csv_safe(value: Any) -> Any:
+    """Neutralize a customer-controlled string a spreadsheet would run as a formula."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def order_row(order: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten an order document into the order-level export columns."""
+    address = order.get("shipping_address") or {}
+    items = order.get("items") or []
+    return {
+        "order_id": order.get("order_id"),
+        "created_at": _iso(order.get("created_at")),
+        "updated_at": _iso(order.get("updated_at")),
+        "user_id": order.get("user_id"),
+        "customer_name": address.get("full_name"),
+        "email": address.get("email"),
+        "phone": address.get("phone"),
+        "city": address.get("city"),
+        "state": address.get("state"),
+        "pincode": address.get("pincode"),
+        "country": address.get("country"),
+        "payment_method": order.get("payment_method"),
+        "payment_status": order.get("payment_status"),
+        "order_status": order.get("order_status"),
+        "subtotal": order.get("subtotal"),
+        "coupon_code": order.get("coupon_code"),
+        "coupon_discount": order.get("coupon_discount"),
+        "shipping_cost": order.get("shipping_cost"),
+        "cod_fee": order.get("cod_fee"),
+        "total": order.get("total"),
+        "item_count": sum(item.get("quantity", 0) for item in items),
+        "razorpay_order_id": order.get("razorpay_order_id"),
+        "razorpay_payment_id": order.get("razorpay_payment_id"),
+        "courier_name": order.get("courier_name"),
+        "tracking_number": order.get("tracking_number"),
+    }
+
+
+def item_rows(order: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Yield one row per line item, each carrying the order-level columns."""
+    base = order_row(order)
+    for item in order.get("items") or []:
+        unit_price = item.get("sale_price") or item.get("price") or 0
+        yield {
+            **base,
+            "product_id": item.get("product_id"),
+            "item_name": item.get("name"),
+            "size": item.get("size"),
+            "quantity": item.get("quantity"),
+            "unit_price": item.get("price"),
+            "sale_price": item.get("sale_price"),
+            "line_total": round(float(unit_price) * item.get("quantity", 0), 2),
+        }
+
+
+def export_columns(flatten_items: bool) -> List[str]:
+    return ORDER_COLUMNS + ITEM_COLUMNS if flatten_items else ORDER_COLUMNS
+
+
+async def _rows(cursor, flatten_items: bool) -> AsyncIterator[Dict[str, Any]]:
+    async for order in cursor:
+        if flatten_items:
+            for row in item_rows(order):
+                yield row
+        else:
+            yield order_row(order)
+
+
+async def _encode_csv(rows: AsyncIterator[Dict[str, Any]], columns: List[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    pending = 0
+    async for row in rows:
+        writer.writerow({column: _csv_safe(value) for column, value in row.items()})
+        pending += 1
+        if pending >= FLUSH_EVERY_ROWS:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def _encode_ndjson(rows: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    chunk: List[str] = []
+    async for row in rows:
+        chunk.append(json.dumps(row, default=str, separators=(",", ":")))
+        if len(chunk) >= FLUSH_EVERY_ROWS:
+            yield ("\n".join(chunk) + "\n").encode("utf-8")
+            chunk = []
+    if chunk:
+        yield ("\n".join(chunk) + "\n").encode("utf-8")
+
+
+async def _gzip(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_orders(db, query: Dict[str, Any], export_format: str, flatten_items: bool = False, gzip: bool = False) -> AsyncIterator[bytes]:
+    """
+    Build a byte stream of matching orders, oldest first.
+
+    Args:
+        db: MongoDB database instance
+        query: Order filter
+        export_format: "csv" or "ndjson"
+        flatten_items: Emit one row per line item instead of one per order
+        gzip: Compress the stream with gzip
+
+    Returns:
+        Async iterator of encoded chunks, suitable for a StreamingResponse
+    """
+    cursor = db.orders.find(query, EXPORT_PROJECTION).sort("created_at", 1).batch_size(EXPORT_BATCH_SIZE)
+    rows = _rows(cursor, flatten_items)
+    if export_format == "csv":
+        chunks = _encode_csv(rows, export_columns(flatten_items))
+    else:
+        chunks = _encode_ndjson(rows)
+    return _gzip(chunks) if gzip else chunks
@@ -0,0 +1,258 @@
+"""
+Product Sales Counters Module
+Keeps units_sold / revenue (all time and last 30 days) on each product document,
+and the per-customer order stats (see customer_stats.py).
+
+An order is counted once when it is confirmed (payment verified, or placed
+as COD) and uncounted if it is later cancelled. The `sales_counted` flag on
+the order is flipped atomically, so retries and concurrent updates can never
+count an order twice. Per-product daily totals in `product_sales_daily` let
+the 30-day window be recomputed as days fall out of it.
+
+Orders confirmed before `sales_counted` existed are counted once by the
+backfill, which also stamps the flag so a later cancellation uncounts them.
+
+Usage:
+    python sales_counters.py backfill [--batch-size 500]
+"""
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, List, Tuple
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import OperationFailure
+
+import customer_stats
+from utils.dates import as_datetime
+
+logger = logging.getLogger(__name__)
+
+DAILY_COLLECTION = "product_sales_daily"
+WINDOW_DAYS = 30
+
+# Popularity = recent units first, then all-time units; product_id makes the order total,
+# so skip/limit pages never repeat or skip products that tie (most sit at 0/0)
+POPULARITY_SORT = [("units_sold_30d", -1), ("units_sold", -1), ("product_id", -1)]
+POPULARITY_INDEX = "is_active_popularity_product_id"
+RETIRED_POPULARITY_INDEX = "is_active_popularity"
+INDEX_NOT_FOUND = 27
+
+COUNTED_ORDER_PROJECTION = {"_id": 0, "items": 1, "user_id": 1, "total": 1, "created_at": 1}
+
+# Confirmed orders from before sales_counted existed (paid online, or COD, and not cancelled)
+LEGACY_COD_METHODS = ["COD", "cod", "Cash on Delivery"]
+LEGACY_CONFIRMED_ORDERS = {
+    "sales_counted": {"$exists": False},
+    "order_status": {"$ne": "cancelled"},
+    "$or": [{"payment_status": "paid"}, {"payment_method": {"$in": LEGACY_COD_METHODS}}]
+}
+
+
+async def ensure_indexes(db) -> None:
+    """Create the popularity sort index and the daily totals indexes."""
+    await db.products.create_index([("is_active", 1)] + POPULARITY_SORT, name=POPULARITY_INDEX)
+    try:
+        await db.products.drop_index(RETIRED_POPULARITY_INDEX)
+    except OperationFailure as e:
+        if e.code != INDEX_NOT_FOUND:
+            raise
+    await db[DAILY_COLLECTION].create_index([("product_id", 1), ("date", 1)], unique=True, name="product_id_date")
+    await db[DAILY_COLLECTION].create_index("date", name="date")
+
+
+def _day(value: datetime) -> datetime:
+    return as_datetime(value).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _window_start(now: datetime) -> datetime:
+    return _day(now) - timedelta(days=WINDOW_DAYS - 1)
+
+
+def _product_totals(items: List[Dict[str, Any]]) -> Dict[str, Tuple[int, float]]:
+    totals: Dict[str, Tuple[int, float]] = {}
+    for item in items or []:
+        units, revenue = totals.get(item["product_id"], (0, 0.0))
+        price = item.get("sale_price") or item.get("price") or 0
+        totals[item["product_id"]] = (units + item["quantity"], revenue + float(price) * item["quantity"])
+    return totals
+
+
+async def _apply(db, items: List[Dict[str, Any]], sign: int, counted_at: datetime) -> None:
+    totals = _product_totals(items)
+    if not totals:
+        return
+    in_window = counted_at >= _window_start(datetime.now(timezone.utc))
+    day = _day(counted_at)
+
+    product_updates = []
+    daily_updates = []
+    for product_id, (units, revenue) in totals.items():
+        inc = {"units_sold": sign * units, "revenue": round(sign * revenue, 2)}
+        if in_window:
+            inc.update({"units_sold_30d": sign * units, "revenue_30d": round(sign * revenue, 2)})
+        product_updates.append(UpdateOne({"product_id": product_id}, {"$inc": inc}))
+        daily_updates.append(UpdateOne(
+            {"product_id": product_id, "date": day},
+            {"$inc": {"units": sign * units, "revenue": round(sign * revenue, 2)}},
+            upsert=True
+        ))
+
+    try:
+        await db.products.bulk_write(product_updates, ordered=False)
+        await db[DAILY_COLLECTION].bulk_write(daily_updates, ordered=False)
+    except Exception as e:
+        logger.error(f"Failed to update product sales counters: {e}")
+
+
+async def count_order(db, order_id: str) -> bool:
+    """
+    Add a confirmed order to the product counters and customer stats (at most once per order).
+
+    Args:
+        db: MongoDB database instance
+        order_id: Order to count
+
+    Returns:
+        True if this call counted the order
+    """
+    now = datetime.now(timezone.utc)
+    order = await db.orders.find_one_and_update(
+        {"order_id": order_id, "sales_counted": {"$ne": True}},
+        {"$set": {"sales_counted": True, "sales_counted_at": now}},
+        projection=COUNTED_ORDER_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+    if not order:
+        return False
+    await _apply(db, order.get("items"), 1, now)
+    await customer_stats.apply_order(db, order, 1)
+    return True
+
+
+async def uncount_order(db, order_id: str) -> bool:
+    """
+    Remove a cancelled order from the product counters and customer stats, if it was counted.
+
+    Args:
+        db: MongoDB database instance
+        order_id: Cancelled order
+
+    Returns:
+        True if this call uncounted the order
+    """
+    order = await db.orders.find_one_and_update(
+        {"order_id": order_id, "sales_counted": True},
+        {"$set": {"sales_counted": False}},
+        projection={**COUNTED_ORDER_PROJECTION, "sales_counted_at": 1}
+    )
+    if not order:
+        return False
+    # Undo against the day it was counted so the 30-day window stays consistent
+    await _apply(db, order.get("items"), -1, as_datetime(order.get("sales_counted_at")) or datetime.now(timezone.utc))
+    await customer_stats.apply_order(db, order, -1)
+    return True
+
+
+async def backfill(db, batch_size: int = 500) -> int:
+    """
+    Count legacy confirmed orders into the product counters and customer stats.
+
+    Each order is claimed by stamping `sales_counted` (counted on the day it was
+    placed) in the same atomic update that selects it, so the backfill can run
+    while the shop is live, be interrupted and be re-run without counting
+    anything twice.
+
+    Args:
+        db: MongoDB database instance
+        batch_size: Orders read per batch
+
+    Returns:
+        Number of orders counted
+    """
+    counted = 0
+    last_id = None
+    while True:
+        query = {**LEGACY_CONFIRMED_ORDERS}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await db.orders.find(query, {"_id": 1, "created_at": 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        for doc in batch:
+            counted_at = as_datetime(doc.get("created_at")) or datetime.now(timezone.utc)
+            order = await db.orders.find_one_and_update(
+                {"_id": doc["_id"], **LEGACY_CONFIRMED_ORDERS},
+                {"$set": {"sales_counted": True, "sales_counted_at": counted_at}},
+                projection=COUNTED_ORDER_PROJECTION
+            )
+            if not order:
+                continue  # Counted or cancelled since the batch was read
+            await _apply(db, order.get("items"), 1, counted_at)
+            await customer_stats.apply_order(db, order, 1)
+            counted += 1
+
+        last_id = batch[-1]["_id"]
+        logger.info(f"Backfilled sales counters for {counted} orders so far")
+
+    if counted:
+        await refresh_window(db)
+    return counted
+
+
+async def refresh_window(db) -> int:
+    """
+    Recompute units_sold_30d / revenue_30d from the daily totals, dropping days that left the window.
+
+    Args:
+        db: MongoDB database instance
+
+    Returns:
+        Number of products with sales in the window
+    """
+    since = _window_start(datetime.now(timezone.utc))
+    rows = await db[DAILY_COLLECTION].aggregate([
+        {"$match": {"date": {"$gte": since}}},
+        {"$group": {"_id": "$product_id", "units": {"$sum": "$units"}, "revenue": {"$sum": "$revenue"}}}
+    ]).to_list(None)
+
+    if rows:
+        await db.products.bulk_write([
+            UpdateOne(
+                {"product_id": row["_id"]},
+                {"$set": {"units_sold_30d": row["units"], "revenue_30d": round(row["revenue"], 2)}}
+            )
+            for row in rows
+        ], ordered=False)
+    await db.products.update_many(
+        {"product_id": {"$nin": [row["_id"] for row in rows]}, "units_sold_30d": {"$nin": [0, None]}},
+        {"$set": {"units_sold_30d": 0, "revenue_30d": 0}}
+    )
+    return len(rows)
+
+
+async def _main(batch_size: int) -> None:
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv()
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    db = client[os.environ['DB_NAME']]
+    started = datetime.now(timezone.utc)
+    try:
+        await ensure_indexes(db)
+        counted = await backfill(db, batch_size)
+        print(f"Counted {counted} legacy orders in {(datetime.now(timezone.utc) - started).total_seconds():.1f}s")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Count orders confirmed before sales counters existed")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(_main(args.batch_size))
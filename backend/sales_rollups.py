@@ -0,0 +1,345 @@
+"""
+Sales Rollups Module
+Maintains one `sales_daily` document per UTC day of order creation.
+
+Each rollup holds the day's order count and gross revenue, count/revenue per
+order status and per payment status, and units/revenue per product. Rollups
+are updated incrementally as orders are created and change status, so report
+queries sum a handful of rollup rows instead of scanning `orders`.
+
+The incremental writes are best effort (a failure is logged, never raised to
+the customer); run `python sales_rollups.py rebuild` to recompute from orders.
+"""
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from utils.dates import as_datetime, date_range_filter
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_COLLECTION = "sales_daily"
+STATUS_FIELDS = ("order_status", "payment_status")
+
+
+async def ensure_indexes(db) -> None:
+    """Create the index range reports read rollups by."""
+    await db[ROLLUP_COLLECTION].create_index("date", name="date")
+
+
+def day_start(value) -> datetime:
+    """Get UTC midnight of the day a timestamp falls on."""
+    return as_datetime(value).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def day_key(value) -> str:
+    return day_start(value).strftime("%Y-%m-%d")
+
+
+def _item_revenue(item: Dict[str, Any]) -> float:
+    # Same basis as the original best-seller report: list price x quantity
+    return float(item.get("price", 0)) * item.get("quantity", 0)
+
+
+def created_increments(order: Dict[str, Any]) -> Dict[str, float]:
+    """$inc document that adds a newly created order to its day."""
+    total = float(order.get("total", 0))
+    inc: Dict[str, float] = {"orders": 1, "revenue": total}
+    for field in STATUS_FIELDS:
+        status = order.get(field)
+        if status:
+            inc[f"{field}.{status}.count"] = inc.get(f"{field}.{status}.count", 0) + 1
+            inc[f"{field}.{status}.revenue"] = inc.get(f"{field}.{status}.revenue", 0) + total
+    for item in order.get("items") or []:
+        product_id = item["product_id"]
+        inc[f"products.{product_id}.units"] = inc.get(f"products.{product_id}.units", 0) + item.get("quantity", 0)
+        inc[f"products.{product_id}.revenue"] = inc.get(f"products.{product_id}.revenue", 0) + _item_revenue(item)
+    return inc
+
+
+def transition_increments(order: Dict[str, Any], field: str, old: Optional[str], new: str) -> Dict[str, float]:
+    """$inc document that moves an order from one order/payment status to another."""
+    if old == new:
+        return {}
+    total = float(order.get("total", 0))
+    inc: Dict[str, float] = {f"{field}.{new}.count": 1, f"{field}.{new}.revenue": total}
+    if old:
+        inc[f"{field}.{old}.count"] = -1
+        inc[f"{field}.{old}.revenue"] = -total
+    return inc
+
+
+def _rollup_update(order: Dict[str, Any], inc: Dict[str, float]) -> UpdateOne:
+    names = {
+        f"products.{item['product_id']}.name": item.get("name")
+        for item in order.get("items") or []
+        if f"products.{item['product_id']}.units" in inc
+    }
+    update: Dict[str, Any] = {
+        "$inc": inc,
+        "$set": {"updated_at": datetime.now(timezone.utc), **names},
+        "$setOnInsert": {"date": day_start(order["created_at"])},
+    }
+    return UpdateOne({"_id": day_key(order["created_at"])}, update, upsert=True)
+
+
+async def apply_increments(db, changes: Iterable[Tuple[Dict[str, Any], Dict[str, float]]]) -> None:
+    """
+    Apply (order, $inc) pairs to the rollups with one bulk write.
+
+    Args:
+        db: MongoDB database instance
+        changes: Pairs of order document (needs created_at, items for new orders) and increments
+    """
+    operations = [_rollup_update(order, inc) for order, inc in changes if inc]
+    if not operations:
+        return
+    try:
+        await db[ROLLUP_COLLECTION].bulk_write(operations, ordered=False)
+    except Exception as e:
+        logger.error(f"Failed to update sales rollups ({len(operations)} changes): {e}")
+
+
+async def record_order_created(db, order: Dict[str, Any]) -> None:
+    await apply_increments(db, [(order, created_increments(order))])
+
+
+async def record_transitions(db, changes: Iterable[Tuple[Dict[str, Any], str, Optional[str], str]]) -> None:
+    """
+    Record status changes.
+
+    Args:
+        db: MongoDB database instance
+        changes: (order, field, old_status, new_status) tuples; field is "order_status" or "payment_status"
+    """
+    await apply_increments(db, [
+        (order, transition_increments(order, field, old, new)) for order, field, old, new in changes
+    ])
+
+
+async def summarize(db, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Sum the rollups of every day touched by [start, end] (open-ended when None).
+
+    Args:
+        db: MongoDB database instance
+        start: Range start; its whole day is included
+        end: Range end; its whole day is included
+
+    Returns:
+        Dict with orders, revenue, order_status/payment_status {status: {count, revenue}}
+        and products {product_id: {name, units, revenue}}
+    """
+    query: Dict[str, Any] = {}
+    if start or end:
+        query["date"] = {}
+        if start:
+            query["date"]["$gte"] = day_start(start)
+        if end:
+            query["date"]["$lte"] = day_start(end)
+
+    summary: Dict[str, Any] = {"orders": 0, "revenue": 0.0, "order_status": {}, "payment_status": {}, "products": {}}
+    async for row in db[ROLLUP_COLLECTION].find(query, {"_id": 0, "date": 0, "updated_at": 0}):
+        summary["orders"] += row.get("orders", 0)
+        summary["revenue"] += row.get("revenue", 0)
+        for field in STATUS_FIELDS:
+            for status, values in (row.get(field) or {}).items():
+                bucket = summary[field].setdefault(status, {"count": 0, "revenue": 0.0})
+                bucket["count"] += values.get("count", 0)
+                bucket["revenue"] += values.get("revenue", 0)
+        for product_id, values in (row.get("products") or {}).items():
+            bucket = summary["products"].setdefault(product_id, {"name": values.get("name"), "units": 0, "revenue": 0.0})
+            bucket["units"] += values.get("units", 0)
+            bucket["revenue"] += values.get("revenue", 0)
+            if values.get("name"):
+                bucket["name"] = values["name"]
+    return summary
+
+
+async def totals(db) -> Dict[str, float]:
+    """All-time order count and gross revenue, summed over the daily rollups."""
+    result = await db[ROLLUP_COLLECTION].aggregate([
+        {"$group": {"_id": None, "orders": {"$sum": "$orders"}, "revenue": {"$sum": "$revenue"}}}
+    ]).to_list(1)
+    if not result:
+        return {"orders": 0, "revenue": 0.0}
+    return {"orders": result[0]["orders"], "revenue": result[0]["revenue"]}
+
+
+INTERVALS = ("day", "week", "month")
+
+
+def bucket_start(value: datetime, interval: str) -> datetime:
+    """Get the start of the day, ISO week (Monday) or month containing ``value``."""
+    day = day_start(value)
+    if interval == "week":
+        return day - timedelta(days=day.weekday())
+    if interval == "month":
+        return day.replace(day=1)
+    return day
+
+
+def add_buckets(start: datetime, interval: str, count: int) -> datetime:
+    """Move a bucket start forward (or back, for negative ``count``) by whole buckets."""
+    if interval == "week":
+        return start + timedelta(weeks=count)
+    if interval == "month":
+        months = start.year * 12 + start.month - 1 + count
+        return start.replace(year=months // 12, month=months % 12 + 1)
+    return start + timedelta(days=count)
+
+
+def _change_pct(current: float, previous: float) -> Optional[float]:
+    if not previous:
+        return None
+    return round((current - previous) / previous * 100, 2)
+
+
+async def time_series(db, start: datetime, end: datetime, interval: str = "day") -> Dict[str, Any]:
+    """
+    Revenue and order counts per bucket, zero-filled, with the previous period alongside.
+
+    The range is widened to whole buckets; the previous period is the same number of
+    buckets immediately before it. Both periods come from a single rollup query.
+
+    Args:
+        db: MongoDB database instance
+        start: Range start
+        end: Range end (inclusive)
+        interval: "day", "week" or "month"
+
+    Returns:
+        Dict with bucket labels, sales/orders series, the previous period's series and totals
+    """
+    first = bucket_start(start, interval)
+    buckets = [first]
+    while buckets[-1] < bucket_start(end, interval):
+        buckets.append(add_buckets(buckets[-1], interval, 1))
+    count = len(buckets)
+    previous = [add_buckets(bucket, interval, -count) for bucket in buckets]
+    range_end = add_buckets(buckets[-1], interval, 1)
+
+    totals: Dict[datetime, List[float]] = {}
+    rows = db[ROLLUP_COLLECTION].find(
+        {"date": {"$gte": previous[0], "$lt": range_end}},
+        {"_id": 0, "date": 1, "orders": 1, "revenue": 1}
+    )
+    async for row in rows:
+        bucket = totals.setdefault(bucket_start(row["date"], interval), [0.0, 0])
+        bucket[0] += row.get("revenue", 0)
+        bucket[1] += row.get("orders", 0)
+
+    def series(starts: List[datetime]) -> Tuple[List[float], List[int]]:
+        values = [totals.get(bucket, [0.0, 0]) for bucket in starts]
+        return [round(sales, 2) for sales, _ in values], [orders for _, orders in values]
+
+    sales, orders = series(buckets)
+    previous_sales, previous_orders = series(previous)
+    label = "%Y-%m" if interval == "month" else "%Y-%m-%d"
+    return {
+        "interval": interval,
+        "from": buckets[0],
+        "to": range_end - timedelta(microseconds=1),
+        "dates": [bucket.strftime(label) for bucket in buckets],
+        "sales": sales,
+        "orders": orders,
+        "previous": {
+            "from": previous[0],
+            "to": buckets[0] - timedelta(microseconds=1),
+            "dates": [bucket.strftime(label) for bucket in previous],
+            "sales": previous_sales,
+            "orders": previous_orders,
+        },
+        "totals": {
+            "sales": round(sum(sales), 2),
+            "orders": sum(orders),
+            "previous_sales": round(sum(previous_sales), 2),
+            "previous_orders": sum(previous_orders),
+            "sales_change_pct": _change_pct(sum(sales), sum(previous_sales)),
+            "orders_change_pct": _change_pct(sum(orders), sum(previous_orders)),
+        },
+    }
+
+
+def _merge(target: Dict[str, Any], inc: Dict[str, float]) -> None:
+    for path, amount in inc.items():
+        node = target
+        *parents, leaf = path.split(".")
+        for key in parents:
+            node = node.setdefault(key, {})
+        node[leaf] = node.get(leaf, 0) + amount
+
+
+async def rebuild(db, start: Optional[datetime] = None, end: Optional[datetime] = None) -> int:
+    """
+    Recompute rollups from orders, replacing the days in [start, end].
+
+    Orders are streamed one at a time; only the per-day rollups are held in memory.
+    Orders written while the rebuild runs may be counted twice or missed, so run it
+    during a quiet period.
+
+    Args:
+        db: MongoDB database instance
+        start: First day to rebuild (default: all history)
+        end: Last day to rebuild (default: today)
+
+    Returns:
+        Number of rollup days written
+    """
+    range_start = day_start(start) if start else None
+    range_end = day_start(end) + timedelta(days=1) if end else None
+
+    days: Dict[str, Dict[str, Any]] = {}
+    projection = {"_id": 0, "created_at": 1, "total": 1, "order_status": 1, "payment_status": 1, "items": 1}
+    async for order in db.orders.find(date_range_filter("created_at", gte=range_start, lt=range_end), projection):
+        if not order.get("created_at"):
+            continue
+        key = day_key(order["created_at"])
+        rollup = days.setdefault(key, {"_id": key, "date": day_start(order["created_at"])})
+        _merge(rollup, created_increments(order))
+        for item in order.get("items") or []:
+            rollup["products"][item["product_id"]]["name"] = item.get("name")
+
+    delete_query: Dict[str, Any] = {}
+    if range_start or range_end:
+        delete_query["date"] = {}
+        if range_start:
+            delete_query["date"]["$gte"] = range_start
+        if range_end:
+            delete_query["date"]["$lt"] = range_end
+    await db[ROLLUP_COLLECTION].delete_many(delete_query)
+
+    now = datetime.now(timezone.utc)
+    rows: List[Dict[str, Any]] = [{**rollup, "updated_at": now} for rollup in days.values()]
+    if rows:
+        await db[ROLLUP_COLLECTION].insert_many(rows, ordered=False)
+    return len(rows)
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from utils.dates import parse_datetime_param
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Sales rollup maintenance")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--from", dest="date_from", help="First day to rebuild (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", help="Last day to rebuild (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    async def main():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+        db = client[os.environ['DB_NAME']]
+        written = await rebuild(db, parse_datetime_param(args.date_from), parse_datetime_param(args.date_to))
+        print(f"Rebuilt {written} daily sales rollups")
+        client.close()
+
+    asyncio.run(main())
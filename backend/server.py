@@ -1,19 +1,25 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Request, Response, Depends, Query, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Response, Depends, Query, UploadFile, File, Form, Header
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from fastapi.exception_handlers import http_exception_handler
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import OperationFailure
 import os
 import logging
 import uuid
 import razorpay
 # import resend  # Replaced with ZeptoMail
 import asyncio
+import time
 import json
 import hmac
 import hashlib
 import shutil
+import re
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -21,34 +27,59 @@ ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 from pydantic import BaseModel, Field, EmailStr, ConfigDict
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Callable
 from datetime import datetime, timezone, timedelta
 from bson import ObjectId
-import httpx
 import base64
 from shipping import get_shipping_rate, ShippingError
+from email_templates import render_email
+from order_export import stream_orders
+import sales_rollups
+import sales_counters
+import customer_stats
+import analytics_snapshots
 
 # Security modules
 from core.security import (
-    check_account_lockout, record_failed_login, clear_failed_attempts,
-    hash_reset_code, verify_reset_code, create_access_token, create_refresh_token
+    get_login_account, record_failed_login, complete_login,
+    hash_reset_code, verify_reset_code, create_access_token, create_refresh_token,
+    verify_token, ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_HOURS
 )
-from core.rate_limit import limiter, rate_limit_exceeded_handler
+from core.session import create_token_cookies, clear_token_cookies, ACCESS_COOKIE_NAME, REFRESH_COOKIE_NAME
+from core import auth_tokens
+from core.rate_limit import limiter, rate_limit_exceeded_handler, enforce_account_limit, RateLimitExceeded
 from core.headers import SecurityHeadersMiddleware
+from core.http_clients import http_clients, get_http_client
+from core.leases import LeaderLease
+from core.background import BackgroundDispatcher
+from core.idempotency import IdempotencyStore
+from core.settings_cache import SettingsCache
+from core.read_routing import ReadRouter
+from core.session_cache import SessionCache
+from core.sessions import create_session, delete_session, delete_user_sessions, ensure_indexes as ensure_session_indexes
+from core.passwords import PasswordHasher, PasswordHasherBusy
+from core.logging_setup import setup_logging, stop_logging, logging_stats
 from utils.hashers import hash_sha256, verify_sha256
 from utils.file_validator import secure_file_upload
+from utils.pagination import decode_cursor, keyset_filter, next_cursor
+from utils.cache import TTLCache
+from utils.dates import parse_datetime_param, as_datetime, date_range_filter
 from utils.audit_logger import (
     log_failed_login, log_account_locked, log_password_reset_request,
     log_password_reset_success, log_admin_action, log_order_lookup
 )
-from slowapi.errors import RateLimitExceeded
 
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, tz_aware=True)
 db = client[os.environ['DB_NAME']]
 
+# Heavy read-only admin routes may be served by secondaries; checkout and carts stay on `db` (primary)
+read_router = ReadRouter(client, os.environ['DB_NAME'])
+analytics_db = read_router.database("analytics")
+admin_lists_db = read_router.database("admin_lists")
+
 # Razorpay setup (test keys)
 RAZORPAY_KEY_ID = os.environ.get('RAZORPAY_KEY_ID', 'rzp_test_placeholder')
 RAZORPAY_KEY_SECRET = os.environ.get('RAZORPAY_KEY_SECRET', 'placeholder_secret')
@@ -78,8 +109,13 @@ GOOGLE_CLIENT_ID = os.environ.get('GOOGLE_CLIENT_ID')
 GOOGLE_CLIENT_SECRET = os.environ.get('GOOGLE_CLIENT_SECRET')
 GOOGLE_REDIRECT_URI = os.environ.get('GOOGLE_REDIRECT_URI')
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Per-account Rate Limit Configuration (on top of the per-IP route limits)
+LOGIN_ACCOUNT_RATE_LIMIT = os.environ.get('LOGIN_ACCOUNT_RATE_LIMIT', '10/15minutes')
+PASSWORD_RESET_ACCOUNT_RATE_LIMIT = os.environ.get('PASSWORD_RESET_ACCOUNT_RATE_LIMIT', '5/hour')
+RESET_CODE_ACCOUNT_RATE_LIMIT = os.environ.get('RESET_CODE_ACCOUNT_RATE_LIMIT', '10/15minutes')
+
+# Configure logging (queued; see core/logging_setup.py)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # ==================== PYDANTIC MODELS ====================
@@ -179,6 +215,7 @@ class StoreSettings(BaseModel):
     low_stock_threshold: int = 5
     free_shipping_threshold: float = 999
     cod_enabled: bool = True
+    cod_fee: float = 100
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class ContentPageUpdate(BaseModel):
@@ -287,6 +324,22 @@ class OrderCreate(BaseModel):
     coupon_code: Optional[str] = None
     payment_method: str
 
+class BulkOrderStatusEntry(BaseModel):
+    order_id: str
+    order_status: str
+
+class BulkOrderStatusUpdate(BaseModel):
+    updates: List[BulkOrderStatusEntry] = Field(..., min_length=1, max_length=500)
+
+class BulkOrderTrackingEntry(BaseModel):
+    order_id: str
+    courier_name: Optional[str] = None
+    tracking_number: str
+    tracking_url: Optional[str] = None
+
+class BulkOrderTrackingUpdate(BaseModel):
+    updates: List[BulkOrderTrackingEntry] = Field(..., min_length=1, max_length=500)
+
 class ShippingRateRequest(BaseModel):
     country: str
     pincode: str
@@ -313,80 +366,83 @@ class AdminUser(BaseModel):
     locked_until: Optional[datetime] = None
 
 
-class UserSession(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    session_id: str = Field(default_factory=lambda: f"sess_{uuid.uuid4().hex[:16]}")
-    user_id: str
-    session_token: str
-    expires_at: datetime
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-
 # ==================== HELPER FUNCTIONS ====================
 
-async def get_current_admin(request: Request) -> Optional["AdminUser"]:
-    """Get current admin from session token in cookie or header"""
+def get_session_token(request: Request) -> Optional[str]:
+    """Session token from the cookie, falling back to a Bearer Authorization header"""
     session_token = request.cookies.get("session_token")
     if not session_token:
         auth_header = request.headers.get("Authorization")
         if auth_header and auth_header.startswith("Bearer "):
             session_token = auth_header[7:]
-    
-    if not session_token:
-        return None
-    
-    session_doc = await db.user_sessions.find_one({"session_token": session_token}, {"_id": 0})
-    if not session_doc:
-        return None
-    
-    expires_at = session_doc.get("expires_at")
-    if isinstance(expires_at, str):
-        expires_at = datetime.fromisoformat(expires_at)
-    if expires_at.tzinfo is None:
-        expires_at = expires_at.replace(tzinfo=timezone.utc)
-    if expires_at < datetime.now(timezone.utc):
+    return session_token
+
+def principal_from_access_token(token: str):
+    """Build an AdminUser or User from a verified JWT access token's claims, without a DB lookup"""
+    # Outside AUTH_MODE=jwt no JWT is ever issued, so none is accepted either
+    if not auth_tokens.JWT_AUTH_ENABLED:
         return None
-    
-    user_doc = await db.admin_users.find_one({"user_id": session_doc["user_id"]}, {"_id": 0})
-    if not user_doc:
+    payload = verify_token(token, "access")
+    if not payload:
         return None
-    
-    return AdminUser(**user_doc)
+    if payload.get("is_admin"):
+        return AdminUser.model_construct(user_id=payload["sub"], email=payload.get("email"), name=payload.get("name"), picture=payload.get("picture", ""))
+    return User.model_construct(user_id=payload["sub"], email=payload.get("email"), name=payload.get("name"))
+
+async def get_current_principal(request: Request):
+    """Resolve the request to an AdminUser or User (JWT verified in-process, session tokens cached per worker)"""
+    access_token = request.cookies.get(ACCESS_COOKIE_NAME)
+    if access_token:
+        principal = principal_from_access_token(access_token)
+        if principal:
+            return principal
+    
+    # Legacy sess_... tokens keep working in every AUTH_MODE
+    token = get_session_token(request)
+    if auth_tokens.is_jwt(token):
+        return principal_from_access_token(token)
+    return await session_cache.resolve(token)
+
+async def require_fresh_login(request: Request) -> None:
+    """
+    Reject a request whose JWT access cookie has expired with 401.
+
+    For endpoints that work anonymously but should be attributed when logged in:
+    without this, an expired login would silently be treated as a guest. The 401
+    makes the client refresh the token and retry.
+    """
+    access_token = request.cookies.get(ACCESS_COOKIE_NAME)
+    if auth_tokens.JWT_AUTH_ENABLED and access_token and not principal_from_access_token(access_token):
+        raise HTTPException(status_code=401, detail="Session expired")
+
+async def auth_error_handler(request: Request, exc: StarletteHTTPException):
+    """Flag 401s from requests carrying JWT cookies as `refreshable`, so the client only calls /auth/refresh when it can help"""
+    has_jwt_cookies = request.cookies.get(ACCESS_COOKIE_NAME) or request.cookies.get(REFRESH_COOKIE_NAME)
+    if exc.status_code == 401 and auth_tokens.JWT_AUTH_ENABLED and has_jwt_cookies:
+        return JSONResponse(status_code=401, content={"detail": exc.detail, "refreshable": True}, headers=exc.headers)
+    return await http_exception_handler(request, exc)
+
+async def issue_jwt_cookies(response: Response, principal: Dict[str, Any], is_admin: bool) -> None:
+    """Start a JWT login: record a new refresh token family and set both token cookies"""
+    tokens = await auth_tokens.issue_tokens(db, principal, is_admin)
+    create_token_cookies(
+        response,
+        tokens["access_token"],
+        tokens["refresh_token"],
+        # The cookie outlives the JWT inside it so an expired login is still visible (see require_fresh_login)
+        access_max_age=REFRESH_TOKEN_EXPIRE_HOURS * 60 * 60,
+        refresh_max_age=REFRESH_TOKEN_EXPIRE_HOURS * 60 * 60
+    )
+
+async def get_current_admin(request: Request) -> Optional["AdminUser"]:
+    """Get current admin from session token in cookie or header"""
+    principal = await get_current_principal(request)
+    return principal if isinstance(principal, AdminUser) else None
 
 async def get_current_user(request: Request) -> Optional["User"]:
     """Get current customer from session token"""
-    logger.info(f"get_current_user called from {request.url.path}")
-    logger.info(f"Cookies received: {list(request.cookies.keys())}")
-    
-    session_token = request.cookies.get("session_token")
-    if not session_token:
-        logger.warning("No session_token in cookies, checking Authorization header")
-        auth_header = request.headers.get("Authorization")
-        if auth_header and auth_header.startswith("Bearer "):
-            session_token = auth_header[7:]
-            logger.info("Found token in Authorization header")
-            
-    if not session_token:
-        logger.warning("No session token found in cookies or headers")
-        return None
-    
-    session_doc = await db.user_sessions.find_one({"session_token": session_token}, {"_id": 0})
-    if not session_doc:
-        return None
-    
-    # Check expiry
-    expires_at = session_doc.get("expires_at")
-    if isinstance(expires_at, str):
-        expires_at = datetime.fromisoformat(expires_at)
-    if expires_at.tzinfo is None:
-        expires_at = expires_at.replace(tzinfo=timezone.utc)
-    if expires_at < datetime.now(timezone.utc):
-        return None
-    
-    user_doc = await db.users.find_one({"user_id": session_doc["user_id"]}, {"_id": 0})
-    if not user_doc:
-        return None
-    
-    return User(**user_doc)
+    principal = await get_current_principal(request)
+    return principal if isinstance(principal, User) else None
 
 async def require_admin(request: Request) -> "AdminUser":
     """Require admin authentication"""
@@ -395,13 +451,13 @@ async def require_admin(request: Request) -> "AdminUser":
         raise HTTPException(status_code=401, detail="Authentication required")
     return admin
 
-async def send_order_email(email: str, subject: str, html_content: str):
+async def send_order_email(email: str, subject: str, html_content: str, text_content: Optional[str] = None):
     """Send email using ZeptoMail (non-blocking)"""
     if not ZEPTOMAIL_API_KEY:
         logger.warning("ZEPTOMAIL_API_KEY not configured, skipping email")
         return
     
-    url = f"https://api.zeptomail.{ZEPTOMAIL_REGION}/v1.1/email"
+    url = "/v1.1/email"
     
     # If the key already contains the prefix, use it as is. Otherwise prepend Zoho-enczapikey
     auth_header = ZEPTOMAIL_API_KEY if ZEPTOMAIL_API_KEY.startswith("Zoho-") else f"Zoho-enczapikey {ZEPTOMAIL_API_KEY}"
@@ -428,25 +484,53 @@ async def send_order_email(email: str, subject: str, html_content: str):
         "subject": subject,
         "htmlbody": html_content
     }
+    if text_content:
+        payload["textbody"] = text_content
     
     # ZeptoMail uses the default bounce address configured for the domain
     # if not provided in the payload. Providing it manually was causing 401 errors.
     # if ZEPTOMAIL_BOUNCE_ADDRESS:
     #     payload["bounce_address"] = ZEPTOMAIL_BOUNCE_ADDRESS
 
-    logger.info(f"Attempting to send email to {email} via {url}")
+    logger.debug(f"Attempting to send email to {email} via ZeptoMail")
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, headers=headers, json=payload)
-            if response.status_code not in [200, 201]:
-                logger.error(f"ZeptoMail API error: {response.status_code} - {response.text}")
-            else:
-                logger.info(f"Email sent successfully via ZeptoMail to {email}")
-                logger.debug(f"ZeptoMail Response: {response.text}")
+        client = get_http_client("zeptomail")
+        response = await client.post(url, headers=headers, json=payload)
+        if response.status_code not in [200, 201]:
+            logger.error(f"ZeptoMail API error: {response.status_code} - {response.text}")
+        else:
+            logger.info(f"Email sent successfully via ZeptoMail to {email}")
+            logger.debug(f"ZeptoMail Response: {response.text}")
     except Exception as e:
         logger.error(f"Failed to send email via ZeptoMail: {e}")
 
+# Outbound emails are delivered by background workers so handlers don't wait on ZeptoMail
+email_queue = BackgroundDispatcher("email", workers=int(os.environ.get("EMAIL_WORKERS", "2")))
+
+# Store settings are served from memory; writes and other workers' changes refresh it
+store_settings = SettingsCache(db, StoreSettings)
+
+def enqueue_email(email: str, subject: str, rendered) -> bool:
+    """Queue a rendered email for background delivery"""
+    return email_queue.submit(send_order_email, email, subject, rendered.html, rendered.text)
+
+async def create_razorpay_order(amount_paise: int, receipt: str) -> Dict[str, Any]:
+    """Create a Razorpay order over the pooled Razorpay client (the SDK call is blocking)"""
+    client = get_http_client("razorpay")
+    response = await client.post(
+        "/orders",
+        auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET),
+        json={
+            "amount": amount_paise,
+            "currency": "INR",
+            "receipt": receipt,
+            "payment_capture": 1
+        }
+    )
+    response.raise_for_status()
+    return response.json()
+
 async def log_activity(admin_id: str, admin_name: str, action: str, type: str, description: str):
     """Log admin activity"""
     activity = {
@@ -455,335 +539,22 @@ async def log_activity(admin_id: str, admin_name: str, action: str, type: str, d
         "action": action, # create, update, delete
         "type": type, # order, product, coupon, settings
         "description": description,
-        "timestamp": datetime.now(timezone.utc).isoformat()
+        "timestamp": datetime.now(timezone.utc)
     }
     await db.activity_log.insert_one(activity)
 
-# ==================== EMAIL TEMPLATES ====================
-
-def get_email_header():
-    return """
-    <div style="background: linear-gradient(135deg, #db2777 0%, #ec4899 50%, #f43f5e 100%); color: #ffffff; padding: 40px 20px; text-align: center; border-radius: 12px 12px 0 0;">
-        <h1 style="margin: 0; font-size: 24px; letter-spacing: 4px; text-transform: uppercase; font-weight: 700;">DUBAI SR</h1>
-        <p style="margin: 5px 0 0; opacity: 0.9; font-size: 12px; letter-spacing: 2px;">Premium Ethnic Fashion</p>
-    </div>
-    """
-
-def get_email_footer():
-    return """
-    <div style="background: #FAFAF9; padding: 25px; text-align: center; font-size: 11px; color: #6b7280; border-top: 1px solid #f3f4f6; border-radius: 0 0 12px 12px;">
-        <p>&copy; 2026 Dubai SR. All rights reserved.</p>
-        <p>3192-A Behind Golcha Cinema, Partap Street, Darya Ganj, Delhi-2</p>
-        <p>Premium Fabrics | Traditional Craftsmanship | Modern Elegance</p>
-        <p style="margin-top: 10px;">
-            <a href="https://srfashiondubai.com/returns-policy" style="color: #db2777; text-decoration: none; font-weight: 600;">Returns & Exchanges</a> | 
-            <a href="https://srfashiondubai.com/shipping-policy" style="color: #db2777; text-decoration: none; font-weight: 600;">Shipping Information</a>
-        </p>
-        <p style="margin-top: 10px;">Contact us: srdubaifashion@gmail.com | WhatsApp: +91 85953 71004</p>
-    </div>
-    """
-
-def generate_order_confirmation_html(order: Any):
-    # order can be Pydantic model or dict
-    if hasattr(order, "model_dump"):
-        order_data = order.model_dump()
-    else:
-        order_data = order
-
-    items_html = ""
-    for item in order_data["items"]:
-        item_price = float(item.get('sale_price') or item['price']) * item['quantity']
-        formatted_price = f"{item_price:.2f}"
-        items_html += f"""
-        <div style="display: flex; justify-content: space-between; border-bottom: 1px solid #fbcfe8; padding: 10px 0;">
-            <span style="font-weight: 600;">{item['name']} (x{item['quantity']})</span>
-            <span>Rs. {formatted_price}</span>
-        </div>
-        """
-
-    total_amount = float(order_data['total'])
-    formatted_total = f"{total_amount:.2f}"
-    
-    return f"""
-    <div style="font-family: 'Segoe UI', Arial, sans-serif; line-height: 1.6; color: #1C1917; max-width: 600px; margin: 20px auto; background: #ffffff; border-radius: 12px; box-shadow: 0 10px 30px rgba(0,0,0,0.05); border: 1px solid #fce7f3;">
-        {get_email_header()}
-        <div style="padding: 30px;">
-            <div style="display: inline-block; padding: 4px 12px; background: #fdf2f8; color: #db2777; border-radius: 15px; font-size: 11px; font-weight: 700; text-transform: uppercase; letter-spacing: 1px; margin-bottom: 15px; border: 1px solid #fbcfe8;">Order Status: Processing</div>
-            <h2 style="margin-top: 0; font-size: 20px;">Thank you for your order!</h2>
-            <p>Hi {order_data['shipping_address']['full_name']},</p>
-            <p>Your order <span style="color: #D4AF37; font-weight: bold;">#{order_data['order_id']}</span> has been confirmed. We are carefully preparing your items for shipment.</p>
-            
-            <div style="background: #fff8e1; border: 1px dashed #ffb300; padding: 15px; border-radius: 8px; font-size: 13px; color: #856404; margin: 20px 0; text-align: center;">
-                <strong>Note:</strong> Your order is under processing. Tracking details will be updated here and emailed to you as soon as the package is dispatched.
-            </div>
-
-            <div style="background: #FDF2F8; padding: 20px; border-radius: 8px; margin-bottom: 25px; border-left: 4px solid #db2777;">
-                <p style="margin-top: 0; font-weight: bold;">Order Summary:</p>
-                {items_html}
-                <div style="display: flex; justify-content: space-between; padding: 15px 0 0; font-size: 18px; font-weight: bold; color: #db2777;">
-                    <span>Total Amount</span>
-                    <span>Rs. {formatted_total}</span>
-                </div>
-            </div>
-
-            <p style="font-size: 14px;"><strong>Shipping Address:</strong><br>
-            {order_data['shipping_address']['full_name']}<br>
-            {order_data['shipping_address']['address_line1']}, {order_data['shipping_address']['city']}<br>
-            {order_data['shipping_address']['state']} - {order_data['shipping_address']['pincode']}</p>
-
-            <div style="text-align: center; margin-top: 25px;">
-                <a href="https://srfashiondubai.com/track-order" style="display: inline-block; padding: 12px 30px; background: linear-gradient(90deg, #f59e0b 0%, #facc15 100%); color: #ffffff; text-decoration: none; border-radius: 50px; font-weight: bold; text-transform: uppercase; letter-spacing: 1px;">Track Your Order</a>
-            </div>
-            <p style="text-align: center; margin-top: 15px; font-size: 13px; color: #78716c;">Use Order ID: <strong>{order_data['order_id']}</strong> to track your order</p>
-        </div>
-        {get_email_footer()}
-    </div>
-    """
-
-def generate_order_shipped_html(order: Any):
-    if hasattr(order, "model_dump"):
-        order_data = order.model_dump()
-    else:
-        order_data = order
-
-    tracking_url = order_data.get("tracking_url") or "#"
-    
-    return f"""
-    <div style="font-family: 'Segoe UI', Arial, sans-serif; line-height: 1.6; color: #1C1917; max-width: 600px; margin: 20px auto; background: #ffffff; border-radius: 12px; box-shadow: 0 10px 30px rgba(0,0,0,0.05); border: 1px solid #fce7f3;">
-        {get_email_header()}
-        <div style="padding: 30px;">
-            <div style="display: inline-block; padding: 4px 12px; background: #ecfdf5; color: #059669; border-radius: 15px; font-size: 11px; font-weight: 700; text-transform: uppercase; letter-spacing: 1px; margin-bottom: 15px; border: 1px solid #a7f3d0;">Order Status: Shipped</div>
-            <h2 style="margin-top: 0; font-size: 20px;">Your order is on the way!</h2>
-            <p>Hi {order_data['shipping_address']['full_name']},</p>
-            <p>Great news! Your order <span style="color: #db2777; font-weight: bold;">#{order_data['order_id']}</span> has been shipped via <b>{order_data.get('courier_name', 'our courier partner')}</b>.</p>
-            
-            <div style="background: #FDF2F8; padding: 20px; border-radius: 8px; margin: 20px 0; border: 1px solid #fbcfe8;">
-                <p style="margin-top: 0; font-weight: bold;">Tracking Information:</p>
-                <p style="margin-bottom: 5px;">Courier: {order_data.get('courier_name', 'N/A')}</p>
-                <p style="margin-bottom: 15px;">Tracking ID: <span style="color: #db2777; font-weight: bold;">{order_data.get('tracking_number', 'N/A')}</span></p>
-                <a href="{tracking_url}" style="display: inline-block; padding: 10px 20px; background: #db2777; color: #ffffff; text-decoration: none; border-radius: 8px; font-weight: bold; font-size: 14px;">Track Package</a>
-            </div>
-
-            <p style="font-size: 14px;">Once your package arrives, feel free to share your look on Instagram and tag us <b>@samairaonline786_6</b>!</p>
-
-            <div style="text-align: center; margin-top: 25px;">
-                <a href="https://srfashiondubai.com/track-order" style="display: inline-block; padding: 12px 30px; background: #f3f4f6; color: #374151; text-decoration: none; border-radius: 50px; font-weight: bold; text-transform: uppercase; letter-spacing: 1px; font-size: 12px; border: 1px solid #d1d5db;">Track Your Order</a>
-            </div>
-            <p style="text-align: center; margin-top: 15px; font-size: 13px; color: #78716c;">Use Order ID: <strong>{order_data['order_id']}</strong></p>
-        </div>
-        {get_email_footer()}
-    </div>
-    """
-
-def generate_order_delivered_html(order: Any):
-    if hasattr(order, "model_dump"):
-        order_data = order.model_dump()
-    else:
-        order_data = order
-
-    return f"""
-    <div style="font-family: 'Segoe UI', Arial, sans-serif; line-height: 1.6; color: #1C1917; max-width: 600px; margin: 20px auto; background: #ffffff; border-radius: 12px; box-shadow: 0 10px 30px rgba(0,0,0,0.05); border: 1px solid #fce7f3;">
-        {get_email_header()}
-        <div style="padding: 30px;">
-            <div style="display: inline-block; padding: 4px 12px; background: #d1fae5; color: #065f46; border-radius: 15px; font-size: 11px; font-weight: 700; text-transform: uppercase; letter-spacing: 1px; margin-bottom: 15px; border: 1px solid #6ee7b7;">Order Status: Delivered</div>
-            <h2 style="margin-top: 0; font-size: 20px;">Your order has been delivered! 🎉</h2>
-            <p>Hi {order_data['shipping_address']['full_name']},</p>
-            <p>Great news! Your order <span style="color: #db2777; font-weight: bold;">#{order_data['order_id']}</span> has been successfully delivered.</p>
-            
-            <div style="background: #FDF2F8; padding: 20px; border-radius: 8px; margin: 20px 0; border: 1px solid #fbcfe8;">
-                <p style="margin-top: 0; font-weight: bold;">We hope you love your purchase!</p>
-                <p style="margin-bottom: 0; font-size: 14px;">If you have any questions or concerns about your order, please do not hesitate to reach out to us.</p>
-            </div>
-
-            <p style="font-size: 14px;">Share your look on Instagram and tag us <b>@samairaonline786_6</b>! We would love to see how you style your new pieces.</p>
-
-            <div style="text-align: center; margin-top: 25px;">
-                <a href="https://srfashiondubai.com/shop" style="display: inline-block; padding: 12px 30px; background: linear-gradient(90deg, #f59e0b 0%, #facc15 100%); color: #ffffff; text-decoration: none; border-radius: 50px; font-weight: bold; text-transform: uppercase; letter-spacing: 1px;">Shop More</a>
-            </div>
-        </div>
-        {get_email_footer()}
-    </div>
-    """
-
-def generate_order_cancelled_manual_html(order: Any):
-    """Email for when admin manually cancels an order"""
-    if hasattr(order, "model_dump"):
-        order_data = order.model_dump()
-    else:
-        order_data = order
-
-    return f"""
-    <div style="font-family: 'Segoe UI', Arial, sans-serif; line-height: 1.6; color: #1C1917; max-width: 600px; margin: 20px auto; background: #ffffff; border-radius: 12px; box-shadow: 0 10px 30px rgba(0,0,0,0.05); border: 1px solid #fce7f3;">
-        {get_email_header()}
-        <div style="padding: 30px;">
-            <div style="display: inline-block; padding: 4px 12px; background: #fee2e2; color: #991b1b; border-radius: 15px; font-size: 11px; font-weight: 700; text-transform: uppercase; letter-spacing: 1px; margin-bottom: 15px; border: 1px solid #fecaca;">Status: Cancelled</div>
-            <h2 style="margin-top: 0; font-size: 20px;">Order Cancelled</h2>
-            <p>Hi {order_data['shipping_address']['full_name']},</p>
-            <p>Your order <span style="color: #db2777; font-weight: bold;">#{order_data['order_id']}</span> has been cancelled.</p>
-            
-            <div style="background: #FEF2F2; padding: 20px; border-radius: 8px; margin: 20px 0; border: 1px solid #fecaca;">
-                <p style="margin-top: 0; font-weight: bold;">What happens next?</p>
-                <p style="margin-bottom: 5px; font-size: 14px;">- Our sales representative will contact you shortly</p>
-                <p style="margin-bottom: 0; font-size: 14px;">- You will receive a refund on your payment method in 5-7 business days</p>
-            </div>
-
-            <p style="font-size: 14px;">If you have any questions, please do not hesitate to reach out to our support team.</p>
-
-            <div style="text-align: center; margin-top: 25px;">
-                <a href="https://srfashiondubai.com/shop" style="display: inline-block; padding: 12px 30px; background: #f3f4f6; color: #374151; text-decoration: none; border-radius: 50px; font-weight: bold; text-transform: uppercase; letter-spacing: 1px; font-size: 12px; border: 1px solid #d1d5db;">Continue Shopping</a>
-            </div>
-        </div>
-        {get_email_footer()}
-    </div>
-    """
-
-def generate_order_cancelled_auto_html(order: Any):
-    """Email for when order is auto-cancelled due to non-payment"""
-    if hasattr(order, "model_dump"):
-        order_data = order.model_dump()
-    else:
-        order_data = order
-
-    return f"""
-    <div style="font-family: 'Segoe UI', Arial, sans-serif; line-height: 1.6; color: #1C1917; max-width: 600px; margin: 20px auto; background: #ffffff; border-radius: 12px; box-shadow: 0 10px 30px rgba(0,0,0,0.05); border: 1px solid #fce7f3;">
-        {get_email_header()}
-        <div style="padding: 30px;">
-            <div style="display: inline-block; padding: 4px 12px; background: #fee2e2; color: #991b1b; border-radius: 15px; font-size: 11px; font-weight: 700; text-transform: uppercase; letter-spacing: 1px; margin-bottom: 15px; border: 1px solid #fecaca;">Status: Cancelled</div>
-            <h2 style="margin-top: 0; font-size: 20px;">Order Cancelled</h2>
-            <p>Hi {order_data['shipping_address']['full_name']},</p>
-            <p>Your order <span style="color: #db2777; font-weight: bold;">#{order_data['order_id']}</span> has been cancelled because we didn't receive the payment within the required window.</p>
-            
-            <div style="background: #FEF2F2; padding: 20px; border-radius: 8px; margin: 20px 0; border: 1px solid #fecaca;">
-                <p style="margin-top: 0; font-weight: bold;">Items returned to inventory</p>
-                <p style="margin-bottom: 0; font-size: 14px;">The items have been returned to our inventory. If you still wish to purchase them, please place a new order on our website.</p>
-            </div>
-
-            <div style="text-align: center; margin-top: 25px;">
-                <a href="https://srfashiondubai.com/shop" style="display: inline-block; padding: 12px 30px; background: linear-gradient(90deg, #db2777 0%, #ec4899 100%); color: #ffffff; text-decoration: none; border-radius: 50px; font-weight: bold; text-transform: uppercase; letter-spacing: 1px;">Continue Shopping</a>
-            </div>
-        </div>
-        {get_email_footer()}
-    </div>
-    """
-
-def generate_cart_reminder_html(order: Any):
-    if hasattr(order, "model_dump"):
-        order_data = order.model_dump()
-    else:
-        order_data = order
-
-    items_html = ""
-    for item in order_data["items"]:
-        item_price = float(item.get('sale_price') or item['price']) * item['quantity']
-        formatted_price = f"{item_price:.2f}"
-        items_html += f"""
-        <div style="display: flex; justify-content: space-between; border-bottom: 1px solid #fbcfe8; padding: 10px 0;">
-            <span style="font-weight: 600;">{item['name']} (x{item['quantity']})</span>
-            <span>Rs. {formatted_price}</span>
-        </div>
-        """
-
-    total_amount = float(order_data['total'])
-    formatted_total = f"{total_amount:.2f}"
-    return f"""
-    <div style="font-family: 'Segoe UI', Arial, sans-serif; line-height: 1.6; color: #1C1917; max-width: 600px; margin: 20px auto; background: #ffffff; border-radius: 12px; box-shadow: 0 10px 30px rgba(0,0,0,0.05); border: 1px solid #fce7f3;">
-        {get_email_header()}
-        <div style="padding: 30px;">
-            <div style="display: inline-block; padding: 4px 12px; background: #fffbeb; color: #d97706; border-radius: 15px; font-size: 11px; font-weight: 700; text-transform: uppercase; letter-spacing: 1px; margin-bottom: 15px; border: 1px solid #fef3c7;">Reminder: Items in your Bag</div>
-            <h2 style="margin-top: 0; font-size: 20px;">Complete your order!</h2>
-            <p>Hi {order_data['shipping_address']['full_name']},</p>
-            <p>Your items are waiting in your bag! We've received your order request <span style="color: #db2777; font-weight: bold;">#{order_data['order_id']}</span>, but the checkout hasn't been completed yet.</p>
-            
-            <div style="background: #FDF2F8; padding: 20px; border-radius: 8px; margin: 20px 0; border: 1px solid #fbcfe8;">
-                <p style="margin-top: 0; font-weight: bold;">Order Summary:</p>
-                {items_html}
-                <div style="display: flex; justify-content: space-between; padding: 15px 0 0; font-size: 16px; font-weight: bold; color: #db2777;">
-                    <span>Total Amount</span>
-                    <span>Rs. {formatted_total}</span>
-                </div>
-                <div style="text-align: center; margin-top: 20px;">
-                    <p style="font-size: 13px; color: #6b7280; margin-bottom: 15px;">Complete your payment within <b>5 minutes</b> to secure these items.</p>
-                    <a href="https://srfashiondubai.com/account/orders/{order_data['order_id']}" style="display: inline-block; padding: 12px 30px; background: #db2777; color: #ffffff; text-decoration: none; border-radius: 50px; font-weight: bold; text-transform: uppercase; letter-spacing: 1px;">Complete Checkout</a>
-                </div>
-            </div>
-
-            <p style="font-size: 14px;">If you have already completed the payment, please ignore this email. Your order will be updated shortly.</p>
-        </div>
-        {get_email_footer()}
-    </div>
-    """
-
-def generate_payment_failed_html(order: Any):
-    if hasattr(order, "model_dump"):
-        order_data = order.model_dump()
-    else:
-        order_data = order
-
-    return f"""
-    <div style="font-family: 'Segoe UI', Arial, sans-serif; line-height: 1.6; color: #1C1917; max-width: 600px; margin: 20px auto; background: #ffffff; border-radius: 12px; box-shadow: 0 10px 30px rgba(0,0,0,0.05); border: 1px solid #fee2e2;">
-        {get_email_header()}
-        <div style="padding: 30px;">
-            <div style="display: inline-block; padding: 4px 12px; background: #fef2f2; color: #dc2626; border-radius: 15px; font-size: 11px; font-weight: 700; text-transform: uppercase; letter-spacing: 1px; margin-bottom: 15px; border: 1px solid #fecaca;">Status: Payment Failed</div>
-            <h2 style="margin-top: 0; font-size: 20px;">Payment Unsuccessful</h2>
-            <p>Hi {order_data['shipping_address']['full_name']},</p>
-            <p>We are sorry, but the payment for your order <span style="font-weight: bold;">#{order_data['order_id']}</span> was unsuccessful.</p>
-            
-            <div style="background: #f9fafb; padding: 20px; border-radius: 8px; margin: 20px 0; border: 1px solid #e5e7eb;">
-                <p style="margin-top: 0;">Your order has been cancelled and the items have been returned to inventory. If you would like to purchase these items, please place a new order on our website.</p>
-            </div>
-
-            <div style="text-align: center; margin-top: 25px;">
-                <a href="https://srfashiondubai.com/shop" style="display: inline-block; padding: 12px 30px; background: linear-gradient(90deg, #db2777 0%, #ec4899 100%); color: #ffffff; text-decoration: none; border-radius: 50px; font-weight: bold; text-transform: uppercase; letter-spacing: 1px;">Continue Shopping</a>
-            </div>
-            
-            <p style="font-size: 14px; margin-top: 25px;">If you need assistance, please reply to this email or contact us via WhatsApp.</p>
-        </div>
-        {get_email_footer()}
-    </div>
-    """
-
-def generate_order_cancelled_html(order: Any):
-    if hasattr(order, "model_dump"):
-        order_data = order.model_dump()
-    else:
-        order_data = order
-
-    return f"""
-    <div style="font-family: 'Segoe UI', Arial, sans-serif; line-height: 1.6; color: #1C1917; max-width: 600px; margin: 20px auto; background: #ffffff; border-radius: 12px; box-shadow: 0 10px 30px rgba(0,0,0,0.05); border: 1px solid #e5e7eb;">
-        {get_email_header()}
-        <div style="padding: 30px;">
-            <div style="display: inline-block; padding: 4px 12px; background: #f3f4f6; color: #4b5563; border-radius: 15px; font-size: 11px; font-weight: 700; text-transform: uppercase; letter-spacing: 1px; margin-bottom: 15px; border: 1px solid #e5e7eb;">Status: Cancelled</div>
-            <h2 style="margin-top: 0; font-size: 20px;">Order Cancelled</h2>
-            <p>Hi {order_data['shipping_address']['full_name']},</p>
-            <p>Your order <span style="font-weight: bold;">#{order_data['order_id']}</span> has been cancelled because we didn't receive the payment within the required window.</p>
-            
-            <p style="font-size: 14px;">The items have been returned to our inventory. If you still wish to purchase them, please place a new order on our website.</p>
-
-            <div style="text-align: center; margin-top: 25px;">
-                <a href="https://srfashiondubai.com/shop" style="display: inline-block; padding: 12px 30px; border: 1px solid #db2777; color: #db2777; text-decoration: none; border-radius: 50px; font-weight: bold; text-transform: uppercase; letter-spacing: 1px;">Continue Shopping</a>
-            </div>
-        </div>
-        {get_email_footer()}
-    </div>
-    """
-
-
 # ==================== PASSWORD HASHING ====================
-import bcrypt
+# bcrypt runs in a bounded thread pool so logins never block the event loop (see core/passwords.py)
+password_hasher = PasswordHasher()
 
-def verify_password(plain_password: str, hashed_password: str):
-    try:
-        if isinstance(hashed_password, str):
-            hashed_password = hashed_password.encode('utf-8')
-        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password)
-    except Exception as e:
-        logger.error(f"Password verification error: {e}")
-        return False
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
 
-def get_password_hash(password: str):
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed.decode('utf-8')
+async def get_password_hash(password: str) -> str:
+    return await password_hasher.hash(password)
+
+async def password_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(status_code=503, content={"detail": "Server busy, please try again"}, headers={"Retry-After": "1"})
 
 # ==================== USER MODELS ====================
 
@@ -798,6 +569,9 @@ class User(BaseModel):
     failed_login_attempts: int = 0
     locked_until: Optional[datetime] = None
 
+# Resolved sessions per worker (both admin and customer); see core/session_cache.py
+session_cache = SessionCache(db, AdminUser, User)
+
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -825,7 +599,6 @@ async def subscribe_marketing(lead: MarketingLead):
     
     # Save new lead
     lead_doc = lead.model_dump()
-    lead_doc["created_at"] = lead_doc["created_at"].isoformat()
     await db.marketing_leads.insert_one(lead_doc)
     return {"message": "Subscription successful"}
 
@@ -871,7 +644,7 @@ async def register(request: Request, user_data: UserCreate):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Hash password
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash(user_data.password)
     
     # Create user (Pydantic model will set default values for failed_login_attempts and locked_until)
     new_user = User(
@@ -882,24 +655,16 @@ async def register(request: Request, user_data: UserCreate):
     )
     
     user_doc = new_user.model_dump()
-    user_doc["created_at"] = user_doc["created_at"].isoformat()
     await db.users.insert_one(user_doc)
     
-    # Auto-login: Create session
-    session_token = f"sess_{uuid.uuid4().hex}"
-    expires_at = datetime.now(timezone.utc) + timedelta(days=7)
-    
-    session = UserSession(
-        user_id=new_user.user_id,
-        session_token=session_token,
-        expires_at=expires_at
-    )
+    user_info = {"user_id": new_user.user_id, "email": new_user.email, "name": new_user.name}
+    if auth_tokens.JWT_AUTH_ENABLED:
+        response = JSONResponse(content={"status": "success", "user": user_info})
+        await issue_jwt_cookies(response, user_info, is_admin=False)
+        return response
     
-    session_doc = session.model_dump()
-    session_doc["created_at"] = session_doc["created_at"].isoformat()
-    session_doc["expires_at"] = session_doc["expires_at"].isoformat()
-    
-    await db.user_sessions.insert_one(session_doc)
+    # Auto-login: Create session
+    session_token, _ = await create_session(db, new_user.user_id)
     
     # Return response with cookie
     response = JSONResponse(content={
@@ -935,26 +700,28 @@ async def register(request: Request, user_data: UserCreate):
 async def login(request: Request, login_data: UserLogin):
     """Login with email and password"""
     client_ip = request.client.host if request.client else "unknown"
+    await enforce_account_limit("login", login_data.email, LOGIN_ACCOUNT_RATE_LIMIT)
     
-    # Check account lockout
-    is_locked, locked_until = await check_account_lockout(db, login_data.email, "users")
-    if is_locked:
+    # One read loads the account and its lockout state
+    user, locked_until = await get_login_account(db, login_data.email, "users")
+    if locked_until:
         log_failed_login(login_data.email, client_ip, "account_locked")
         raise HTTPException(
             status_code=403, 
             detail=f"Account locked due to too many failed attempts. Try again after {locked_until.strftime('%Y-%m-%d %H:%M:%S UTC')}"
         )
     
-    user = await db.users.find_one({"email": login_data.email})
     if not user:
         log_failed_login(login_data.email, client_ip, "user_not_found")
         raise HTTPException(status_code=401, detail="Invalid email or password")
         
-    if not verify_password(login_data.password, user["hashed_password"]):
-        # Record failed attempt
-        failed_attempts = await record_failed_login(db, login_data.email, "users")
+    if not await verify_password(login_data.password, user["hashed_password"]):
+        # Record failed attempt (atomic increment + lock at the threshold)
+        failed_attempts, locked_until = await record_failed_login(db, login_data.email, "users")
         
-        if failed_attempts >= 5:
+        if locked_until:
+            session_cache.invalidate_user(user["user_id"])
+            await auth_tokens.revoke_user_tokens(db, user["user_id"])
             log_account_locked(login_data.email, client_ip, failed_attempts)
             raise HTTPException(
                 status_code=403,
@@ -964,25 +731,34 @@ async def login(request: Request, login_data: UserLogin):
         log_failed_login(login_data.email, client_ip, "invalid_password")
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
-    # Clear failed attempts on successful login
-    await clear_failed_attempts(db, login_data.email, "users")
-    
-    # Create session
-    session_token = f"sess_{uuid.uuid4().hex}"
-    expires_at = datetime.now(timezone.utc) + timedelta(days=7)
-    
-    session = UserSession(
-        user_id=user["user_id"],
-        session_token=session_token,
-        expires_at=expires_at
-    )
+    # Upgrade hashes made with an older BCRYPT_ROUNDS while we have the plain password
+    account_updates = {}
+    if password_hasher.needs_rehash(user["hashed_password"]):
+        account_updates["hashed_password"] = await password_hasher.hash(login_data.password)
+        password_hasher.rehashed += 1
+    
+    # Clear failed attempts on successful login (same write as the rehash), unless a parallel attempt locked the account
+    if not await complete_login(db, user, "users", account_updates):
+        _, locked_until = await get_login_account(db, login_data.email, "users")
+        if locked_until:
+            log_failed_login(login_data.email, client_ip, "account_locked")
+            raise HTTPException(
+                status_code=403,
+                detail=f"Account locked due to too many failed attempts. Try again after {locked_until.strftime('%Y-%m-%d %H:%M:%S UTC')}"
+            )
+        # The password was changed while this attempt was being checked
+        log_failed_login(login_data.email, client_ip, "password_changed")
+        raise HTTPException(status_code=401, detail="Invalid email or password")
     
-    session_doc = session.model_dump()
-    session_doc["created_at"] = session_doc["created_at"].isoformat()
-    session_doc["expires_at"] = session_doc["expires_at"].isoformat()
+    if auth_tokens.JWT_AUTH_ENABLED:
+        user_info = {"user_id": user["user_id"], "email": user["email"], "name": user["name"]}
+        response = JSONResponse(content={"status": "success", "user": user_info})
+        await issue_jwt_cookies(response, user_info, is_admin=False)
+        logger.info(f"Login successful for {user['email']}")
+        return response
     
-    # Remove old sessions? Optional.
-    await db.user_sessions.insert_one(session_doc)
+    # Create session (evicts the user's oldest beyond MAX_SESSIONS_PER_USER)
+    session_token, _ = await create_session(db, user["user_id"])
     
     response = JSONResponse(content={
         "status": "success", 
@@ -1015,8 +791,6 @@ async def login(request: Request, login_data: UserLogin):
     )
     
     logger.info(f"Login successful for {user['email']}")
-    logger.info(f"Cookie settings: secure={secure_flag}, samesite={samesite_value}, domain={cookie_domain}")
-    logger.info(f"Session token: {session_token[:10]}...")
     
     return response
 
@@ -1145,6 +919,7 @@ async def google_callback(
         
         if existing_user:
             user_id = existing_user["user_id"]
+            admin_doc = existing_user
         else:
             # Create new admin user
             new_user = AdminUser(
@@ -1153,26 +928,21 @@ async def google_callback(
                 picture=user_data.get("picture", "")
             )
             user_doc = new_user.model_dump()
-            user_doc["created_at"] = user_doc["created_at"].isoformat()
             await db.admin_users.insert_one(user_doc)
             user_id = new_user.user_id
+            admin_doc = user_doc
         
-        # 7. Create session
-        session_token = f"sess_{uuid.uuid4().hex}"
-        expires_at = datetime.now(timezone.utc) + timedelta(days=7)
+        if auth_tokens.JWT_AUTH_ENABLED:
+            redirect_response = RedirectResponse(url=get_admin_frontend_url(), status_code=302)
+            await issue_jwt_cookies(redirect_response, admin_doc, is_admin=True)
+            clear_state_cookie(redirect_response)
+            logger.info(f"OAuth successful for {email} (jwt)")
+            return redirect_response
         
-        session = UserSession(
-            user_id=user_id,
-            session_token=session_token,
-            expires_at=expires_at
-        )
-        session_doc = session.model_dump()
-        session_doc["created_at"] = session_doc["created_at"].isoformat()
-        session_doc["expires_at"] = session_doc["expires_at"].isoformat()
-        
-        # Delete old sessions for this user
-        await db.user_sessions.delete_many({"user_id": user_id})
-        await db.user_sessions.insert_one(session_doc)
+        # 7. Create session (deleting old sessions for this user)
+        await delete_user_sessions(db, user_id)
+        session_cache.invalidate_user(user_id)
+        session_token, _ = await create_session(db, user_id)
         
         # 8. Redirect to admin frontend with clean URL
         admin_url = get_admin_frontend_url()
@@ -1200,38 +970,61 @@ async def google_callback(
 @api_router.get("/auth/me")
 async def get_me(request: Request):
     """Get current user/admin profile"""
-    # 1. Try to find an admin session first
-    admin = await get_current_admin(request)
-    if admin:
-        admin_data = admin.model_dump()
-        admin_data["is_admin"] = True
-        return admin_data
-    
-    # 2. Try to find a regular customer session
-    user = await get_current_user(request)
-    if user:
-        user_data = user.model_dump()
-        user_data["is_admin"] = False
-        return user_data
+    # One session resolution covers both; admin sessions win as before
+    principal = await get_current_principal(request)
+    if not principal:
+        raise HTTPException(status_code=401, detail="Not authenticated")
     
-    # 3. No valid session found
-    raise HTTPException(status_code=401, detail="Not authenticated")
+    data = principal.model_dump(exclude={"hashed_password"})
+    data["is_admin"] = isinstance(principal, AdminUser)
+    return data
 
 @api_router.post("/auth/logout")
 async def logout(request: Request, response: Response):
     """Logout and clear session"""
     session_token = request.cookies.get("session_token")
     if session_token:
-        await db.user_sessions.delete_many({"session_token": session_token})
+        await delete_session(db, session_token)
+        session_cache.invalidate_token(session_token)
+    await auth_tokens.revoke_refresh_token(db, request.cookies.get(REFRESH_COOKIE_NAME))
     
     response.delete_cookie(key="session_token", path="/")
+    clear_token_cookies(response)
     return {"status": "success"}
 
+@api_router.post("/auth/refresh")
+@limiter.limit("30/minute")
+async def refresh_tokens(request: Request):
+    """Exchange the refresh token cookie for a new access/refresh token pair (rotation)"""
+    try:
+        tokens = None
+        if auth_tokens.JWT_AUTH_ENABLED:
+            tokens = await auth_tokens.rotate_refresh_token(db, request.cookies.get(REFRESH_COOKIE_NAME) or "")
+    except auth_tokens.RefreshTokenSuperseded:
+        # Another tab won the race and its response set the new cookies; leave them alone
+        return JSONResponse(status_code=409, content={"detail": "Refresh already in progress"})
+    if not tokens:
+        response = JSONResponse(status_code=401, content={"detail": "Session expired"})
+        clear_token_cookies(response)
+        return response
+    
+    response = JSONResponse(content={"status": "success", "is_admin": tokens["is_admin"]})
+    create_token_cookies(
+        response,
+        tokens["access_token"],
+        tokens["refresh_token"],
+        # The cookie outlives the JWT inside it so an expired login is still visible (see require_fresh_login)
+        access_max_age=REFRESH_TOKEN_EXPIRE_HOURS * 60 * 60,
+        refresh_max_age=REFRESH_TOKEN_EXPIRE_HOURS * 60 * 60
+    )
+    return response
+
 @api_router.post("/auth/forgot-password")
 @limiter.limit("3/minute")
 async def forgot_password(request: Request, reset_request: ForgotPasswordRequest):
     """Generate and send a password reset code"""
     client_ip = request.client.host if request.client else "unknown"
+    await enforce_account_limit("forgot_password", reset_request.email, PASSWORD_RESET_ACCOUNT_RATE_LIMIT)
     
     user = await db.users.find_one({"email": reset_request.email})
     if not user:
@@ -1251,7 +1044,7 @@ async def forgot_password(request: Request, reset_request: ForgotPasswordRequest
     await db.password_resets.insert_one({
         "email": reset_request.email,
         "code_hash": code_hash,  # Store hashed code
-        "expires_at": expires_at.isoformat()
+        "expires_at": expires_at
     })
     
     # Log password reset request
@@ -1259,21 +1052,9 @@ async def forgot_password(request: Request, reset_request: ForgotPasswordRequest
     
     # Send email
     subject = "Password Reset Verification Code - Dubai SR"
-    html_content = f"""
-        <div style="font-family: 'Playfair Display', serif; max-width: 600px; margin: 0 auto; padding: 40px; border: 1px solid #f0f0f0; border-radius: 12px;">
-            <h2 style="color: #1c1c1c; text-align: center; margin-bottom: 30px;">Verification Code</h2>
-            <p style="color: #444; line-height: 1.6; font-size: 16px;">Hello,</p>
-            <p style="color: #444; line-height: 1.6; font-size: 16px;">We received a request to reset your password. Use the following 6-digit verification code to proceed:</p>
-            <div style="background-color: #fff5f7; border: 1px dashed #ffb6c1; border-radius: 8px; padding: 20px; text-align: center; margin: 30px 0;">
-                <span style="font-size: 32px; font-weight: bold; letter-spacing: 12px; color: #db2777;">{reset_code}</span>
-            </div>
-            <p style="color: #666; font-size: 14px; line-height: 1.6;">This code is valid for 15 minutes. If you did not request this, please ignore this email.</p>
-            <hr style="border: 0; border-top: 1px solid #eee; margin: 30px 0;" />
-            <p style="color: #999; font-size: 12px; text-align: center;">&copy; 2026 Dubai SR - Premium Ethnic Fashion</p>
-        </div>
-    """
+    email = render_email("password_reset", reset_code=reset_code)
     
-    await send_order_email(request.email, subject, html_content)
+    await send_order_email(reset_request.email, subject, email.html, email.text)
     
     return {"status": "success", "message": "Verification code sent to your email."}
 
@@ -1281,6 +1062,8 @@ async def forgot_password(request: Request, reset_request: ForgotPasswordRequest
 @limiter.limit("5/minute")
 async def verify_reset_code(http_request: Request, request: VerifyResetCodeRequest):
     """Verify the 6-digit password reset code"""
+    # Shared with reset-password so guesses across both endpoints count together
+    await enforce_account_limit("reset_code", request.email, RESET_CODE_ACCOUNT_RATE_LIMIT)
     reset_doc = await db.password_resets.find_one({"email": request.email})
     
     if not reset_doc:
@@ -1290,10 +1073,7 @@ async def verify_reset_code(http_request: Request, request: VerifyResetCodeReque
     if not verify_sha256(request.code, reset_doc["code_hash"]):
         raise HTTPException(status_code=400, detail="Invalid verification code")
         
-    expires_at = datetime.fromisoformat(reset_doc["expires_at"])
-    if expires_at.tzinfo is None:
-        expires_at = expires_at.replace(tzinfo=timezone.utc)
-        
+    expires_at = as_datetime(reset_doc["expires_at"])
     if expires_at < datetime.now(timezone.utc):
         await db.password_resets.delete_one({"_id": reset_doc["_id"]})
         raise HTTPException(status_code=400, detail="Verification code has expired")
@@ -1305,6 +1085,7 @@ async def verify_reset_code(http_request: Request, request: VerifyResetCodeReque
 async def reset_password(http_request: Request, request: ResetPasswordRequest):
     """Reset the password after verification"""
     client_ip = http_request.client.host if http_request.client else "unknown"
+    await enforce_account_limit("reset_code", request.email, RESET_CODE_ACCOUNT_RATE_LIMIT)
     
     reset_doc = await db.password_resets.find_one({"email": request.email})
     
@@ -1314,27 +1095,30 @@ async def reset_password(http_request: Request, request: ResetPasswordRequest):
     if not reset_doc:
         raise HTTPException(status_code=400, detail="Invalid or expired session")
         
-    expires_at = datetime.fromisoformat(reset_doc["expires_at"])
-    if expires_at.tzinfo is None:
-        expires_at = expires_at.replace(tzinfo=timezone.utc)
-        
+    expires_at = as_datetime(reset_doc["expires_at"])
     if expires_at < datetime.now(timezone.utc):
         await db.password_resets.delete_one({"_id": reset_doc["_id"]})
         raise HTTPException(status_code=400, detail="Session expired")
         
     # Update password
-    hashed_password = get_password_hash(request.new_password)
-    result = await db.users.update_one(
+    hashed_password = await get_password_hash(request.new_password)
+    user = await db.users.find_one_and_update(
         {"email": request.email},
         {"$set": {
             "hashed_password": hashed_password,
             "failed_login_attempts": 0,  # Clear failed attempts
             "locked_until": None  # Clear any lockout
-        }}
+        }},
+        projection={"_id": 0, "user_id": 1}
     )
     
-    if result.matched_count == 0:
+    if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    
+    # Sign out every existing session of this account
+    await delete_user_sessions(db, user["user_id"])
+    session_cache.invalidate_user(user["user_id"])
+    await auth_tokens.revoke_user_tokens(db, user["user_id"])
         
     # Delete the reset code
     await db.password_resets.delete_one({"_id": reset_doc["_id"]})
@@ -1367,7 +1151,6 @@ async def create_category(category_data: CategoryCreate, admin: AdminUser = Depe
     """Create a new category (admin only)"""
     category = Category(**category_data.model_dump())
     doc = category.model_dump()
-    doc["created_at"] = doc["created_at"].isoformat()
     await db.categories.insert_one(doc)
     return category
 
@@ -1394,6 +1177,9 @@ async def delete_category(category_id: str, admin: AdminUser = Depends(require_a
 
 # ==================== PRODUCT ROUTES ====================
 
+# Revenue counters are for admin reporting, not the storefront
+PUBLIC_PRODUCT_PROJECTION = {"_id": 0, "revenue": 0, "revenue_30d": 0}
+
 @api_router.get("/products")
 async def get_products(
     category_id: Optional[str] = None,
@@ -1449,8 +1235,13 @@ async def get_products(
             query["price"] = {"$lte": max_price}
     
     sort_direction = -1 if sort_order == "desc" else 1
+    if sort_by == "popularity":
+        # Served by the (is_active, units_sold_30d, units_sold, product_id) index
+        sort = [(field, direction * sort_direction * -1) for field, direction in sales_counters.POPULARITY_SORT]
+    else:
+        sort = [(sort_by, sort_direction)]
     
-    products = await db.products.find(query, {"_id": 0}).sort(sort_by, sort_direction).skip(skip).limit(limit).to_list(limit)
+    products = await db.products.find(query, PUBLIC_PRODUCT_PROJECTION).sort(sort).skip(skip).limit(limit).to_list(limit)
     total = await db.products.count_documents(query)
     
     return {"products": products, "total": total, "skip": skip, "limit": limit}
@@ -1458,7 +1249,7 @@ async def get_products(
 @api_router.get("/products/{product_id}")
 async def get_product(product_id: str):
     """Get single product"""
-    product = await db.products.find_one({"product_id": product_id}, {"_id": 0})
+    product = await db.products.find_one({"product_id": product_id}, PUBLIC_PRODUCT_PROJECTION)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     return product
@@ -1466,7 +1257,7 @@ async def get_product(product_id: str):
 @api_router.get("/products/slug/{slug}")
 async def get_product_by_slug(slug: str):
     """Get product by slug"""
-    product = await db.products.find_one({"slug": slug}, {"_id": 0})
+    product = await db.products.find_one({"slug": slug}, PUBLIC_PRODUCT_PROJECTION)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     return product
@@ -1476,7 +1267,6 @@ async def create_product(product_data: ProductCreate, admin: AdminUser = Depends
     """Create a new product (admin only)"""
     product = Product(**product_data.model_dump())
     doc = product.model_dump()
-    doc["created_at"] = doc["created_at"].isoformat()
     await db.products.insert_one(doc)
     return product
 
@@ -1521,12 +1311,13 @@ async def calculate_shipping(request: ShippingRateRequest):
     """Simplified shipping: Free for India, Contact for International"""
     country_lower = request.country.lower()
     if country_lower in ["india", "in"]:
+        settings = store_settings.current
         return ShippingRateResponse(
             cost=0.0,
             delivery_days="5-7 days",
             carrier="Free Delivery (India)",
-            cod_available=True,
-            cod_fee=100.0,
+            cod_available=settings.cod_enabled,
+            cod_fee=settings.cod_fee if settings.cod_enabled else 0.0,
             zone="india"
         )
     else:
@@ -1536,9 +1327,35 @@ async def calculate_shipping(request: ShippingRateRequest):
             detail="International orders are currently handled via WhatsApp. Please contact us to place your order."
         )
 
+order_idempotency = IdempotencyStore(db)
+
 @api_router.post("/orders", response_model=Order)
-async def create_order(order_data: OrderCreate, request: Request):
-    """Create a new order"""
+async def create_order(
+    order_data: OrderCreate,
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Create a new order (retries with the same Idempotency-Key get the original response)"""
+    # Before the idempotency claim, so the retry after a token refresh isn't a duplicate
+    await require_fresh_login(request)
+    if idempotency_key is None:
+        return await place_order(order_data, request)
+    
+    fingerprint = hash_sha256(order_data.model_dump_json())
+    principal = await get_current_principal(request)
+    # Guests are scoped by their request body rather than their IP, which changes when a
+    # phone switches networks between retries; replaying needs both the key and the body
+    owner = f"user:{principal.user_id}" if principal else f"guest:{fingerprint}"
+    return await order_idempotency.run(
+        idempotency_key,
+        "orders",
+        owner,
+        fingerprint,
+        lambda: place_order(order_data, request)
+    )
+
+async def place_order(order_data: OrderCreate, request: Request) -> Order:
+    """Validate stock, reserve it and persist a new order"""
     # Calculate subtotal first as it may affect shipping/COD fees
     subtotal = sum((item.sale_price or item.price) * item.quantity for item in order_data.items)
     
@@ -1550,9 +1367,13 @@ async def create_order(order_data: OrderCreate, request: Request):
             detail="International orders are currently handled via WhatsApp. Please contact us to place your order."
         )
     
+    settings = store_settings.current
+    if order_data.payment_method == "cod" and not settings.cod_enabled:
+        raise HTTPException(status_code=400, detail="Cash on delivery is currently unavailable")
+    
     shipping_cost = 0.0
     shipping_zone = "india"
-    cod_fee = 100.0 if order_data.payment_method == "cod" else 0.0
+    cod_fee = settings.cod_fee if order_data.payment_method == "cod" else 0.0
     
     # Verify stock availability and deduct immediately
     for item in order_data.items:
@@ -1599,56 +1420,47 @@ async def create_order(order_data: OrderCreate, request: Request):
     )
     
     # Associate with user if logged in
-    user_token = request.cookies.get("session_token")
-    if user_token:
-        # Try to find user
-        session = await db.user_sessions.find_one({"session_token": user_token})
-        if session:
-            order.user_id = session.get("user_id")
+    principal = await get_current_principal(request)
+    if principal:
+        order.user_id = principal.user_id
 
     # Create Razorpay order if needed
     if order.payment_method == "razorpay":
         try:
-            razorpay_order = razorpay_client.order.create({
-                "amount": int(order.total * 100),
-                "currency": "INR",
-                "receipt": order.order_id,
-                "payment_capture": 1
-            })
+            razorpay_order = await create_razorpay_order(int(order.total * 100), order.order_id)
             order.razorpay_order_id = razorpay_order['id']
         except Exception as e:
             logger.error(f"Failed to create Razorpay order: {e}")
             raise HTTPException(status_code=500, detail="Failed to initialize payment gateway")
             
     doc = order.model_dump()
-    doc["created_at"] = doc["created_at"].isoformat()
-    doc["updated_at"] = doc["updated_at"].isoformat()
     
     await db.orders.insert_one(doc)
+    await sales_rollups.record_order_created(db, doc)
+    if order.payment_method in COD_PAYMENT_METHODS:
+        await sales_counters.count_order(db, order.order_id)
     
-    # Send appropriate email
+    # Queue the appropriate email; the order response doesn't wait on ZeptoMail
     if order.payment_method == "razorpay":
         # Send Cart Reminder email immediately for online payments
-        email_html = generate_cart_reminder_html(order)
-        await send_order_email(order.shipping_address.email, f"Items waiting in your bag! Order #{order.order_id}", email_html)
+        enqueue_email(order.shipping_address.email, f"Items waiting in your bag! Order #{order.order_id}", render_email("cart_reminder", order))
     else:
         # For COD or other methods that are confirmed immediately
-        email_html = generate_order_confirmation_html(order)
-        await send_order_email(order.shipping_address.email, f"Order Confirmation #{order.order_id}", email_html)
+        enqueue_email(order.shipping_address.email, f"Order Confirmation #{order.order_id}", render_email("order_confirmation", order))
     
     return order
 
+PAYMENT_VERIFIED_RESPONSE = {"status": "success", "message": "Payment verified"}
+
 @api_router.post("/orders/verify-payment")
 async def verify_payment(payload: dict):
-    """Verify Razorpay payment signature"""
-    logger.info(f"Payment verification request received. Payload: {payload}")
-    
+    """Verify Razorpay payment signature (idempotent for client retries)"""
     order_id = payload.get("order_id")
     razorpay_order_id = payload.get("razorpay_order_id")
     razorpay_payment_id = payload.get("razorpay_payment_id")
     razorpay_signature = payload.get("razorpay_signature")
     
-    logger.info(f"Extracted values - order_id: {order_id}, razorpay_order_id: {razorpay_order_id}, razorpay_payment_id: {razorpay_payment_id}, razorpay_signature: {razorpay_signature}")
+    logger.debug(f"Payment verification for order {order_id} (razorpay_order_id={razorpay_order_id}, payment_id={razorpay_payment_id})")
     
     if not all([order_id, razorpay_order_id, razorpay_payment_id, razorpay_signature]):
         missing_fields = []
@@ -1659,58 +1471,80 @@ async def verify_payment(payload: dict):
         logger.error(f"Missing payment verification details: {missing_fields}")
         raise HTTPException(status_code=400, detail=f"Missing payment verification details: {', '.join(missing_fields)}")
         
+    # Verify signature
+    params_dict = {
+        'razorpay_order_id': razorpay_order_id,
+        'razorpay_payment_id': razorpay_payment_id,
+        'razorpay_signature': razorpay_signature
+    }
     try:
-        # Verify signature
-        params_dict = {
-            'razorpay_order_id': razorpay_order_id,
-            'razorpay_payment_id': razorpay_payment_id,
-            'razorpay_signature': razorpay_signature
-        }
         razorpay_client.utility.verify_payment_signature(params_dict)
+    except razorpay.errors.SignatureVerificationError as e:
+        logger.error(f"Payment signature verification failed for order {order_id}: {e}")
         
-        # If verification successful, update order
-        result = await db.orders.update_one(
+        # Mark payment as failed only while it is still pending, so a bad retry can't undo a verified payment
+        order = await db.orders.find_one_and_update(
+            {"order_id": order_id, "payment_status": "pending"},
+            {"$set": {"payment_status": "failed", "updated_at": datetime.now(timezone.utc)}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        # Send Payment Failed email
+        if order:
+            await sales_rollups.record_transitions(db, [(order, "payment_status", "pending", "failed")])
+            enqueue_email(order["shipping_address"]["email"], f"Payment Failed for Order #{order_id}", render_email("payment_failed", order))
+            
+        raise HTTPException(status_code=400, detail="Payment verification failed: invalid signature")
+    
+    # Mark the order paid in a single round trip; only a pending order for this Razorpay order matches
+    paid_update = {
+        "payment_status": "paid",
+        "order_status": "processing",
+        "razorpay_payment_id": razorpay_payment_id,
+        "updated_at": datetime.now(timezone.utc)
+    }
+    previous = await db.orders.find_one_and_update(
+        {
+            "order_id": order_id,
+            "razorpay_order_id": razorpay_order_id,
+            "payment_status": "pending"
+        },
+        {"$set": paid_update},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE
+    )
+    
+    if previous is None:
+        existing = await db.orders.find_one(
             {"order_id": order_id},
-            {
-                "$set": {
-                    "payment_status": "paid",
-                    "order_status": "processing",
-                    "razorpay_payment_id": razorpay_payment_id,
-                    "updated_at": datetime.now(timezone.utc).isoformat()
-                }
-            }
+            {"_id": 0, "payment_status": 1, "razorpay_order_id": 1, "razorpay_payment_id": 1}
         )
-        
-        if result.matched_count == 0:
+        if not existing:
             raise HTTPException(status_code=404, detail="Order not found")
         
-        # Send Order Confirmation email now that payment is verified
-        order = await db.orders.find_one({"order_id": order_id})
-        email_html = generate_order_confirmation_html(order)
-        await send_order_email(order["shipping_address"]["email"], f"Order Confirmed #{order_id}", email_html)
-            
-        return {"status": "success", "message": "Payment verified"}
-        
-    except Exception as e:
-        error_type = type(e).__name__
-        error_msg = str(e)
-        logger.error(f"Payment verification failed for order {order_id}")
-        logger.error(f"Error type: {error_type}")
-        logger.error(f"Error message: {error_msg}")
-        logger.error(f"Full exception: {e}", exc_info=True)
+        # Client retry of a verification that already succeeded: replay the original result
+        if (existing.get("payment_status") == "paid"
+                and existing.get("razorpay_order_id") == razorpay_order_id
+                and existing.get("razorpay_payment_id") == razorpay_payment_id):
+            logger.info(f"Replayed payment verification for order {order_id}")
+            return PAYMENT_VERIFIED_RESPONSE
         
-        # Mark payment as failed in DB if needed
-        await db.orders.update_one(
-            {"order_id": order_id},
-            {"$set": {"payment_status": "failed", "updated_at": datetime.now(timezone.utc).isoformat()}}
-        )
-        # Send Payment Failed email
-        order = await db.orders.find_one({"order_id": order_id})
-        if order:
-            email_html = generate_payment_failed_html(order)
-            await send_order_email(order["shipping_address"]["email"], f"Payment Failed for Order #{order_id}", email_html)
-            
-        raise HTTPException(status_code=400, detail=f"Payment verification failed: {error_msg}")
+        if existing.get("razorpay_order_id") != razorpay_order_id:
+            raise HTTPException(status_code=400, detail="Payment does not belong to this order")
+        raise HTTPException(status_code=409, detail=f"Order payment is already {existing.get('payment_status')}")
+    
+    await sales_rollups.record_transitions(db, [
+        (previous, "payment_status", "pending", "paid"),
+        (previous, "order_status", previous.get("order_status"), "processing")
+    ])
+    
+    await sales_counters.count_order(db, order_id)
+    
+    # Send Order Confirmation email now that payment is verified
+    order = {**previous, **paid_update}
+    enqueue_email(order["shipping_address"]["email"], f"Order Confirmed #{order_id}", render_email("order_confirmation", order))
+    
+    return PAYMENT_VERIFIED_RESPONSE
 
 @api_router.get("/orders/{order_id}")
 async def get_order(request: Request, order_id: str):
@@ -1722,36 +1556,283 @@ async def get_order(request: Request, order_id: str):
         logger.warning(f"Order lookup failed - order not found: {order_id} from {client_ip}")
         raise HTTPException(status_code=404, detail="Order not found")
     
-    logger.info(f"Order lookup successful: {order_id} from {client_ip}")
+    logger.debug(f"Order lookup successful: {order_id} from {client_ip}")
     return order
 
 
+# Compact order shape for list views; full details come from GET /orders/{order_id}
+ORDER_SUMMARY_PROJECTION = {
+    "_id": 0,
+    "order_id": 1,
+    "created_at": 1,
+    "total": 1,
+    "order_status": 1,
+    "payment_status": 1,
+    "payment_method": 1,
+    "tracking_number": 1,
+    "tracking_url": 1,
+    "item_count": {"$size": {"$ifNull": ["$items", []]}},
+    "first_image": {"$arrayElemAt": ["$items.image", 0]}
+}
+ORDER_HISTORY_SORT = [("created_at", -1), ("order_id", -1)]
+
+async def get_order_summaries(user_id: str, limit: int, cursor: Optional[str] = None, database=db) -> Dict[str, Any]:
+    """Page through a user's orders newest first, served by the (user_id, created_at) index"""
+    limit = max(1, min(limit, 100))
+    match: Dict[str, Any] = {"user_id": user_id}
+    if cursor:
+        match.update(keyset_filter(ORDER_HISTORY_SORT, decode_cursor(cursor, len(ORDER_HISTORY_SORT))))
+    
+    orders = await database.orders.aggregate([
+        {"$match": match},
+        {"$sort": dict(ORDER_HISTORY_SORT)},
+        {"$limit": limit},
+        {"$project": ORDER_SUMMARY_PROJECTION}
+    ]).to_list(limit)
+    
+    return {"orders": orders, "next_cursor": next_cursor(orders, ORDER_HISTORY_SORT, limit)}
+
 @api_router.get("/orders/user/my-orders")
-async def get_my_orders(user: User = Depends(get_current_user)):
-    """Get orders for current user"""
+async def get_my_orders(
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    user: User = Depends(get_current_user)
+):
+    """Get order summaries for current user"""
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
-        
-    logger.info(f"get_my_orders: Fetching for user_id={user.user_id}")
-    orders = await db.orders.find({"user_id": user.user_id}, {"_id": 0}).sort("created_at", -1).to_list(50)
-    logger.info(f"get_my_orders: Found {len(orders)} orders for user_id={user.user_id}")
     
-    return orders
+    return await get_order_summaries(user.user_id, limit, cursor)
+
+# Equality-filter combinations for the admin order list; each gets a (filters..., created_at, order_id)
+# index so filtering, keyset pagination and sorting are served by the same index
+ADMIN_ORDER_FILTER_INDEXES = [
+    (),
+    ("order_status",),
+    ("payment_status",),
+    ("payment_method",),
+    ("payment_method", "payment_status"),
+    ("order_status", "payment_status"),
+]
+# Prefix searches use their own indexes, then sort the matching rows
+ADMIN_ORDER_SEARCH_INDEXES = ["shipping_address.email", "shipping_address.phone"]
+
+ADMIN_ORDERS_SORT = [("created_at", -1), ("order_id", -1)]
+ADMIN_ORDER_COUNT_CACHE_SECONDS = int(os.environ.get("ADMIN_ORDER_COUNT_CACHE_SECONDS", "30"))
+admin_order_count_cache = TTLCache(ttl_seconds=ADMIN_ORDER_COUNT_CACHE_SECONDS, maxsize=256)
+
+def build_admin_order_query(
+    status: Optional[str] = None,
+    payment_status: Optional[str] = None,
+    payment_method: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    email: Optional[str] = None,
+    phone: Optional[str] = None,
+    order_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """Translate admin order list filters into a Mongo query"""
+    query: Dict[str, Any] = {}
+    if status and status != "all":
+        query["order_status"] = status
+    if payment_status and payment_status != "all":
+        query["payment_status"] = payment_status
+    if payment_method and payment_method != "all":
+        query["payment_method"] = payment_method
+    
+    query.update(date_range_filter(
+        "created_at",
+        gte=parse_datetime_param(date_from),
+        lte=parse_datetime_param(date_to, end_of_day=True)
+    ))
+    
+    # Anchored, case-sensitive prefixes so the regex can walk an index range
+    if email:
+        query["shipping_address.email"] = {"$regex": f"^{re.escape(email.strip())}"}
+    if phone:
+        query["shipping_address.phone"] = {"$regex": f"^{re.escape(phone.strip())}"}
+    if order_id:
+        query["order_id"] = {"$regex": f"^{re.escape(order_id.strip().upper())}"}
+    return query
 
 @api_router.get("/admin/orders")
 async def get_all_orders(
-    status: Optional[str] = None, 
-    limit: int = 50, 
-    skip: int = 0,
+    status: Optional[str] = None,
+    payment_status: Optional[str] = None,
+    payment_method: Optional[str] = None,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    email: Optional[str] = None,
+    phone: Optional[str] = None,
+    order_id: Optional[str] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     admin: AdminUser = Depends(require_admin)
 ):
-    """Get all orders (admin only)"""
-    query = {}
-    if status and status != "all":
-        query["order_status"] = status
-        
-    orders = await db.orders.find(query, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
-    return {"orders": orders, "count": len(orders)}
+    """Get orders with filters and keyset pagination (admin only)"""
+    limit = max(1, min(limit, 200))
+    query = build_admin_order_query(status, payment_status, payment_method, date_from, date_to, email, phone, order_id)
+    
+    page_query = dict(query)
+    if cursor:
+        page_query = {"$and": [query, keyset_filter(ADMIN_ORDERS_SORT, decode_cursor(cursor, len(ADMIN_ORDERS_SORT)))]}
+    
+    orders = await admin_lists_db.orders.find(page_query, {"_id": 0}).sort(ADMIN_ORDERS_SORT).limit(limit).to_list(limit)
+    response = {"orders": orders, "count": len(orders), "next_cursor": next_cursor(orders, ADMIN_ORDERS_SORT, limit)}
+    
+    if include_total:
+        # Totals are shared across admins and pages for a short while instead of recounted per page
+        count_key = json.dumps(query, sort_keys=True, default=str)
+        response["total"] = await admin_order_count_cache.get_or_load(
+            count_key, lambda: admin_lists_db.orders.count_documents(query)
+        )
+    
+    return response
+
+@api_router.get("/admin/orders/export")
+async def export_orders(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    status: Optional[str] = None,
+    payment_status: Optional[str] = None,
+    payment_method: Optional[str] = None,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    flatten_items: bool = False,
+    gzip: bool = False,
+    admin: AdminUser = Depends(require_admin)
+):
+    """Stream matching orders as CSV or NDJSON (admin only)"""
+    query = build_admin_order_query(status, payment_status, payment_method, date_from, date_to)
+    
+    filename = f"orders-{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')}.{format}"
+    media_type = "text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson"
+    if gzip:
+        # Served as a .gz download rather than Content-Encoding, so the saved file stays compressed
+        filename += ".gz"
+        media_type = "application/gzip"
+    
+    await log_activity(admin.user_id, admin.name, "export", "order", f"Exported orders ({format}) with filters {json.dumps(query, default=str)}")
+    
+    return StreamingResponse(
+        stream_orders(analytics_db, query, format, flatten_items=flatten_items, gzip=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+ORDER_STATUS_EMAILS = {
+    "delivered": ("order_delivered", "Order Delivered"),
+    "cancelled": ("order_cancelled_manual", "Order Cancelled"),  # manual cancellation by admin
+    "shipped": ("order_shipped", "Order Shipped"),
+}
+
+def queue_order_status_email(order: Dict[str, Any], status: str) -> bool:
+    """Queue the customer notification for a status change, if that status has one"""
+    template = ORDER_STATUS_EMAILS.get(status.lower())
+    if not template:
+        return False
+    name, subject = template
+    return enqueue_email(order["shipping_address"]["email"], f"{subject} #{order['order_id']}", render_email(name, order))
+
+async def apply_bulk_order_updates(
+    entries: List[Dict[str, Any]],
+    admin: AdminUser,
+    describe: Callable[[str, Dict[str, Any]], str]
+) -> Dict[str, Any]:
+    """
+    Apply per-order $set updates and one activity log insert.
+
+    Each order is updated with its own find_one_and_update (run concurrently), so
+    the previous status fed to the sales rollups is the one this write replaced,
+    even when a single-order update lands at the same time.
+
+    ``entries`` are {"order_id", "update", "notify"} dicts; a repeated order_id keeps
+    its last entry. Notification emails go through the background email queue.
+    """
+    now = datetime.now(timezone.utc)
+    by_id = {entry["order_id"]: entry for entry in entries}
+    
+    previous_docs = await asyncio.gather(*[
+        db.orders.find_one_and_update(
+            {"order_id": order_id},
+            {"$set": {**entry["update"], "updated_at": now}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.BEFORE
+        )
+        for order_id, entry in by_id.items()
+    ])
+    found = {order["order_id"]: order for order in previous_docs if order is not None}
+    
+    if found:
+        await db.activity_log.insert_many([
+            {
+                "admin_id": admin.user_id,
+                "user_name": admin.name,
+                "action": "update",
+                "type": "order",
+                "description": describe(order_id, by_id[order_id]["update"]),
+                "timestamp": now
+            }
+            for order_id in found
+        ])
+    
+    await sales_rollups.record_transitions(db, [
+        (order, "order_status", order.get("order_status"), by_id[order_id]["update"]["order_status"])
+        for order_id, order in found.items()
+    ])
+    await asyncio.gather(*[
+        sales_counters.uncount_order(db, order_id)
+        for order_id in found
+        if by_id[order_id]["update"]["order_status"].lower() == "cancelled"
+    ])
+    
+    results = []
+    for order_id, entry in by_id.items():
+        order = found.get(order_id)
+        if order is None:
+            results.append({"order_id": order_id, "status": "not_found", "email_queued": False})
+            continue
+        order.update(entry["update"])
+        email_queued = queue_order_status_email(order, entry["notify"]) if entry.get("notify") else False
+        results.append({"order_id": order_id, "status": "updated", "email_queued": email_queued})
+    
+    return {"updated": len(found), "not_found": len(by_id) - len(found), "results": results}
+
+@api_router.post("/admin/orders/bulk/status")
+async def bulk_update_order_status(payload: BulkOrderStatusUpdate, admin: AdminUser = Depends(require_admin)):
+    """Update the status of many orders at once"""
+    entries = [
+        {
+            "order_id": entry.order_id,
+            "update": {"order_status": entry.order_status},
+            # The single-order endpoint only emails for delivered/cancelled; shipped mails come with tracking
+            "notify": entry.order_status if entry.order_status.lower() in ("delivered", "cancelled") else None
+        }
+        for entry in payload.updates
+    ]
+    return await apply_bulk_order_updates(
+        entries, admin, lambda order_id, update: f"Updated order {order_id} status to {update['order_status']}"
+    )
+
+@api_router.post("/admin/orders/bulk/tracking")
+async def bulk_update_order_tracking(payload: BulkOrderTrackingUpdate, admin: AdminUser = Depends(require_admin)):
+    """Add tracking to many orders at once and mark them shipped"""
+    entries = [
+        {
+            "order_id": entry.order_id,
+            "update": {
+                "courier_name": entry.courier_name,
+                "tracking_number": entry.tracking_number,
+                "tracking_url": entry.tracking_url,
+                "order_status": "shipped"
+            },
+            "notify": "shipped"
+        }
+        for entry in payload.updates
+    ]
+    return await apply_bulk_order_updates(
+        entries, admin, lambda order_id, update: f"Added tracking for order {order_id}"
+    )
 
 @api_router.put("/admin/orders/{order_id}/status")
 async def update_order_status(order_id: str, status_update: dict, admin: AdminUser = Depends(require_admin)):
@@ -1760,25 +1841,24 @@ async def update_order_status(order_id: str, status_update: dict, admin: AdminUs
     if not new_status:
         raise HTTPException(status_code=400, detail="Status required")
         
-    result = await db.orders.update_one(
+    previous = await db.orders.find_one_and_update(
         {"order_id": order_id},
-        {"$set": {"order_status": new_status, "updated_at": datetime.now(timezone.utc).isoformat()}}
+        {"$set": {"order_status": new_status, "updated_at": datetime.now(timezone.utc)}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE
     )
     
-    if result.matched_count == 0:
+    if previous is None:
         raise HTTPException(status_code=404, detail="Order not found")
     
-    # Fetch the updated order for email
-    order = await db.orders.find_one({"order_id": order_id})
+    await sales_rollups.record_transitions(db, [(previous, "order_status", previous.get("order_status"), new_status)])
+    if new_status.lower() == "cancelled":
+        await sales_counters.uncount_order(db, order_id)
+    order = {**previous, "order_status": new_status}
     
     # Send email notification for delivered or cancelled status
-    if new_status.lower() == "delivered":
-        email_html = generate_order_delivered_html(order)
-        await send_order_email(order["shipping_address"]["email"], f"Order Delivered #{order_id}", email_html)
-    elif new_status.lower() == "cancelled":
-        # Manual cancellation by admin - send manual cancel email
-        email_html = generate_order_cancelled_manual_html(order)
-        await send_order_email(order["shipping_address"]["email"], f"Order Cancelled #{order_id}", email_html)
+    if new_status.lower() in ("delivered", "cancelled"):
+        queue_order_status_email(order, new_status)
         
     # Log activity
     await log_activity(admin.user_id, admin.name, "update", "order", f"Updated order {order_id} status to {new_status}")
@@ -1793,18 +1873,24 @@ async def update_order_tracking(order_id: str, tracking_data: dict, admin: Admin
         "tracking_number": tracking_data.get("tracking_number"),
         "tracking_url": tracking_data.get("tracking_url"),
         "order_status": "shipped", # Auto set to shipped
-        "updated_at": datetime.now(timezone.utc).isoformat()
+        "updated_at": datetime.now(timezone.utc)
     }
     
-    result = await db.orders.update_one({"order_id": order_id}, {"$set": update})
+    previous = await db.orders.find_one_and_update(
+        {"order_id": order_id},
+        {"$set": update},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE
+    )
     
-    if result.matched_count == 0:
+    if previous is None:
         raise HTTPException(status_code=404, detail="Order not found")
+    
+    await sales_rollups.record_transitions(db, [(previous, "order_status", previous.get("order_status"), "shipped")])
 
     # Send shipping email
-    order = await db.orders.find_one({"order_id": order_id})
-    email_html = generate_order_shipped_html(order)
-    await send_order_email(order["shipping_address"]["email"], f"Order Shipped #{order_id}", email_html)
+    order = {**previous, **update}
+    queue_order_status_email(order, "shipped")
     
     await log_activity(admin.user_id, admin.name, "update", "order", f"Added tracking for order {order_id}")
     
@@ -1821,14 +1907,13 @@ async def resend_notification(order_id: str, payload: dict, admin: AdminUser = D
         
     email = order["shipping_address"]["email"]
     
+    email_queued = False
     if type == "confirmation":
-        email_html = generate_order_confirmation_html(order)
-        await send_order_email(email, f"Order Confirmation #{order_id}", email_html)
+        email_queued = enqueue_email(email, f"Order Confirmation #{order_id}", render_email("order_confirmation", order))
     elif type == "shipping" and order.get("tracking_number"):
-        email_html = generate_order_shipped_html(order)
-        await send_order_email(email, f"Order Shipped #{order_id}", email_html)
+        email_queued = enqueue_email(email, f"Order Shipped #{order_id}", render_email("order_shipped", order))
     
-    return {"status": "success"}
+    return {"status": "success", "email_queued": email_queued}
 
 # ==================== COUPON ROUTES ====================
 
@@ -1843,9 +1928,6 @@ async def create_coupon(coupon_data: CouponCreate, admin: AdminUser = Depends(re
     """Create coupon"""
     coupon = Coupon(**coupon_data.model_dump())
     doc = coupon.model_dump()
-    if doc.get("expires_at"):
-        doc["expires_at"] = doc["expires_at"].isoformat()
-    
     await db.coupons.insert_one(doc)
     
     await log_activity(admin.user_id, admin.name, "create", "coupon", f"Created coupon {coupon.code}")
@@ -1894,20 +1976,25 @@ async def remove_coupon_from_cart(session_id: str):
 
 # ==================== SETTINGS & REPORTS ROUTES ====================
 
+PUBLIC_SETTINGS_FIELDS = {"store_phone", "whatsapp_number", "store_email", "free_shipping_threshold", "cod_enabled", "cod_fee"}
+
+@api_router.get("/settings")
+async def get_public_settings(response: Response):
+    """Storefront-safe subset of the store settings (served from memory)"""
+    response.headers["Cache-Control"] = "public, max-age=60"
+    return store_settings.current.model_dump(include=PUBLIC_SETTINGS_FIELDS)
+
 @api_router.get("/admin/settings")
 async def get_settings(admin: AdminUser = Depends(require_admin)):
-    settings = await db.settings.find_one({}, {"_id": 0})
-    if not settings:
-        return StoreSettings().model_dump()
-    return settings
+    return store_settings.current
 
 @api_router.put("/admin/settings")
 async def update_settings(settings: StoreSettings, admin: AdminUser = Depends(require_admin)):
-    doc = settings.model_dump()
-    doc["updated_at"] = doc["updated_at"].isoformat()
-    await db.settings.replace_one({}, doc, upsert=True)
+    updated = await store_settings.update(settings.model_dump())
+    # The dashboard's low-stock figures depend on the threshold
+    dashboard_cache.clear()
     await log_activity(admin.user_id, admin.name, "update", "settings", "Updated store settings")
-    return settings
+    return updated
 
 @api_router.get("/admin/activity-log")
 async def get_activity_log(
@@ -1919,21 +2006,31 @@ async def get_activity_log(
     query = {}
     if type:
         query["type"] = type
-    activities = await db.activity_log.find(query, {"_id": 0}).sort("timestamp", -1).skip(skip).limit(limit).to_list(limit)
+    activities = await admin_lists_db.activity_log.find(query, {"_id": 0}).sort("timestamp", -1).skip(skip).limit(limit).to_list(limit)
     return {"activities": activities}
 
+SALES_REPORT_MAX_BUCKETS = 1000
+
 @api_router.get("/admin/reports/sales")
-async def get_sales_report(admin: AdminUser = Depends(require_admin)):
-    # Mock data for now
-    today = datetime.now()
-    dates = [(today - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(7)]
-    dates.reverse()
+async def get_sales_report(
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    interval: str = Query("day", pattern="^(day|week|month)$"),
+    admin: AdminUser = Depends(require_admin)
+):
+    """Revenue and order counts per day/week/month, with the previous period for comparison"""
+    end = parse_datetime_param(date_to, end_of_day=True) or datetime.now(timezone.utc)
+    start = parse_datetime_param(date_from) or end - timedelta(days=6)
+    if start > end:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
     
-    return {
-        "dates": dates,
-        "sales": [1200, 1500, 800, 2000, 1800, 2500, 3000],
-        "orders": [5, 7, 3, 9, 8, 12, 15]
-    }
+    # Rough bucket count before generating them, so a typo can't ask for a million daily buckets
+    span_days = (end - start).days + 1
+    buckets = {"day": span_days, "week": span_days // 7 + 1, "month": span_days // 28 + 1}[interval]
+    if buckets > SALES_REPORT_MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Range too large for {interval} buckets; use a coarser interval")
+    
+    return await sales_rollups.time_series(analytics_db, start, end, interval)
 
 @api_router.get("/cart/{session_id}")
 async def get_cart(session_id: str):
@@ -1942,8 +2039,6 @@ async def get_cart(session_id: str):
         # Create new cart
         new_cart = Cart(session_id=session_id)
         doc = new_cart.model_dump()
-        doc["created_at"] = doc["created_at"].isoformat()
-        doc["updated_at"] = doc["updated_at"].isoformat()
         await db.carts.insert_one(doc)
         return new_cart
     return cart
@@ -1960,8 +2055,6 @@ async def add_to_cart(session_id: str, item: dict):
         # Should be created by get_cart, but just in case
         new_cart = Cart(session_id=session_id)
         cart = new_cart.model_dump()
-        cart["created_at"] = cart["created_at"].isoformat()
-        cart["updated_at"] = cart["updated_at"].isoformat()
         await db.carts.insert_one(cart)
     
     items = cart.get("items", [])
@@ -1993,7 +2086,7 @@ async def add_to_cart(session_id: str, item: dict):
         
     await db.carts.update_one(
         {"session_id": session_id},
-        {"$set": {"items": items, "updated_at": datetime.now(timezone.utc).isoformat()}}
+        {"$set": {"items": items, "updated_at": datetime.now(timezone.utc)}}
     )
     
     return await get_cart(session_id)
@@ -2023,7 +2116,7 @@ async def update_cart_item(session_id: str, payload: dict):
                 
     await db.carts.update_one(
         {"session_id": session_id},
-        {"$set": {"items": items, "updated_at": datetime.now(timezone.utc).isoformat()}}
+        {"$set": {"items": items, "updated_at": datetime.now(timezone.utc)}}
     )
     
     return await get_cart(session_id)
@@ -2040,7 +2133,7 @@ async def remove_from_cart(session_id: str, product_id: str = Query(...), size:
     
     await db.carts.update_one(
         {"session_id": session_id},
-        {"$set": {"items": items, "updated_at": datetime.now(timezone.utc).isoformat()}}
+        {"$set": {"items": items, "updated_at": datetime.now(timezone.utc)}}
     )
     
     return await get_cart(session_id)
@@ -2050,21 +2143,25 @@ async def clear_cart(session_id: str):
     """Clear all items from the cart"""
     await db.carts.update_one(
         {"session_id": session_id},
-        {"$set": {"items": [], "coupon_code": None, "coupon_discount": 0, "updated_at": datetime.now(timezone.utc).isoformat()}}
+        {"$set": {"items": [], "coupon_code": None, "coupon_discount": 0, "updated_at": datetime.now(timezone.utc)}}
     )
     return {"status": "success", "message": "Cart cleared"}
 
 
 # ==================== CUSTOMER ROUTES ====================
 
+CUSTOMER_SORT_FIELDS = ["created_at"] + customer_stats.STAT_FIELDS
+
 @api_router.get("/admin/customers")
 async def get_customers(
     limit: int = 50, 
     skip: int = 0,
     search: Optional[str] = None,
+    sort_by: str = Query("created_at", pattern=f"^({'|'.join(CUSTOMER_SORT_FIELDS)})$"),
+    sort_order: str = "desc",
     admin: AdminUser = Depends(require_admin)
 ):
-    """Get all customers"""
+    """Get all customers with their order stats, sortable by any stat (each has its own index)"""
     query = {}
     if search:
         query["$or"] = [
@@ -2073,70 +2170,92 @@ async def get_customers(
             {"phone": {"$regex": search, "$options": "i"}}
         ]
         
-    customers = await db.users.find(query, {"_id": 0, "hashed_password": 0}).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
-    total = await db.users.count_documents(query)
+    sort_direction = -1 if sort_order == "desc" else 1
+    sort = [(sort_by, sort_direction)]
+    if sort_by != "created_at":
+        sort.append(("created_at", sort_direction))
+    
+    customers = await admin_lists_db.users.find(query, {"_id": 0, "hashed_password": 0}).sort(sort).skip(skip).limit(limit).to_list(limit)
+    total = await admin_lists_db.users.count_documents(query)
     
     return {"customers": customers, "total": total}
 
 @api_router.get("/admin/customers/{user_id}")
-async def get_customer_details(user_id: str, admin: AdminUser = Depends(require_admin)):
-    """Get customer details and orders"""
+async def get_customer_details(
+    user_id: str,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    admin: AdminUser = Depends(require_admin)
+):
+    """Get customer details and order summaries"""
     customer = await db.users.find_one({"user_id": user_id}, {"_id": 0, "hashed_password": 0})
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
         
-    orders = await db.orders.find({"user_id": user_id}, {"_id": 0}).sort("created_at", -1).to_list(100)
+    page = await get_order_summaries(user_id, limit, cursor, database=admin_lists_db)
     
-    return {"customer": customer, "orders": orders}
+    return {"customer": customer, **page}
 
 
 
 # ==================== ANALYTICS ROUTES ====================
 
-@api_router.get("/admin/dashboard")
-async def get_dashboard_stats(admin: AdminUser = Depends(require_admin)):
-    """Get dashboard statistics"""
-    
-    # 1. Totals
-    total_orders = await db.orders.count_documents({})
-    
-    # Calculate revenue
-    pipeline = [
-        {"$group": {"_id": None, "total_revenue": {"$sum": "$total"}}}
-    ]
-    revenue_result = await db.orders.aggregate(pipeline).to_list(1)
-    total_revenue = revenue_result[0]["total_revenue"] if revenue_result else 0
-    pending_orders = await db.orders.count_documents({"order_status": "pending"})
-    
-    # Shipped today
-    start_of_day = datetime.combine(datetime.now(), datetime.min.time())
-    shipped_today = await db.orders.count_documents({
-        "order_status": "shipped",
-        # Note: string comparison for ISO dates works for > check if format is consistent
-        "updated_at": {"$gte": start_of_day.isoformat()}
-    })
+DASHBOARD_CACHE_SECONDS = float(os.environ.get("DASHBOARD_CACHE_SECONDS", "5"))
+dashboard_cache = TTLCache(ttl_seconds=DASHBOARD_CACHE_SECONDS, maxsize=1)
 
-    # 2. Low Stock
-    low_stock_threshold = 5
-    low_stock_count = await db.products.count_documents({"stock": {"$lte": low_stock_threshold}})
-    low_stock_products = await db.products.find(
-        {"stock": {"$lte": low_stock_threshold}}, 
-        {"_id": 0}
-    ).limit(5).to_list(5)
-    
-    # 3. Recent Orders
-    recent_orders = await db.orders.find({}, {"_id": 0}).sort("created_at", -1).limit(5).to_list(5)
+async def timed(timings: Dict[str, float], name: str, awaitable):
+    """Await ``awaitable`` and record how long it took in milliseconds"""
+    started = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        timings[name] = round((time.perf_counter() - started) * 1000, 2)
+
+async def compute_dashboard_stats() -> Dict[str, Any]:
+    """Run the independent dashboard queries concurrently"""
+    timings: Dict[str, float] = {}
+    start_of_day = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    low_stock_threshold = store_settings.current.low_stock_threshold
+    
+    started = time.perf_counter()
+    totals, pending_orders, shipped_today, low_stock, recent_orders = await asyncio.gather(
+        # Totals come from the daily sales rollups instead of a $group over every order
+        timed(timings, "totals", sales_rollups.totals(analytics_db)),
+        timed(timings, "pending_orders", analytics_db.orders.count_documents({"order_status": "pending"})),
+        timed(timings, "shipped_today", analytics_db.orders.count_documents({
+            "order_status": "shipped",
+            **date_range_filter("updated_at", gte=start_of_day)
+        })),
+        # Count and first page of low-stock products in one round trip
+        timed(timings, "low_stock", analytics_db.products.aggregate([
+            {"$match": {"stock": {"$lte": low_stock_threshold}}},
+            {"$facet": {
+                "count": [{"$count": "value"}],
+                "products": [{"$limit": 5}, {"$project": {"_id": 0}}]
+            }}
+        ]).to_list(1)),
+        timed(timings, "recent_orders", analytics_db.orders.find({}, {"_id": 0}).sort("created_at", -1).limit(5).to_list(5))
+    )
+    timings["total"] = round((time.perf_counter() - started) * 1000, 2)
     
+    low_stock = low_stock[0] if low_stock else {"count": [], "products": []}
     return {
-        "total_orders": total_orders,
-        "total_revenue": total_revenue,
+        "total_orders": totals["orders"],
+        "total_revenue": totals["revenue"],
         "pending_orders": pending_orders,
         "shipped_today": shipped_today,
-        "low_stock_count": low_stock_count,
-        "low_stock_products": low_stock_products,
-        "recent_orders": recent_orders
+        "low_stock_count": low_stock["count"][0]["value"] if low_stock["count"] else 0,
+        "low_stock_products": low_stock["products"],
+        "recent_orders": recent_orders,
+        "generated_at": datetime.now(timezone.utc),
+        "timings_ms": timings
     }
 
+@api_router.get("/admin/dashboard")
+async def get_dashboard_stats(admin: AdminUser = Depends(require_admin)):
+    """Get dashboard statistics (shared by all admins for DASHBOARD_CACHE_SECONDS)"""
+    return await dashboard_cache.get_or_load("stats", compute_dashboard_stats)
+
 @api_router.get("/admin/reports")
 async def get_reports(
     days: Optional[int] = None, 
@@ -2144,58 +2263,33 @@ async def get_reports(
     end_date: Optional[str] = None, 
     admin: AdminUser = Depends(require_admin)
 ):
-    """Get sales reports with custom date range support"""
-    match_stage = {}
+    """Get sales reports with custom date range support (day granularity, from the daily rollups)"""
+    start = end = None
     
     # Determine date range
     if start_date and end_date:
-        start = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-        if start.tzinfo is None:
-            start = start.replace(tzinfo=timezone.utc)
-            
-        end = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-        if end.hour == 0 and end.minute == 0:
-            end = end.replace(hour=23, minute=59, second=59)
-        if end.tzinfo is None:
-            end = end.replace(tzinfo=timezone.utc)
-            
-        match_stage = {"$match": {"created_at": {"$gte": start.isoformat(), "$lte": end.isoformat()}}}
+        start = parse_datetime_param(start_date)
+        end = parse_datetime_param(end_date, end_of_day=True)
     elif days:
-        cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
-        match_stage = {"$match": {"created_at": {"$gte": cutoff_date.isoformat()}}}
-    
-    # If neither days nor custom range provided, match_stage remains empty (All Time)
-    
-    # helper to build pipeline stages safely
-    active_match = [match_stage] if match_stage else []
+        start = datetime.now(timezone.utc) - timedelta(days=days)
     
-    revenue_pipeline = active_match + [{"$group": {"_id": None, "total_revenue": {"$sum": "$total"}, "count": {"$sum": 1}}}]
-    revenue_res = await db.orders.aggregate(revenue_pipeline).to_list(1)
+    # If neither days nor custom range provided, every rollup is summed (All Time)
+    summary = await sales_rollups.summarize(analytics_db, start, end)
     
-    total_revenue = revenue_res[0]["total_revenue"] if revenue_res else 0
-    total_orders = revenue_res[0]["count"] if revenue_res else 0
+    total_revenue = summary["revenue"]
+    total_orders = summary["orders"]
     avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
     
-    # 3. Orders by Status
-    status_pipeline = active_match + [
-        {"$group": {"_id": "$order_status", "count": {"$sum": 1}}}
-    ]
-    status_res = await db.orders.aggregate(status_pipeline).to_list(10)
-    orders_by_status = {item["_id"]: item["count"] for item in status_res}
-    
-    # 4. Best Sellers
-    best_seller_pipeline = active_match + [
-        {"$unwind": "$items"},
-        {"$group": {
-            "_id": "$items.product_id", 
-            "name": {"$first": "$items.name"},
-            "total_quantity": {"$sum": "$items.quantity"},
-            "total_revenue": {"$sum": {"$multiply": ["$items.price", "$items.quantity"]}}
-        }},
-        {"$sort": {"total_quantity": -1}},
-        {"$limit": 5}
-    ]
-    best_sellers = await db.orders.aggregate(best_seller_pipeline).to_list(5)
+    orders_by_status = {status: values["count"] for status, values in summary["order_status"].items() if values["count"]}
+    
+    best_sellers = sorted(
+        (
+            {"_id": product_id, "name": values["name"], "total_quantity": values["units"], "total_revenue": values["revenue"]}
+            for product_id, values in summary["products"].items()
+        ),
+        key=lambda product: product["total_quantity"],
+        reverse=True
+    )[:5]
     
     return {
         "total_revenue": total_revenue,
@@ -2205,6 +2299,21 @@ async def get_reports(
         "orders_by_status": orders_by_status
     }
 
+# ==================== MONITORING ROUTES ====================
+
+@api_router.get("/admin/system/stats")
+async def get_system_stats(admin: AdminUser = Depends(require_admin)):
+    """Get runtime statistics, one section per subsystem (HTTP pools, queues, caches, limits)"""
+    return {
+        "clients": http_clients.stats(),
+        "email_queue": email_queue.stats(),
+        "read_preferences": read_router.stats(),
+        "sessions": session_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "logging": logging_stats(),
+        "rate_limit": limiter.stats()
+    }
+
 # ==================== HEALTH CHECK ====================
 
 @api_router.get("/health")
@@ -2215,9 +2324,10 @@ async def health_check():
 # Include the router
 app.include_router(api_router)
 
-# Add rate limiter state
-app.state.limiter = limiter
+# Rate limit errors
 app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
+app.add_exception_handler(PasswordHasherBusy, password_busy_handler)
+app.add_exception_handler(StarletteHTTPException, auth_error_handler)
 
 # Security Headers Middleware (first in chain)
 app.add_middleware(SecurityHeadersMiddleware)
@@ -2238,60 +2348,197 @@ app.add_middleware(
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    # Flush queued emails before the HTTP clients close
+    await email_queue.stop()
+    await store_settings.stop()
+    await http_clients.aclose()
+    password_hasher.shutdown()
+    for lease in (expired_orders_lease, popularity_lease):
+        try:
+            await lease.release()
+        except Exception as e:
+            logger.error(f"Failed to release {lease.name} lease: {e}")
     client.close()
+    stop_logging()
+
+# Auto-cancellation of unpaid online orders
+COD_PAYMENT_METHODS = ["COD", "cod", "Cash on Delivery"]
+PAYMENT_WINDOW_MINUTES = 5
+EXPIRED_ORDER_BATCH_SIZE = 200
+
+expired_orders_lease = LeaderLease(db, "cancel_expired_orders", ttl_seconds=180)
+
+# Recompute the products' 30-day sales window as days fall out of it
+POPULARITY_REFRESH_MINUTES = int(os.environ.get("POPULARITY_REFRESH_MINUTES", "60"))
+popularity_lease = LeaderLease(db, "refresh_product_popularity", ttl_seconds=POPULARITY_REFRESH_MINUTES * 60 * 2)
+
+# Superseded by the admin filter indexes; dropped so writes stop maintaining them
+RETIRED_ORDER_INDEXES = ["payment_status_created_at"]
+INDEX_NOT_FOUND = 27
+
+async def ensure_indexes():
+    """Create the indexes the hot queries rely on (no-op when they already exist)"""
+    await db.orders.create_index("order_id", name="order_id")
+    await db.orders.create_index([("user_id", 1), ("created_at", -1), ("order_id", -1)], name="user_id_created_at")
+    
+    # Admin order list: one index per equality-filter combination (also serves the expiry job)
+    for fields in ADMIN_ORDER_FILTER_INDEXES:
+        keys = [(field, 1) for field in fields] + [("created_at", -1), ("order_id", -1)]
+        await db.orders.create_index(keys, name="_".join(fields + ("created_at", "order_id")))
+    for field in ADMIN_ORDER_SEARCH_INDEXES:
+        await db.orders.create_index([(field, 1), ("created_at", -1)], name=f"{field}_created_at")
+    for name in RETIRED_ORDER_INDEXES:
+        try:
+            await db.orders.drop_index(name)
+            logger.info(f"Dropped retired orders index {name}")
+        except OperationFailure as e:
+            if e.code != INDEX_NOT_FOUND:
+                raise
+    await order_idempotency.ensure_indexes()
+    await sales_rollups.ensure_indexes(db)
+    await sales_counters.ensure_indexes(db)
+    await customer_stats.ensure_indexes(db)
+    await auth_tokens.ensure_indexes(db)
+    await ensure_session_indexes(db)
+    await analytics_snapshots.ensure_indexes(db)
+
+async def cancel_expired_order_batch(orders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Cancel a batch of expired orders and return the ones this worker actually cancelled"""
+    now = datetime.now(timezone.utc)
+    
+    # Conditional update: an order that got paid or cancelled in the meantime is left alone,
+    # so each order is cancelled (and restocked) exactly once
+    results = await asyncio.gather(*[
+        db.orders.update_one(
+            {
+                "order_id": order["order_id"],
+                "payment_status": "pending",
+                "order_status": {"$ne": "cancelled"}
+            },
+            {"$set": {"order_status": "cancelled", "updated_at": now}}
+        )
+        for order in orders
+    ])
+    cancelled = [order for order, result in zip(orders, results) if result.modified_count == 1]
+    if not cancelled:
+        return []
+    
+    # Return items to inventory with one $inc per product
+    restock: Dict[str, int] = {}
+    for order in cancelled:
+        for item in order["items"]:
+            restock[item["product_id"]] = restock.get(item["product_id"], 0) + item["quantity"]
+    await db.products.bulk_write(
+        [UpdateOne({"product_id": product_id}, {"$inc": {"stock": quantity}}) for product_id, quantity in restock.items()],
+        ordered=False
+    )
+    
+    # Log activity (system action)
+    await db.activity_log.insert_many([
+        {
+            "admin_id": "system",
+            "user_name": "System",
+            "action": "update",
+            "type": "order",
+            "description": f"Auto-cancelled expired order {order['order_id']} and restored inventory",
+            "timestamp": now
+        }
+        for order in cancelled
+    ])
+    
+    await sales_rollups.record_transitions(db, [
+        (order, "order_status", order.get("order_status"), "cancelled") for order in cancelled
+    ])
+    return cancelled
+
+async def cancel_expired_order_backlog() -> int:
+    """
+    Cancel every online order whose payment window has passed, in batches.
+
+    The lease is renewed before each batch, and the drain stops if another
+    worker has taken it over, so a long backlog never runs on two workers.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(minutes=PAYMENT_WINDOW_MINUTES)
+    
+    # Served by the (payment_status, created_at, order_id) index
+    query = {
+        "payment_status": "pending",
+        **date_range_filter("created_at", lt=cutoff),
+        "payment_method": {"$nin": COD_PAYMENT_METHODS},
+        "order_status": {"$ne": "cancelled"}
+    }
+    projection = {"_id": 0, "order_id": 1, "items": 1, "shipping_address": 1, "total": 1, "created_at": 1, "order_status": 1}
+    
+    total_cancelled = 0
+    while True:
+        if not await expired_orders_lease.acquire():
+            logger.warning("Lost the expired-orders lease, leaving the rest of the backlog to its new holder")
+            break
+        
+        batch = await db.orders.find(query, projection).sort("created_at", 1).limit(EXPIRED_ORDER_BATCH_SIZE).to_list(EXPIRED_ORDER_BATCH_SIZE)
+        if not batch:
+            break
+        
+        cancelled = await cancel_expired_order_batch(batch)
+        total_cancelled += len(cancelled)
+        
+        # Queue auto-cancellation emails (payment not received); waits for room instead of dropping them
+        for order in cancelled:
+            logger.info(f"Auto-cancelled expired order and returned stock: {order['order_id']}")
+            email = render_email("order_cancelled_auto", order)
+            await email_queue.put(send_order_email, order["shipping_address"]["email"], f"Order Cancelled #{order['order_id']}", email.html, email.text)
+        
+        if len(batch) < EXPIRED_ORDER_BATCH_SIZE:
+            break
+    
+    return total_cancelled
 
 async def cancel_expired_orders():
     """Background task to cancel orders with pending payment for more than 5 minutes (excludes COD)"""
     while True:
         try:
-            # Calculate 5 minutes ago
-            five_minutes_ago = (datetime.now(timezone.utc) - timedelta(minutes=5)).isoformat()
-            
-            # Find orders with pending payment older than 5 minutes (exclude COD orders)
-            expired_orders = await db.orders.find({
-                "payment_status": "pending",
-                "payment_method": {"$nin": ["COD", "cod", "Cash on Delivery"]},  # Exclude all COD naming variations
-                "created_at": {"$lt": five_minutes_ago},
-                "order_status": {"$ne": "cancelled"}
-            }).to_list(100)
-            
-            for order in expired_orders:
-                order_id = order["order_id"]
-                logger.info(f"Auto-cancelling expired order and returning stock: {order_id}")
-                
-                # 1. Return items to inventory
-                for item in order["items"]:
-                    await db.products.update_one(
-                        {"product_id": item["product_id"]},
-                        {"$inc": {"stock": item["quantity"]}}
-                    )
-                
-                # 2. Update order status
-                await db.orders.update_one(
-                    {"order_id": order_id},
-                    {
-                        "$set": {
-                            "order_status": "cancelled",
-                            "updated_at": datetime.now(timezone.utc).isoformat()
-                        }
-                    }
-                )
-                
-                # 3. Send auto-cancellation email (payment not received)
-                email_html = generate_order_cancelled_auto_html(order)
-                await send_order_email(order["shipping_address"]["email"], f"Order Cancelled #{order_id}", email_html)
-                
-                # Log activity (system action)
-                await log_activity("system", "System", "update", "order", f"Auto-cancelled expired order {order_id} and restored inventory")
-                
+            # Only the worker holding the lease runs the job; the others just keep trying to take over
+            if await expired_orders_lease.acquire():
+                cancelled = await cancel_expired_order_backlog()
+                if cancelled:
+                    logger.info(f"Auto-cancelled {cancelled} expired orders")
         except Exception as e:
             logger.error(f"Error in background cancel task: {e}")
             
         # Run every 1 minute for better responsiveness
         await asyncio.sleep(60)
 
+async def refresh_product_popularity():
+    """Background task that refreshes units_sold_30d / revenue_30d on products"""
+    while True:
+        try:
+            if await popularity_lease.acquire():
+                refreshed = await sales_counters.refresh_window(db)
+                logger.info(f"Refreshed 30-day sales window for {refreshed} products")
+        except Exception as e:
+            logger.error(f"Error in popularity refresh task: {e}")
+        
+        await asyncio.sleep(POPULARITY_REFRESH_MINUTES * 60)
+
 @app.on_event("startup")
 async def startup_event():
+    # Open pooled outbound HTTP clients
+    http_clients.start()
+    email_queue.start()
+    
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        logger.error(f"Failed to ensure indexes: {e}")
+    
+    # Until this succeeds the StoreSettings defaults are served; the version check retries the load
+    try:
+        await store_settings.load()
+    except Exception as e:
+        logger.error(f"Failed to load store settings: {e}")
+    store_settings.start()
+    
     # Start the background task
     asyncio.create_task(cancel_expired_orders())
+    asyncio.create_task(refresh_product_popularity())
     logger.info("Background task for order cancellation started")
@@ -8,6 +8,9 @@ from typing import Optional, Dict, Any
 from datetime import datetime, timezone, timedelta
 import logging
 
+from core.http_clients import get_http_client
+from utils.dates import as_datetime
+
 logger = logging.getLogger(__name__)
 
 # Origin (Warehouse) Configuration
@@ -49,9 +52,7 @@ async def get_shiprocket_token(db) -> str:
     settings = await db.shiprocket_settings.find_one({"_id": "auth_token"})
     
     if settings:
-        expiry = settings.get("expiry")
-        if expiry and isinstance(expiry, str):
-            expiry = datetime.fromisoformat(expiry)
+        expiry = as_datetime(settings.get("expiry"))
         
         # If token is still valid (with 1 hour buffer), return it
         if expiry and expiry > datetime.now(timezone.utc) + timedelta(hours=1):
@@ -62,41 +63,42 @@ async def get_shiprocket_token(db) -> str:
     logger.info("Fetching new Shiprocket token")
     
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(
-                f"{SHIPROCKET_API_BASE}/auth/login",
-                json={
-                    "email": email,
-                    "password": password
+        client = get_http_client("shiprocket")
+        response = await client.post(
+            f"{SHIPROCKET_API_BASE}/auth/login",
+            json={
+                "email": email,
+                "password": password
+            },
+            timeout=10.0
+        )
+        
+        if response.status_code != 200:
+            logger.error(f"Shiprocket auth failed: {response.text}")
+            raise ShippingError("Failed to authenticate with Shiprocket")
+        
+        data = response.json()
+        token = data.get("token")
+        
+        if not token:
+            raise ShippingError("No token received from Shiprocket")
+        
+        # Cache token in database (valid for 10 days)
+        expiry = datetime.now(timezone.utc) + timedelta(days=10)
+        await db.shiprocket_settings.update_one(
+            {"_id": "auth_token"},
+            {
+                "$set": {
+                    "token": token,
+                    "expiry": expiry,
+                    "updated_at": datetime.now(timezone.utc)
                 }
-            )
-            
-            if response.status_code != 200:
-                logger.error(f"Shiprocket auth failed: {response.text}")
-                raise ShippingError("Failed to authenticate with Shiprocket")
-            
-            data = response.json()
-            token = data.get("token")
-            
-            if not token:
-                raise ShippingError("No token received from Shiprocket")
-            
-            # Cache token in database (valid for 10 days)
-            expiry = datetime.now(timezone.utc) + timedelta(days=10)
-            await db.shiprocket_settings.update_one(
-                {"_id": "auth_token"},
-                {
-                    "$set": {
-                        "token": token,
-                        "expiry": expiry.isoformat(),
-                        "updated_at": datetime.now(timezone.utc).isoformat()
-                    }
-                },
-                upsert=True
-            )
-            
-            logger.info("Shiprocket token cached successfully")
-            return token
+            },
+            upsert=True
+        )
+        
+        logger.info("Shiprocket token cached successfully")
+        return token
             
     except httpx.RequestError as e:
         logger.error(f"Shiprocket auth connection error: {e}")
@@ -118,55 +120,55 @@ async def get_shiprocket_rates(
     token = await get_shiprocket_token(db)
     
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            # Shiprocket serviceability endpoint
-            url = f"{SHIPROCKET_API_BASE}/courier/serviceability/"
-            
-            params = {
-                "pickup_postcode": pickup_pincode,
-                "delivery_postcode": delivery_pincode,
-                "weight": weight_kg,
-                "cod": 1 if cod else 0,
-                "declared_value": declared_value
-            }
-            
-            headers = {
-                "Authorization": f"Bearer {token}",
-                "Content-Type": "application/json"
-            }
-            
+        client = get_http_client("shiprocket")
+        # Shiprocket serviceability endpoint
+        url = f"{SHIPROCKET_API_BASE}/courier/serviceability/"
+        
+        params = {
+            "pickup_postcode": pickup_pincode,
+            "delivery_postcode": delivery_pincode,
+            "weight": weight_kg,
+            "cod": 1 if cod else 0,
+            "declared_value": declared_value
+        }
+        
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json"
+        }
+        
+        response = await client.get(url, params=params, headers=headers)
+        
+        if response.status_code == 401:
+            # Token expired, clear cache and retry once
+            logger.warning("Shiprocket token expired, refreshing...")
+            await db.shiprocket_settings.delete_one({"_id": "auth_token"})
+            token = await get_shiprocket_token(db)
+            headers["Authorization"] = f"Bearer {token}"
             response = await client.get(url, params=params, headers=headers)
-            
-            if response.status_code == 401:
-                # Token expired, clear cache and retry once
-                logger.warning("Shiprocket token expired, refreshing...")
-                await db.shiprocket_settings.delete_one({"_id": "auth_token"})
-                token = await get_shiprocket_token(db)
-                headers["Authorization"] = f"Bearer {token}"
-                response = await client.get(url, params=params, headers=headers)
-            
-            if response.status_code != 200:
-                logger.error(f"Shiprocket API error: {response.status_code} - {response.text}")
-                raise ShippingError("Failed to fetch shipping rates from Shiprocket")
-            
-            data = response.json()
-            
-            # Extract available couriers
-            couriers = data.get("data", {}).get("available_courier_companies", [])
-            
-            if not couriers:
-                logger.warning(f"No couriers available for {pickup_pincode} -> {delivery_pincode}")
-                raise ShippingError("No courier services available for this route")
-            
-            # Filter for preferred courier if specified
-            if preferred_courier:
-                filtered = [c for c in couriers if preferred_courier.upper() in c.get("courier_name", "").upper()]
-                if filtered:
-                    return filtered
-                logger.warning(f"{preferred_courier} not available, showing all options")
-            
-            return couriers
-            
+        
+        if response.status_code != 200:
+            logger.error(f"Shiprocket API error: {response.status_code} - {response.text}")
+            raise ShippingError("Failed to fetch shipping rates from Shiprocket")
+        
+        data = response.json()
+        
+        # Extract available couriers
+        couriers = data.get("data", {}).get("available_courier_companies", [])
+        
+        if not couriers:
+            logger.warning(f"No couriers available for {pickup_pincode} -> {delivery_pincode}")
+            raise ShippingError("No courier services available for this route")
+        
+        # Filter for preferred courier if specified
+        if preferred_courier:
+            filtered = [c for c in couriers if preferred_courier.upper() in c.get("courier_name", "").upper()]
+            if filtered:
+                return filtered
+            logger.warning(f"{preferred_courier} not available, showing all options")
+        
+        return couriers
+        
     except httpx.RequestError as e:
         logger.error(f"Shiprocket API connection error: {e}")
         raise ShippingError("Unable to connect to Shiprocket")
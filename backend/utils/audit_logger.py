@@ -2,36 +2,13 @@
 Structured audit logging for security events.
 """
 import logging
-import json
-from datetime import datetime, timezone
 from typing import Optional, Dict, Any
-import os
 
-# Configure audit logger
+# Records are written by the queue listener configured in core.logging_setup:
+# JSON lines in logs/audit.log, rotated and gzipped.
 audit_logger = logging.getLogger("audit")
 audit_logger.setLevel(logging.INFO)
 
-# Create logs directory if it doesn't exist
-os.makedirs("logs", exist_ok=True)
-
-# File handler for audit logs
-file_handler = logging.FileHandler("logs/audit.log")
-file_handler.setLevel(logging.INFO)
-
-# JSON formatter
-class JSONFormatter(logging.Formatter):
-    def format(self, record):
-        log_data = {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "level": record.levelname,
-            "event": record.getMessage(),
-            "extra": getattr(record, "extra", {})
-        }
-        return json.dumps(log_data)
-
-file_handler.setFormatter(JSONFormatter())
-audit_logger.addHandler(file_handler)
-
 
 def log_event(event_type: str, details: Dict[str, Any], ip: Optional[str] = None):
     """
@@ -47,7 +24,7 @@ def log_event(event_type: str, details: Dict[str, Any], ip: Optional[str] = None
         "ip": ip,
         **details
     }
-    audit_logger.info(event_type, extra=log_data)
+    audit_logger.info(event_type, extra={"fields": log_data})
 
 
 def log_failed_login(email: str, ip: str, reason: str):
@@ -0,0 +1,112 @@
+"""
+Small in-process caches with TTL expiry and LRU eviction.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded key/value cache where each entry expires ``ttl_seconds`` after it was set.
+
+    When full, the least recently used entry is evicted. ``get_or_load`` makes
+    concurrent misses for the same key share a single load.
+
+    Args:
+        ttl_seconds: Default lifetime of an entry
+        maxsize: Maximum number of entries kept
+    """
+
+    def __init__(self, ttl_seconds: float, maxsize: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._loading: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a live entry, or ``default`` if it is missing or expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Whether a live entry exists (does not count as a hit or refresh recency)."""
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store an entry, evicting the least recently used one if the cache is full."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """Remove an entry if present."""
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        self._data.clear()
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl_seconds: Optional[float] = None) -> Any:
+        """
+        Get an entry, loading and caching it on a miss.
+
+        Args:
+            key: Cache key
+            loader: Coroutine function producing the value
+            ttl_seconds: Lifetime override for a freshly loaded value
+
+        Returns:
+            Cached or freshly loaded value
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        pending = self._loading.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            value = await loader()
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # waiters re-raise it; don't warn when there are none
+            raise
+        else:
+            self.set(key, value, ttl_seconds)
+            future.set_result(value)
+            return value
+        finally:
+            self._loading.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get size and hit-rate counters."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
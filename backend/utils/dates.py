@@ -0,0 +1,86 @@
+"""
+Date helpers for API query parameters and stored timestamps.
+
+Timestamps are stored as native BSON dates. Documents written before the
+migration (see migrate_timestamps.py) may still hold ISO strings, so reads go
+through ``as_datetime`` and range queries through ``date_range_filter`` until
+DATES_DUAL_READ is switched off.
+"""
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Union
+
+from fastapi import HTTPException
+
+# Match legacy ISO-string timestamps in range queries during the rollout
+DATES_DUAL_READ = os.environ.get("DATES_DUAL_READ", "true").lower() == "true"
+
+
+def parse_datetime_param(value: Optional[str], end_of_day: bool = False) -> Optional[datetime]:
+    """
+    Parse an ISO date or datetime query parameter into an aware UTC datetime.
+
+    Args:
+        value: "YYYY-MM-DD" or a full ISO 8601 timestamp (a trailing "Z" is accepted)
+        end_of_day: For a bare date, return 23:59:59.999999 instead of midnight
+
+    Returns:
+        Timezone-aware datetime, or None if value is empty
+
+    Raises:
+        HTTPException: 400 if the value cannot be parsed
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {value}")
+    if end_of_day and len(value) == 10:
+        parsed = parsed.replace(hour=23, minute=59, second=59, microsecond=999999)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def as_datetime(value: Union[datetime, str, None]) -> Optional[datetime]:
+    """
+    Read a stored timestamp that may be a BSON date or a legacy ISO string.
+
+    Args:
+        value: Stored value
+
+    Returns:
+        Timezone-aware UTC datetime, or None if value is empty
+    """
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def date_range_filter(field: str, **bounds: Optional[datetime]) -> Dict[str, Any]:
+    """
+    Build a range condition on a timestamp field.
+
+    While DATES_DUAL_READ is on, the condition is an ``$or`` that also matches
+    unmigrated ISO strings; merge it with ``$and`` if the query has its own ``$or``.
+
+    Args:
+        field: Timestamp field name
+        **bounds: Comparison operators without the "$" (gte, gt, lte, lt); None values are skipped
+
+    Returns:
+        MongoDB filter document (empty if no bounds are set)
+    """
+    bounds = {op: value for op, value in bounds.items() if value is not None}
+    if not bounds:
+        return {}
+    native = {field: {f"${op}": value for op, value in bounds.items()}}
+    if not DATES_DUAL_READ:
+        return native
+    legacy = {field: {f"${op}": value.astimezone(timezone.utc).isoformat() for op, value in bounds.items()}}
+    return {"$or": [native, legacy]}
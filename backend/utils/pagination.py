@@ -0,0 +1,113 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor holds the sort-key values of the last row of a page. Only plain
+scalars (strings, numbers, null) and tagged dates are allowed in it, since the
+values end up in query equality clauses: anything else could smuggle query
+operators such as {"$ne": null} into the filter.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from utils.dates import as_datetime
+
+
+CURSOR_SCALARS = (str, int, float, type(None))
+
+
+def _encode_value(value: Any) -> Any:
+    # Dates are tagged so they decode back to datetimes and compare as BSON dates;
+    # strings and numbers are encoded by json itself and keep their type
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    raise TypeError(f"{type(value).__name__} values can't be used in a cursor")
+
+
+def _decode_value(obj: Dict[str, Any]) -> Any:
+    if set(obj) == {"$date"} and isinstance(obj["$date"], str):
+        return as_datetime(obj["$date"])
+    return obj  # rejected by decode_cursor
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """
+    Encode the sort-key values of the last row of a page into an opaque cursor.
+
+    Args:
+        values: Sort-key values, in sort order (e.g. [created_at, order_id])
+
+    Returns:
+        URL-safe cursor string
+    """
+    raw = json.dumps(values, default=_encode_value, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    Decode a cursor produced by ``encode_cursor``.
+
+    Args:
+        cursor: Cursor string from the client
+        size: Expected number of sort-key values
+
+    Returns:
+        List of sort-key values
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed or holds anything but scalars and dates
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()), object_hook=_decode_value)
+    except (ValueError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not all(isinstance(value, CURSOR_SCALARS + (datetime,)) for value in values):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def keyset_filter(sort_fields: List[Tuple[str, int]], values: List[Any]) -> Dict[str, Any]:
+    """
+    Build the query that selects rows strictly after the cursor position.
+
+    For sort [(a, -1), (b, -1)] and cursor (x, y) this yields
+    ``{"$or": [{a: {"$lt": x}}, {a: x, b: {"$lt": y}}]}``.
+
+    Args:
+        sort_fields: (field, direction) pairs matching the query sort
+        values: Cursor values for those fields
+
+    Returns:
+        MongoDB filter document
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort_fields):
+        clause = {prev_field: values[j] for j, (prev_field, _) in enumerate(sort_fields[:i])}
+        clause[field] = {"$lt" if direction < 0 else "$gt": values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+
+def next_cursor(rows: List[Dict[str, Any]], sort_fields: List[Tuple[str, int]], limit: int) -> Optional[str]:
+    """
+    Get the cursor for the page after ``rows``, or None on the last page.
+
+    Args:
+        rows: Rows of the current page
+        sort_fields: (field, direction) pairs matching the query sort
+        limit: Page size that was requested
+
+    Returns:
+        Cursor string or None
+    """
+    if len(rows) < limit or not rows:
+        return None
+    last = rows[-1]
+    return encode_cursor([last.get(field) for field, _ in sort_fields])
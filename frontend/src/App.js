@@ -52,6 +52,37 @@ const getBackendUrl = () => {
 const BACKEND_URL = getBackendUrl();
 const API = `${BACKEND_URL}/api`;
 
+// With AUTH_MODE=jwt the access token is short-lived: on a 401 the server marks as
+// `refreshable` (the request carried JWT cookies), rotate it through /auth/refresh once
+// and retry. Anonymous visitors and session logins never get that flag, so they never
+// call /auth/refresh. Concurrent 401s share one refresh call; a 409 means another tab
+// rotated the token first and its cookies are already set.
+let refreshPromise = null;
+axios.interceptors.response.use(
+  (response) => response,
+  async (error) => {
+    const original = error.config;
+    const isAuthCall = ["/auth/refresh", "/auth/login", "/auth/logout"].some((path) => original?.url?.includes(path));
+    if (error.response?.status !== 401 || !error.response.data?.refreshable || !original || original._retried || isAuthCall) {
+      return Promise.reject(error);
+    }
+    original._retried = true;
+    if (!refreshPromise) {
+      refreshPromise = axios
+        .post(`${API}/auth/refresh`, {}, { withCredentials: true })
+        .finally(() => { refreshPromise = null; });
+    }
+    try {
+      await refreshPromise;
+    } catch (refreshError) {
+      if (refreshError.response?.status !== 409) {
+        return Promise.reject(error);
+      }
+    }
+    return axios({ ...original, withCredentials: true });
+  }
+);
+
 // Cart Context
 export const CartContext = createContext();
 
@@ -31,6 +31,7 @@ const CheckoutPage = () => {
   });
 
   const [shippingRate, setShippingRate] = useState(null);
+  const [storeSettings, setStoreSettings] = useState({ cod_enabled: true, cod_fee: 100 });
   const [shippingLoading, setShippingLoading] = useState(false);
   const [shippingError, setShippingError] = useState(null);
 
@@ -45,8 +46,8 @@ const CheckoutPage = () => {
         cost: 0.0,
         delivery_days: "5-7 days",
         carrier: "Free Delivery (India)",
-        cod_available: true,
-        cod_fee: 100.0,
+        cod_available: storeSettings.cod_enabled,
+        cod_fee: storeSettings.cod_enabled ? storeSettings.cod_fee : 0,
         zone: "india"
       });
       setShippingError(null);
@@ -73,11 +74,17 @@ const CheckoutPage = () => {
   };
 
   // Also trigger when cart changes or on initial load if data present
+  useEffect(() => {
+    axios.get(`${API}/settings`)
+      .then((response) => setStoreSettings(response.data))
+      .catch(() => {});
+  }, []);
+
   useEffect(() => {
     if (formData.pincode && formData.country) {
       calculateShipping();
     }
-  }, [cart.items.length]);
+  }, [cart.items.length, storeSettings]);
 
   const validateForm = () => {
     const required = ["full_name", "email", "phone", "address_line1", "city", "state", "pincode"];
@@ -524,7 +531,7 @@ const CheckoutPage = () => {
                       <p className="font-medium text-stone-800">Cash on Delivery</p>
                       <p className="text-xs text-stone-500">
                         {isCodAvailable
-                          ? `Pay when you receive (Fixed COD Surcharge: ₹100)`
+                          ? `Pay when you receive (Fixed COD Surcharge: ₹${storeSettings.cod_fee})`
                           : shippingLoading
                             ? "Checking availability..."
                             : formData.country !== "India"
@@ -8,25 +8,40 @@ const MyOrdersPage = () => {
     const { user } = useAuth();
     const [orders, setOrders] = useState([]);
     const [loading, setLoading] = useState(true);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const navigate = useNavigate();
 
-    useEffect(() => {
-        const fetchOrders = async () => {
-            try {
-                const response = await axios.get(`${API}/orders/user/my-orders`, { withCredentials: true });
-                setOrders(response.data);
-            } catch (error) {
-                console.error("Error fetching orders:", error);
-            } finally {
-                setLoading(false);
-            }
-        };
+    // The endpoint is cursor-paginated; older orders are appended page by page
+    const fetchOrders = async (cursor = null) => {
+        const response = await axios.get(`${API}/orders/user/my-orders`, {
+            params: cursor ? { cursor } : {},
+            withCredentials: true
+        });
+        const page = response.data.orders || [];
+        setOrders(prev => (cursor ? [...prev, ...page] : page));
+        setNextCursor(response.data.next_cursor || null);
+    };
 
+    useEffect(() => {
         if (user) {
-            fetchOrders();
+            fetchOrders()
+                .catch(error => console.error("Error fetching orders:", error))
+                .finally(() => setLoading(false));
         }
     }, [user]);
 
+    const loadMore = async () => {
+        setLoadingMore(true);
+        try {
+            await fetchOrders(nextCursor);
+        } catch (error) {
+            console.error("Error fetching more orders:", error);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const getStatusColor = (status) => {
         switch (status?.toLowerCase()) {
             case 'delivered': return 'text-green-600 bg-green-50 border-green-100';
@@ -65,7 +80,7 @@ const MyOrdersPage = () => {
                             <h1 className="text-3xl md:text-5xl font-serif text-stone-800">My Orders</h1>
                         </div>
                         <p className="text-stone-500 font-light">
-                            {orders.length} {orders.length === 1 ? 'Order' : 'Orders'} Total
+                            {orders.length}{nextCursor ? '+' : ''} {orders.length === 1 && !nextCursor ? 'Order' : 'Orders'} Total
                         </p>
                     </div>
 
@@ -120,24 +135,22 @@ const MyOrdersPage = () => {
                                         <div className="grid grid-cols-1 md:grid-cols-2 gap-8">
                                             <div className="space-y-4">
                                                 <div className="flex -space-x-3 overflow-hidden">
-                                                    {order.items?.map((item, idx) => (
-                                                        idx < 4 && (
-                                                            <div key={idx} className="inline-block h-16 w-12 rounded-lg border-2 border-white overflow-hidden shadow-sm bg-stone-100">
-                                                                {/* Image handling simplified for preview */}
-                                                                <div className="w-full h-full bg-pink-50 flex items-center justify-center text-[10px] text-pink-300">
-                                                                    IMG
-                                                                </div>
+                                                    {Array.from({ length: Math.min(order.item_count || 0, 4) }).map((_, idx) => (
+                                                        <div key={idx} className="inline-block h-16 w-12 rounded-lg border-2 border-white overflow-hidden shadow-sm bg-stone-100">
+                                                            {/* Image handling simplified for preview */}
+                                                            <div className="w-full h-full bg-pink-50 flex items-center justify-center text-[10px] text-pink-300">
+                                                                IMG
                                                             </div>
-                                                        )
+                                                        </div>
                                                     ))}
-                                                    {order.items?.length > 4 && (
+                                                    {order.item_count > 4 && (
                                                         <div className="flex items-center justify-center h-16 w-12 rounded-lg border-2 border-white bg-stone-50 text-[10px] font-bold text-stone-400 shadow-sm">
-                                                            +{order.items.length - 4}
+                                                            +{order.item_count - 4}
                                                         </div>
                                                     )}
                                                 </div>
                                                 <p className="text-sm text-stone-500 italic">
-                                                    {order.items?.length} {order.items?.length === 1 ? 'item' : 'items'}
+                                                    {order.item_count} {order.item_count === 1 ? 'item' : 'items'}
                                                 </p>
                                             </div>
 
@@ -182,6 +195,13 @@ const MyOrdersPage = () => {
                                     </div>
                                 </div>
                             ))}
+                            {nextCursor && (
+                                <div className="text-center pt-4">
+                                    <button onClick={loadMore} disabled={loadingMore} className="btn-luxury-primary px-8 py-4">
+                                        {loadingMore ? 'Loading...' : 'Load Older Orders'}
+                                    </button>
+                                </div>
+                            )}
                         </div>
                     )}
                 </div>
@@ -288,6 +288,7 @@ const ShopPage = () => {
                   <SelectContent>
                     <SelectItem value="created_at-desc">Newest First</SelectItem>
                     <SelectItem value="created_at-asc">Oldest First</SelectItem>
+                    <SelectItem value="popularity-desc">Most Popular</SelectItem>
                     <SelectItem value="price-asc">Price: Low to High</SelectItem>
                     <SelectItem value="price-desc">Price: High to Low</SelectItem>
                     <SelectItem value="name-asc">Name: A to Z</SelectItem>
@@ -7,6 +7,7 @@ import { Button } from "../../components/ui/button";
 import { Input } from "../../components/ui/input";
 import { Dialog, DialogContent, DialogHeader, DialogTitle } from "../../components/ui/dialog";
 import { Card, CardContent, CardHeader, CardTitle } from "../../components/ui/card";
+import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "../../components/ui/select";
 
 const AdminCustomers = () => {
     const { user } = useAuth();
@@ -17,15 +18,20 @@ const AdminCustomers = () => {
     const [searchTerm, setSearchTerm] = useState("");
     const [selectedCustomer, setSelectedCustomer] = useState(null);
     const [customerOrders, setCustomerOrders] = useState([]);
+    const [ordersCursor, setOrdersCursor] = useState(null);
     const [isDetailDialogOpen, setIsDetailDialogOpen] = useState(false);
+    const [sortBy, setSortBy] = useState("created_at");
 
     useEffect(() => {
         fetchCustomers();
-    }, []);
+    }, [sortBy]);
 
     const fetchCustomers = async () => {
         try {
-            const response = await axios.get(`${API}/admin/customers`, { withCredentials: true });
+            const response = await axios.get(`${API}/admin/customers`, {
+                params: { sort_by: sortBy },
+                withCredentials: true
+            });
             setCustomers(response.data.customers || []);
         } catch (error) {
             console.error("Error fetching customers:", error);
@@ -34,15 +40,33 @@ const AdminCustomers = () => {
         }
     };
 
+    const fetchCustomerOrders = async (customer, cursor = null) => {
+        const response = await axios.get(`${API}/admin/customers/${customer.user_id}`, {
+            params: cursor ? { cursor } : {},
+            withCredentials: true
+        });
+        const page = response.data.orders || [];
+        setCustomerOrders(prev => (cursor ? [...prev, ...page] : page));
+        setOrdersCursor(response.data.next_cursor || null);
+    };
+
     const viewCustomerDetails = async (customer) => {
         setSelectedCustomer(customer);
         setIsDetailDialogOpen(true);
+        setCustomerOrders([]);
+        setOrdersCursor(null);
         try {
-            const response = await axios.get(`${API}/admin/customers/${customer.user_id}`, { withCredentials: true });
-            setCustomerOrders(response.data.orders || []);
+            await fetchCustomerOrders(customer);
+        } catch (error) {
+            console.error("Error fetching customer orders:", error);
+        }
+    };
+
+    const loadMoreCustomerOrders = async () => {
+        try {
+            await fetchCustomerOrders(selectedCustomer, ordersCursor);
         } catch (error) {
             console.error("Error fetching customer orders:", error);
-            setCustomerOrders([]);
         }
     };
 
@@ -68,8 +92,8 @@ const AdminCustomers = () => {
             </div>
 
             {/* Search */}
-            <div className="mb-6">
-                <div className="relative max-w-md">
+            <div className="mb-6 flex flex-wrap gap-4">
+                <div className="relative flex-1 max-w-md">
                     <Search className="absolute left-3 top-1/2 -translate-y-1/2 h-4 w-4 text-gray-400" />
                     <Input
                         placeholder="Search by name, email, or phone..."
@@ -78,6 +102,18 @@ const AdminCustomers = () => {
                         className="pl-10"
                     />
                 </div>
+                <Select value={sortBy} onValueChange={setSortBy}>
+                    <SelectTrigger className="w-48" data-testid="customer-sort">
+                        <SelectValue placeholder="Sort by" />
+                    </SelectTrigger>
+                    <SelectContent>
+                        <SelectItem value="created_at">Newest</SelectItem>
+                        <SelectItem value="total_spent">Total Spent</SelectItem>
+                        <SelectItem value="order_count">Most Orders</SelectItem>
+                        <SelectItem value="avg_order_value">Avg. Order Value</SelectItem>
+                        <SelectItem value="last_order_at">Last Order</SelectItem>
+                    </SelectContent>
+                </Select>
             </div>
 
             {/* Customers Table */}
@@ -95,6 +131,9 @@ const AdminCustomers = () => {
                                         <th className="text-left p-4 font-medium text-gray-600">Customer</th>
                                         <th className="text-left p-4 font-medium text-gray-600">Email</th>
                                         <th className="text-left p-4 font-medium text-gray-600">Phone</th>
+                                        <th className="text-right p-4 font-medium text-gray-600">Orders</th>
+                                        <th className="text-right p-4 font-medium text-gray-600">Total Spent</th>
+                                        <th className="text-left p-4 font-medium text-gray-600">Last Order</th>
                                         <th className="text-left p-4 font-medium text-gray-600">Joined</th>
                                         <th className="text-center p-4 font-medium text-gray-600">Actions</th>
                                     </tr>
@@ -112,6 +151,13 @@ const AdminCustomers = () => {
                                             </td>
                                             <td className="p-4 text-sm text-gray-600">{customer.email}</td>
                                             <td className="p-4 text-sm text-gray-600">{customer.phone || "-"}</td>
+                                            <td className="p-4 text-sm text-gray-600 text-right">{customer.order_count || 0}</td>
+                                            <td className="p-4 text-sm text-gray-600 text-right">
+                                                ₹{(customer.total_spent || 0).toLocaleString()}
+                                            </td>
+                                            <td className="p-4 text-sm text-gray-600">
+                                                {customer.last_order_at ? new Date(customer.last_order_at).toLocaleDateString() : "-"}
+                                            </td>
                                             <td className="p-4 text-sm text-gray-600">
                                                 {customer.created_at ? new Date(customer.created_at).toLocaleDateString() : "-"}
                                             </td>
@@ -149,7 +195,7 @@ const AdminCustomers = () => {
                             </div>
 
                             <div>
-                                <h4 className="font-semibold mb-3">Order History ({customerOrders.length} orders)</h4>
+                                <h4 className="font-semibold mb-3">Order History ({customerOrders.length}{ordersCursor ? "+" : ""} orders)</h4>
                                 {customerOrders.length === 0 ? (
                                     <p className="text-gray-500 text-center py-4">No orders yet</p>
                                 ) : (
@@ -172,6 +218,11 @@ const AdminCustomers = () => {
                                                 </div>
                                             </div>
                                         ))}
+                                        {ordersCursor && (
+                                            <Button variant="outline" size="sm" className="w-full" onClick={loadMoreCustomerOrders}>
+                                                Load More Orders
+                                            </Button>
+                                        )}
                                     </div>
                                 )}
                             </div>
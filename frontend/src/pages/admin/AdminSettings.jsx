@@ -22,7 +22,8 @@ const AdminSettings = () => {
         low_stock_threshold: 5,
         store_email: "",
         free_shipping_threshold: 999,
-        cod_enabled: true
+        cod_enabled: true,
+        cod_fee: 100
     });
 
     useEffect(() => {
@@ -85,6 +86,11 @@ const AdminSettings = () => {
                             <Input type="number" value={settings.free_shipping_threshold} onChange={(e) => setSettings({ ...settings, free_shipping_threshold: parseInt(e.target.value) || 999 })} />
                             <p className="text-xs text-gray-500 mt-1">Orders above this amount get free shipping</p>
                         </div>
+                        <div>
+                            <Label>COD Fee (₹)</Label>
+                            <Input type="number" value={settings.cod_fee} onChange={(e) => setSettings({ ...settings, cod_fee: parseFloat(e.target.value) || 0 })} />
+                            <p className="text-xs text-gray-500 mt-1">Surcharge added to Cash on Delivery orders</p>
+                        </div>
                     </div>
 
                     <div className="pt-4 border-t">
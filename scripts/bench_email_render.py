@@ -0,0 +1,76 @@
+"""
+Benchmark transactional email rendering.
+
+Renders every order template for a 20-line order and reports the average
+render time per email (HTML + plain-text parts).
+
+Usage:
+    python scripts/bench_email_render.py [iterations]
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from email_templates import render_email  # noqa: E402
+
+ORDER_TEMPLATES = [
+    "order_confirmation",
+    "cart_reminder",
+    "order_shipped",
+    "order_delivered",
+    "order_cancelled_manual",
+    "order_cancelled_auto",
+    "payment_failed",
+]
+
+
+def build_order(lines: int = 20) -> dict:
+    items = [
+        {
+            "product_id": f"prod_{i:012d}",
+            "name": f"Chikankari Suit No. {i}",
+            "price": 2499.0,
+            "sale_price": 1999.0 if i % 2 else None,
+            "quantity": 1 + i % 3,
+            "size": "M",
+            "image": f"/col-imgs/{i}.png",
+        }
+        for i in range(lines)
+    ]
+    return {
+        "order_id": "ORDBENCH01",
+        "items": items,
+        "total": sum((item["sale_price"] or item["price"]) * item["quantity"] for item in items),
+        "shipping_address": {
+            "full_name": "Benchmark Customer",
+            "email": "bench@example.com",
+            "address_line1": "3192-A Partap Street",
+            "city": "Delhi",
+            "state": "Delhi",
+            "pincode": "110002",
+        },
+        "courier_name": "DTDC",
+        "tracking_number": "D123456789",
+        "tracking_url": "https://example.com/track/D123456789",
+    }
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    order = build_order(20)
+
+    print(f"Rendering {iterations} emails per template for a 20-line order")
+    for name in ORDER_TEMPLATES:
+        render_email(name, order)  # warm up
+        started = time.perf_counter()
+        for _ in range(iterations):
+            render_email(name, order)
+        elapsed = time.perf_counter() - started
+        rendered = render_email(name, order)
+        print(f"  {name:<24} {elapsed / iterations * 1e6:8.1f} us/email  html={len(rendered.html):>6}B  text={len(rendered.text):>5}B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark login password verification under concurrency.
+
+Runs N concurrent bcrypt verifications (one per simulated login) twice:
+inline on the event loop, as the login handler used to, and through the
+bounded PasswordHasher pool. For each it reports logins/second and the
+worst event-loop stall seen by a 10ms ticker task, which is what the rest of
+the storefront experiences during a burst of logins.
+
+Usage:
+    python scripts/bench_password_hashing.py [concurrency] [rounds]
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import bcrypt  # noqa: E402
+
+from core.passwords import BCRYPT_WORKERS, PasswordHasher  # noqa: E402
+
+TICK_SECONDS = 0.01
+
+
+async def ticker(stop: asyncio.Event, stalls: list) -> None:
+    """Record how late each 10ms tick fires; a blocked loop shows up as a large delay."""
+    while not stop.is_set():
+        expected = time.perf_counter() + TICK_SECONDS
+        await asyncio.sleep(TICK_SECONDS)
+        stalls.append(time.perf_counter() - expected)
+
+
+async def run(label: str, verify, concurrency: int, password: str, hashed: str) -> None:
+    stop = asyncio.Event()
+    stalls: list = []
+    tick_task = asyncio.create_task(ticker(stop, stalls))
+    await asyncio.sleep(TICK_SECONDS * 2)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*[verify(password, hashed) for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await tick_task
+    assert all(results)
+    print(f"{label:<22} {concurrency / elapsed:8.1f} logins/s   {elapsed:6.2f}s total   "
+          f"max loop stall {max(stalls) * 1000:7.1f}ms")
+
+
+async def main(concurrency: int, rounds: int) -> None:
+    password = "correct horse battery staple"
+    hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=rounds)).decode()
+    print(f"{concurrency} concurrent logins, bcrypt rounds={rounds}, pool workers={BCRYPT_WORKERS}\n")
+
+    async def inline_verify(plain: str, stored: str) -> bool:
+        return bcrypt.checkpw(plain.encode(), stored.encode())
+
+    hasher = PasswordHasher(rounds=rounds, max_waiting=concurrency)
+    await run("inline (blocking)", inline_verify, concurrency, password, hashed)
+    await run("PasswordHasher pool", hasher.verify, concurrency, password, hashed)
+
+    stats = hasher.stats()
+    print(f"\npool: avg queue {stats['avg_queue_ms']}ms, max queue {stats['max_queue_ms']}ms, avg hash {stats['avg_hash_ms']}ms")
+    hasher.shutdown()
+
+
+if __name__ == "__main__":
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    asyncio.run(main(concurrency, rounds))
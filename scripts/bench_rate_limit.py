@@ -0,0 +1,78 @@
+"""
+Check that a rate limit storage is shared across workers, and measure its cost.
+
+Starts W worker processes that each hit the same key R times against a limit
+of L. With shared storage (MongoDB, Redis) the workers together are allowed
+exactly L hits; with memory:// each worker has its own counters and W x L get
+through, which is what a multi-worker deployment without shared storage does.
+Also reports the per-hit latency the limiter adds to each request.
+
+Any Redis-protocol server works for the redis:// backend, e.g. a local
+`redis-server --port 6379` or `docker run -p 6379:6379 valkey/valkey`.
+
+Usage:
+    python scripts/bench_rate_limit.py [storage_uri] [workers] [hits_per_worker] [limit]
+    python scripts/bench_rate_limit.py mongodb://localhost:27017 4 200 100
+"""
+import asyncio
+import multiprocessing
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+
+async def run_hits(storage_uri: str, key: str, hits: int, limit: str):
+    from limits import parse
+    from core.rate_limit import AsyncLimiter
+
+    limiter = AsyncLimiter(storage_uri)
+    item = parse(limit)
+    allowed = 0
+    timings = []
+    for _ in range(hits):
+        started = time.perf_counter()
+        if await limiter.hit(item, "bench", key):
+            allowed += 1
+        timings.append(time.perf_counter() - started)
+    return allowed, timings, limiter.using_fallback
+
+
+def worker(storage_uri: str, key: str, hits: int, limit: str, results) -> None:
+    results.put(asyncio.run(run_hits(storage_uri, key, hits, limit)))
+
+
+def main(storage_uri: str, workers: int, hits: int, amount: int) -> None:
+    limit = f"{amount}/hour"
+    key = uuid.uuid4().hex
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker, args=(storage_uri, key, hits, limit, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    allowed = sum(result[0] for result in collected)
+    timings = sorted(t for result in collected for t in result[1])
+    fallback = any(result[2] for result in collected)
+    print(f"storage {storage_uri.split('://', 1)[0]}: {workers} workers x {hits} hits, limit {limit}")
+    print(f"allowed {allowed} (shared storage: {amount}, per-process storage: {min(hits, amount) * workers})")
+    if fallback:
+        print("WARNING: storage was unreachable; workers fell back to in-memory counters")
+    print(f"per hit: p50 {statistics.median(timings) * 1000:.3f}ms  "
+          f"p99 {timings[int(len(timings) * 0.99) - 1] * 1000:.3f}ms  max {timings[-1] * 1000:.3f}ms")
+
+
+if __name__ == "__main__":
+    storage_uri = sys.argv[1] if len(sys.argv) > 1 else "memory://"
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    hits = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    amount = int(sys.argv[4]) if len(sys.argv) > 4 else 100
+    main(storage_uri, workers, hits, amount)
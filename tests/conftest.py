@@ -0,0 +1,8 @@
+"""
+Shared pytest setup: backend modules are imported the way server.py imports
+them (`from core.x import ...`), so the backend directory goes on sys.path.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
@@ -0,0 +1,47 @@
+"""
+Tests for core.logging_setup.RateLimitFilter.
+"""
+import logging
+
+from core.logging_setup import RateLimitFilter
+
+
+def make_record(name="app", level=logging.INFO, lineno=10, msg="hello"):
+    return logging.LogRecord(name, level, "/srv/app.py", lineno, msg, None, None)
+
+
+def test_limits_each_call_site(monkeypatch):
+    log_filter = RateLimitFilter(per_minute=2)
+    monkeypatch.setattr("core.logging_setup.time.monotonic", lambda: 30.0)
+
+    assert [log_filter.filter(make_record()) for _ in range(4)] == [True, True, False, False]
+    # Another line in the same file has its own budget
+    assert log_filter.filter(make_record(lineno=11))
+    assert log_filter.dropped == 2
+
+
+def test_reports_suppressed_count_in_next_window(monkeypatch):
+    log_filter = RateLimitFilter(per_minute=1)
+    now = [30.0]
+    monkeypatch.setattr("core.logging_setup.time.monotonic", lambda: now[0])
+    for _ in range(3):
+        log_filter.filter(make_record())
+
+    now[0] = 95.0
+    record = make_record()
+    assert log_filter.filter(record)
+    assert record.msg == "hello (2 similar messages suppressed)"
+
+
+def test_warnings_and_audit_records_are_never_dropped(monkeypatch):
+    log_filter = RateLimitFilter(per_minute=1)
+    monkeypatch.setattr("core.logging_setup.time.monotonic", lambda: 30.0)
+
+    assert all(log_filter.filter(make_record(level=logging.WARNING)) for _ in range(5))
+    assert all(log_filter.filter(make_record(name="audit")) for _ in range(5))
+    assert log_filter.dropped == 0
+
+
+def test_zero_disables_limiting():
+    log_filter = RateLimitFilter(per_minute=0)
+    assert all(log_filter.filter(make_record()) for _ in range(500))
@@ -0,0 +1,37 @@
+"""
+Tests for migrate_sessions.plan.
+"""
+from datetime import datetime, timedelta, timezone
+
+from core.sessions import hash_session_token
+from migrate_sessions import plan
+
+NOW = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def test_expired_or_unreadable_sessions_are_deleted():
+    assert plan({"expires_at": NOW - timedelta(seconds=1)}, NOW) == ("delete", None)
+    assert plan({"expires_at": NOW}, NOW) == ("delete", None)
+    assert plan({"expires_at": "2026-02-01T00:00:00"}, NOW) == ("delete", None)
+    assert plan({"expires_at": "next tuesday"}, NOW) == ("delete", None)
+    assert plan({}, NOW) == ("delete", None)
+
+
+def test_string_expiry_is_converted_to_a_date():
+    action, update = plan({"expires_at": "2026-04-01T00:00:00Z"}, NOW)
+    assert action == "update"
+    assert update == {"$set": {"expires_at": datetime(2026, 4, 1, tzinfo=timezone.utc)}}
+
+
+def test_raw_token_is_replaced_by_its_hash():
+    expires_at = NOW + timedelta(days=1)
+    action, update = plan({"expires_at": expires_at, "session_token": "sess_abc"}, NOW)
+    assert action == "update"
+    assert update == {
+        "$set": {"token_hash": hash_session_token("sess_abc")},
+        "$unset": {"session_token": ""},
+    }
+
+
+def test_migrated_session_is_left_alone():
+    assert plan({"expires_at": NOW + timedelta(days=1), "token_hash": "x"}, NOW) == (None, None)
@@ -0,0 +1,47 @@
+"""
+Tests for order_export: CSV cells are safe to open in a spreadsheet.
+"""
+import asyncio
+import csv
+import io
+import json
+
+from order_export import ORDER_COLUMNS, _encode_csv, _encode_ndjson, order_row
+
+ORDER = {
+    "order_id": "ORD-1",
+    "shipping_address": {"full_name": "=HYPERLINK(\"http://evil\")", "city": "@SUM(1)", "state": "Kerala", "phone": "+919800000000"},
+    "coupon_code": "-2+3",
+    "items": [{"name": "\tTab", "quantity": 1}],
+    "coupon_discount": -5.0,
+    "total": 100,
+}
+
+
+async def _collect(chunks):
+    return b"".join([chunk async for chunk in chunks]).decode("utf-8")
+
+
+async def _rows():
+    yield order_row(ORDER)
+
+
+def test_csv_escapes_formula_cells():
+    text = asyncio.run(_collect(_encode_csv(_rows(), ORDER_COLUMNS)))
+    row = next(csv.DictReader(io.StringIO(text)))
+
+    assert row["customer_name"] == "'=HYPERLINK(\"http://evil\")"
+    assert row["city"] == "'@SUM(1)"
+    assert row["coupon_code"] == "'-2+3"
+    assert row["phone"] == "'+919800000000"
+    assert row["state"] == "Kerala"
+    # Numbers are not customer text and are written as is
+    assert row["coupon_discount"] == "-5.0"
+
+
+def test_ndjson_is_unchanged():
+    text = asyncio.run(_collect(_encode_ndjson(_rows())))
+    row = json.loads(text)
+
+    assert row["customer_name"] == "=HYPERLINK(\"http://evil\")"
+    assert row["coupon_code"] == "-2+3"
@@ -0,0 +1,73 @@
+"""
+Tests for utils.pagination: cursor round trips and keyset filters.
+"""
+import base64
+import json
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from utils.pagination import decode_cursor, encode_cursor, keyset_filter, next_cursor
+
+SORT = [("created_at", -1), ("order_id", -1)]
+
+
+def test_cursor_round_trip_keeps_datetimes():
+    created_at = datetime(2026, 3, 1, 12, 30, tzinfo=timezone.utc)
+    cursor = encode_cursor([created_at, "ORD-42"])
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor, 2) == [created_at, "ORD-42"]
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", encode_cursor(["only-one"]), "eyJhIjoxfQ"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as excinfo:
+        decode_cursor(cursor, 2)
+    assert excinfo.value.status_code == 400
+
+
+def test_keyset_filter_descending():
+    created_at = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    assert keyset_filter(SORT, [created_at, "ORD-42"]) == {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "order_id": {"$lt": "ORD-42"}},
+    ]}
+
+
+def test_keyset_filter_ascending():
+    assert keyset_filter([("name", 1), ("_id", 1)], ["b", 7]) == {"$or": [
+        {"name": {"$gt": "b"}},
+        {"name": "b", "_id": {"$gt": 7}},
+    ]}
+
+
+def test_next_cursor_only_for_full_pages():
+    created_at = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    rows = [{"created_at": created_at, "order_id": f"ORD-{i}"} for i in range(3)]
+
+    assert next_cursor(rows, SORT, 3) is not None
+    assert decode_cursor(next_cursor(rows, SORT, 3), 2) == [created_at, "ORD-2"]
+    assert next_cursor(rows, SORT, 4) is None
+    assert next_cursor([], SORT, 0) is None
+
+
+@pytest.mark.parametrize("values", [
+    [{"$ne": None}, "x"],
+    [{"$date": {"$gt": ""}}, "x"],
+    [["nested"], "x"],
+    [{"$date": "not a date"}, "x"],
+])
+def test_cursor_values_must_be_scalars_or_dates(values):
+    raw = json.dumps(values).encode()
+    cursor = base64.urlsafe_b64encode(raw).decode().rstrip("=")
+    with pytest.raises(HTTPException) as excinfo:
+        decode_cursor(cursor, 2)
+    assert excinfo.value.status_code == 400
+
+
+def test_numbers_stay_numbers():
+    assert decode_cursor(encode_cursor([12, 3.5]), 2) == [12, 3.5]
+    with pytest.raises(TypeError):
+        encode_cursor([object(), 1])
@@ -0,0 +1,28 @@
+"""
+Tests for core.passwords: reading the work factor of stored hashes.
+"""
+import pytest
+
+from core.passwords import PasswordHasher, hash_rounds
+
+
+@pytest.mark.parametrize("hashed, rounds", [
+    ("$2b$12$R9h/cIPz0gi.URNNX3kh2OPST9/PgBkqquzi.Ss7KIUgO2t0jWMUW", 12),
+    ("$2a$04$abcdefghijklmnopqrstuv", 4),
+    ("$2y$10$", 10),
+    ("sha256$abc", None),
+    ("$2b$xx$abc", None),
+    ("", None),
+])
+def test_hash_rounds(hashed, rounds):
+    assert hash_rounds(hashed) == rounds
+
+
+def test_needs_rehash_only_for_other_bcrypt_work_factors():
+    hasher = PasswordHasher(rounds=12, workers=1)
+    try:
+        assert hasher.needs_rehash("$2b$10$abc")
+        assert not hasher.needs_rehash("$2b$12$abc")
+        assert not hasher.needs_rehash("not-a-bcrypt-hash")
+    finally:
+        hasher.shutdown()
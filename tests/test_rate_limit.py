@@ -0,0 +1,123 @@
+"""
+Tests for core.rate_limit: shared counters over the Redis protocol, the
+in-memory fallback, per-account keys and the route decorator.
+"""
+import asyncio
+import glob
+import os
+import socket
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from limits import parse
+
+from core.rate_limit import AsyncLimiter, RateLimitExceeded, rate_limit_exceeded_handler
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def redis_uri():
+    """An in-process Redis-protocol server (fakeredis over TCP)."""
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = pytest.importorskip("redis")
+    import limits
+
+    port = _free_port()
+    server = fakeredis.TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # fakeredis' TCP server drops the connection after an error reply, so load the
+    # limits Lua scripts up front instead of relying on EVALSHA's NOSCRIPT retry
+    client = redis.Redis(port=port)
+    scripts = os.path.join(os.path.dirname(limits.__file__), "resources", "redis", "lua_scripts")
+    for path in glob.glob(os.path.join(scripts, "*.lua")):
+        with open(path) as f:
+            client.script_load(f.read())
+    client.close()
+
+    yield f"redis://127.0.0.1:{port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_redis_counters_are_shared_between_workers(redis_uri):
+    async def run():
+        # Two limiters stand in for two worker processes with their own clients
+        workers = [AsyncLimiter(redis_uri), AsyncLimiter(redis_uri)]
+        item = parse("5/minute")
+        results = [await workers[i % 2].hit(item, "route", "login", "1.2.3.4") for i in range(10)]
+        return workers, results
+
+    workers, results = asyncio.run(run())
+    assert results.count(True) == 5
+    assert not any(worker.using_fallback for worker in workers)
+    assert sum(worker.metrics.rejected for worker in workers) == 5
+
+
+def test_unreachable_storage_falls_back_to_memory():
+    limiter = AsyncLimiter("mongodb://127.0.0.1:1", timeout_ms=50, recheck_seconds=60)
+    item = parse("2/minute")
+
+    async def run():
+        first = await limiter.hit(item, "account", "login", "a@example.com")
+        started = time.perf_counter()
+        rest = [await limiter.hit(item, "account", "login", "a@example.com") for _ in range(2)]
+        return first, rest, time.perf_counter() - started
+
+    first, rest, elapsed = asyncio.run(run())
+    assert limiter.using_fallback
+    assert limiter.metrics.errors == 1
+    # Limits keep applying from memory, without another trip to the dead storage
+    assert [first] + rest == [True, True, False]
+    assert elapsed < 0.05
+
+
+def test_check_raises_with_retry_after():
+    limiter = AsyncLimiter("memory://")
+    item = parse("1/minute")
+
+    async def run():
+        await limiter.check(item, "account", "forgot_password", "a@example.com")
+        await limiter.check(item, "account", "forgot_password", "a@example.com")
+
+    with pytest.raises(RateLimitExceeded) as excinfo:
+        asyncio.run(run())
+    assert 0 < excinfo.value.retry_after <= 60
+
+
+def test_disabled_limiter_allows_everything():
+    limiter = AsyncLimiter("memory://", enabled=False)
+
+    async def run():
+        for _ in range(5):
+            await limiter.check(parse("1/minute"), "k")
+
+    asyncio.run(run())
+
+
+def test_route_decorator_limits_per_client():
+    limiter = AsyncLimiter("memory://")
+    app = FastAPI()
+    app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
+
+    @app.post("/login")
+    @limiter.limit("2/minute")
+    async def login(http_request: Request):
+        return {"status": "ok"}
+
+    client = TestClient(app)
+    statuses = [client.post("/login").status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+
+    response = client.post("/login")
+    assert response.json()["retry_after"] > 0
+    assert "Retry-After" in response.headers
@@ -0,0 +1,63 @@
+"""
+Tests for core.read_routing: read preference parsing and per-group selection.
+"""
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.read_preferences import Primary, Secondary, SecondaryPreferred
+
+from core.read_routing import ReadRouter, parse_read_preference
+
+
+@pytest.fixture
+def router():
+    # Motor connects lazily, so no server is needed to hand out database handles
+    client = AsyncIOMotorClient("mongodb://127.0.0.1:1", connect=False)
+    yield ReadRouter(client, "shop")
+    client.close()
+
+
+def test_parse_read_preference_modes():
+    assert isinstance(parse_read_preference("primary"), Primary)
+    assert isinstance(parse_read_preference(" SecondaryPreferred "), SecondaryPreferred)
+    with pytest.raises(ValueError):
+        parse_read_preference("replica")
+
+
+def test_parse_read_preference_staleness():
+    # Raised to MongoDB's minimum, and never applied to primary
+    assert parse_read_preference("secondary", 30).max_staleness == 90
+    assert parse_read_preference("secondary", 120).max_staleness == 120
+    assert parse_read_preference("secondary", 0).max_staleness == -1
+    assert parse_read_preference("primary", 120).max_staleness == -1
+
+
+def test_groups_use_defaults_and_unknown_groups_stay_on_primary(router, monkeypatch):
+    monkeypatch.delenv("READ_PREFERENCE_ANALYTICS", raising=False)
+    monkeypatch.delenv("READ_PREFERENCE_CHECKOUT", raising=False)
+
+    assert isinstance(router.database("analytics").read_preference, SecondaryPreferred)
+    assert isinstance(router.database("checkout").read_preference, Primary)
+    assert router.stats()["checkout"] == "primary"
+    assert router.stats()["analytics"].startswith("secondaryPreferred")
+
+
+def test_group_preference_from_environment(router, monkeypatch):
+    monkeypatch.setenv("READ_PREFERENCE_ADMIN_LISTS", "secondary")
+    monkeypatch.setenv("READ_PREFERENCE_ANALYTICS", "primary")
+
+    assert isinstance(router.database("admin_lists").read_preference, Secondary)
+    assert isinstance(router.database("analytics").read_preference, Primary)
+
+
+def test_invalid_preference_falls_back_to_primary(router, monkeypatch):
+    monkeypatch.setenv("READ_PREFERENCE_ANALYTICS", "fastest")
+    assert isinstance(router.database("analytics").read_preference, Primary)
+
+
+def test_handles_are_cached_per_group(router, monkeypatch):
+    monkeypatch.setenv("READ_PREFERENCE_ANALYTICS", "secondary")
+    db = router.database("analytics")
+    # Later environment changes don't affect a group that is already routed
+    monkeypatch.setenv("READ_PREFERENCE_ANALYTICS", "primary")
+    assert router.database("analytics") is db
+    assert router.database("analytics").name == "shop"
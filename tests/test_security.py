@@ -0,0 +1,28 @@
+"""
+Tests for core.security JWT handling without a configured secret.
+"""
+import jwt
+import pytest
+
+from core import security
+
+FORMER_DEFAULT_SECRET = "your-secret-key-change-in-production"
+
+
+def test_tokens_are_rejected_without_a_secret(monkeypatch):
+    monkeypatch.setattr(security, "JWT_SECRET", None)
+    forged = jwt.encode({"sub": "x", "is_admin": True, "type": "access"}, FORMER_DEFAULT_SECRET, algorithm="HS256")
+
+    assert security.verify_token(forged, "access") is None
+    with pytest.raises(RuntimeError):
+        security.create_access_token("x")
+
+
+def test_tokens_round_trip_with_a_secret(monkeypatch):
+    monkeypatch.setattr(security, "JWT_SECRET", "0" * 64)
+    token = security.create_access_token("user_1", is_admin=False)
+
+    assert security.verify_token(token, "access")["sub"] == "user_1"
+    assert security.verify_token(token, "refresh") is None
+    forged = jwt.encode({"sub": "x", "type": "access"}, FORMER_DEFAULT_SECRET, algorithm="HS256")
+    assert security.verify_token(forged, "access") is None